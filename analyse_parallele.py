@@ -0,0 +1,66 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from mesures import METRICS
+from parse_athle import Performance, parse_performances
+from recup_klikego import extract_runners
+
+
+def default_processes() -> int:
+    return os.cpu_count() or 1
+
+
+def parse_performance_records(content: bytes) -> List[Tuple]:
+    """
+    Analyse une page athle (dans un processus d'analyse) et renvoie des enregistrements
+    compacts : un tuple par performance, dans l'ordre de PERFORMANCE_FIELDS, bien plus
+    rapide à sérialiser entre processus qu'une liste d'objets.
+    """
+    return [performance.record() for performance in parse_performances(content)]
+
+
+def records_to_performances(records: List[Tuple]) -> List[Performance]:
+    return [Performance(*record) for record in records]
+
+
+class ParsePool:
+    """
+    Pool de processus dédié à l'analyse HTML (pages d'inscrits Klikego, pages athle), dimensionné
+    par défaut sur le nombre de cœurs. Les workers d'entrée/sortie (threads ou boucle asyncio)
+    ne font plus que télécharger des octets et les confier au pool : l'analyse, liée au GIL,
+    s'étale sur tous les cœurs pendant que le réseau reste saturé.
+    Les processus sont lancés en mode « spawn », sûr dans un processus déjà multi-thread
+    (Streamlit, moteurs) ; ils ne démarrent qu'à la première page soumise.
+    Les durées « athle_parse » et « extract_runners » mesurées ici incluent l'aller-retour entre processus.
+    """
+
+    def __init__(self, processes: Optional[int] = None):
+        self.processes = processes or default_processes()
+        self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                             mp_context=multiprocessing.get_context("spawn"))
+
+    def parse_performances(self, content: bytes) -> List[Performance]:
+        with METRICS.timer("athle_parse"):
+            records = self._executor.submit(parse_performance_records, content).result()
+        return records_to_performances(records)
+
+    async def parse_performances_async(self, content: bytes) -> List[Performance]:
+        with METRICS.timer("athle_parse"):
+            records = await asyncio.wrap_future(self._executor.submit(parse_performance_records, content))
+        return records_to_performances(records)
+
+    def extract_runners(self, html_content: str) -> List[str]:
+        with METRICS.timer("extract_runners"):
+            return self._executor.submit(extract_runners, html_content).result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
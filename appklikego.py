@@ -1,15 +1,277 @@
+import importlib.util
+import os
 import time
+import pandas as pd
 import streamlit as st
-import concurrent.futures
 import requests
-import pandas as pd
 
-from baseathle import get_athletes_performances, calculate_best_performance, filter_performances_by_age
-from recup_klikego import parse_link, fetch_course_options, fetch_data, extract_runners
-
-def fetch_athlete_performance(athlete, min_distance_km, sex_filter):
-    """Récupère les performances pour un athlète donné."""
-    return get_athletes_performances([athlete], min_distance_km, sex_filter)
+from analyse_parallele import ParsePool, default_processes
+from baseathle import AthleLookup, is_closed_season, recent_seasons
+from cache_athle import PerformanceCache
+from cache_partage import SharedCache
+from classement import (IncrementalRanking, best_performance_frame, filter_frame, filter_frame_by_age,
+                        performances_to_frame, ranking_table)
+from export_classement import EXPORT_FORMATS, MIME_TYPES, ranking_bytes
+from index_athle import DEFAULT_INDEX_PATH, BulkIndex
+from mesures import BUCKETS, METRICS, PROFILE_MODES, bucket_label, profile_run
+from moteur_athle import create_engine
+from pipeline import EventPipeline
+from recup_klikego import parse_link, fetch_course_options
+from resolution_noms import NameResolver
+from suivi_inscrits import RegistrantStore
+
+# Parquet et Arrow s'écrivent avec pyarrow ; sans lui, seul le CSV est proposé
+AVAILABLE_EXPORT_FORMATS = tuple(output_format for output_format in EXPORT_FORMATS
+                                 if output_format == "csv" or importlib.util.find_spec("pyarrow") is not None)
+
+@st.cache_resource
+def get_performance_cache():
+    """Cache persistant des performances, partagé par toutes les exécutions."""
+    return PerformanceCache()
+
+@st.cache_resource
+def get_shared_cache():
+    """
+    Cache mémoire commun à toutes les sessions : pages d'inscrits et performances,
+    avec coalescence des requêtes identiques lancées en même temps par plusieurs utilisateurs.
+    """
+    return SharedCache()
+
+@st.cache_resource
+def get_bulk_index():
+    """
+    Index collectif local (club, département, ligue) construit par `python index_athle.py`,
+    ou None s'il n'a jamais été construit.
+    """
+    return BulkIndex(DEFAULT_INDEX_PATH) if os.path.exists(DEFAULT_INDEX_PATH) else None
+
+@st.cache_resource
+def get_registrant_store():
+    """Listes d'inscrits et performances déjà chargées, pour des rechargements incrémentaux."""
+    return RegistrantStore()
+
+@st.cache_resource
+def get_name_resolver():
+    """Découpages de noms d'inscrits confirmés sur athle, partagés par toutes les sessions."""
+    return NameResolver()
+
+@st.cache_resource
+def get_parse_pool():
+    """
+    Pool de processus d'analyse HTML commun à toutes les sessions, un processus par cœur.
+    Sur une machine à un seul cœur, l'analyse reste dans les threads (None).
+    """
+    return ParsePool() if default_processes() > 1 else None
+
+def shared_cache_panel():
+    """Vue d'administration du cache partagé (taille, taux de succès) dans le panneau latéral."""
+    shared_cache = get_shared_cache()
+    stats = shared_cache.stats()
+    with st.sidebar:
+        st.header("Cache partagé")
+        st.caption(
+            f"{stats['entries']} entrées, {stats['bytes'] / 2 ** 20:.1f} / {stats['max_bytes'] / 2 ** 20:.0f} Mo | "
+            f"taux de succès {stats['hit_rate']:.0%} ({stats['hits']} succès, {stats['coalesced']} requêtes "
+            f"mutualisées, {stats['misses']} échecs) | {stats['evictions']} évictions, {stats['in_flight']} en cours"
+        )
+        if st.button("Vider le cache partagé"):
+            shared_cache.clear()
+
+def forget_listings(reference_id):
+    """Retire du cache partagé les pages d'inscrits d'un événement : un rechargement les télécharge."""
+    get_shared_cache().invalidate(lambda key: key[:2] == ("inscrits", reference_id))
+
+def format_seconds(sec):
+    h = int(sec // 3600)
+    m = int((sec % 3600) // 60)
+    s = int(sec % 60)
+    if h > 0:
+        return f"{h}h {m}min {s}s"
+    elif m > 0:
+        return f"{m}min {s}s"
+    else:
+        return f"{s}s"
+
+ALL_COURSES = "Toutes les épreuves"
+LIVE_TOP_K = 50
+RANKING_PAGE_SIZES = [50, 100, 500, 1000]
+LIVE_REFRESH_SECONDS = 0.5
+
+def live_table(ranking):
+    """Tableau du classement provisoire (K premiers seulement), mis en forme comme le classement final."""
+    table = ranking_table(performances_to_frame(ranking.top())).reset_index(drop=True)
+    return table.assign(**{'Speed (km/h)': table['Speed (km/h)'].round(2)})
+
+def metrics_panel():
+    """
+    Panneau latéral des mesures par étape (Klikego, athle réseau/analyse, filtres) :
+    durées agrégées, histogramme d'une étape, compteurs, export JSON lines et profilage.
+    """
+    with st.sidebar:
+        st.header("Mesures")
+        stages = METRICS.snapshot()
+        if stages:
+            st.dataframe({
+                'Étape': list(stages),
+                'Appels': [s['count'] for s in stages.values()],
+                'Total (s)': [round(s['total'], 2) for s in stages.values()],
+                'Moyenne (ms)': [round(s['mean'] * 1000, 1) for s in stages.values()],
+                'p95 (ms)': [round(s['p95'] * 1000, 1) for s in stages.values()],
+                'Max (ms)': [round(s['max'] * 1000, 1) for s in stages.values()],
+            })
+            stage = st.selectbox("Histogramme de l'étape :", list(stages))
+            labels = pd.CategoricalIndex([bucket_label(b) for b in BUCKETS], ordered=True)
+            st.bar_chart(pd.DataFrame({'Appels': list(stages[stage]['histogram'].values())}, index=labels))
+            counters = METRICS.counters()
+            if counters:
+                st.caption(" | ".join(f"{name} : {value}" for name, value in counters.items()))
+            st.download_button("Exporter les mesures (JSON lines)", METRICS.to_jsonl(st.session_state.get('link')),
+                               file_name='mesures.jsonl', mime='application/x-ndjson')
+            if st.button("Réinitialiser les mesures"):
+                METRICS.reset()
+        else:
+            st.caption("Aucune mesure pour l'instant.")
+
+        st.selectbox("Profiler le prochain chargement :", ["Non"] + list(PROFILE_MODES), key='profile_mode',
+                     help="cprofile : appels exacts du thread principal ; sampling : tous les threads.")
+        if 'profile_report' in st.session_state:
+            with st.expander("Dernier profil"):
+                st.code(st.session_state['profile_report'])
+
+def fetch_raw_dataset(reference_id, course_ids, backend, seasons, live_ranking=None):
+    """
+    Récupère les inscrits des épreuves demandées et toutes leurs performances, sans aucun filtre.
+    Pipeline en flux : les requêtes athle partent dès la première page d'inscrits analysée.
+    Les athlètes inscrits à plusieurs épreuves (noms comparés sans accents, casse ni espaces)
+    ne sont recherchés qu'une fois, puis leurs performances sont réparties entre leurs épreuves.
+    Si `live_ranking` est fourni, le classement provisoire est affiché au fil de l'eau
+    (le bouton Stop de Streamlit permet de s'arrêter dès qu'il suffit).
+    Renvoie un jeu de données par épreuve.
+    """
+    shared_cache = get_shared_cache()
+    lookup = AthleLookup(cache=get_performance_cache(), shared_cache=shared_cache, index=get_bulk_index(),
+                         parse_pool=get_parse_pool(), resolver=get_name_resolver())
+    store = get_registrant_store()
+    with st.spinner("Récupération des coureurs et de leurs performances..."):
+        progress_bar = st.progress(0)
+        time_info = st.empty()
+        live_placeholder = st.empty()
+        start_time = time.time()
+        last_refresh = 0.0
+
+        with requests.Session() as session, \
+                create_engine(backend, seasons=seasons, lookup=lookup) as engine:
+            pipeline = EventPipeline(session, reference_id, course_ids, engine, 0, cache=shared_cache,
+                                     store=store)
+            for _, result in pipeline:
+                if result and live_ranking is not None:
+                    live_ranking.add(result)
+                if live_ranking is not None and time.time() - last_refresh > LIVE_REFRESH_SECONDS:
+                    last_refresh = time.time()
+                    live_placeholder.dataframe(live_table(live_ranking))
+                completed = pipeline.completed
+                found = len(pipeline.index)
+                progress_bar.progress(min(completed / found, 1.0))
+
+                elapsed = time.time() - start_time
+                elapsed_str = format_seconds(elapsed)
+                if pipeline.listing_done:
+                    est_str = format_seconds(elapsed / completed * (found - completed))
+                else:
+                    est_str = f"inscrits en cours de récupération (page {pipeline.pages})"
+                time_info.markdown(
+                    f"**Temps écoulé :** {elapsed_str} | **Temps restant estimé :** {est_str} | "
+                    f"**Requêtes en parallèle :** {engine.controller.limit} | "
+                    f"**Taux d'erreur :** {engine.controller.error_rate:.0%}"
+                )
+
+        live_placeholder.empty()
+        stats = lookup.cache.stats()
+        st.caption(f"Cache athle : {stats['hits']} succès, {stats['misses']} échecs ({stats['entries']} entrées)")
+        if pipeline.reused:
+            st.caption(f"{pipeline.reused} athlètes déjà connus repris du chargement précédent, "
+                       f"{pipeline.completed - pipeline.reused} recherchés")
+        if len(course_ids) > 1:
+            st.caption(f"{len(pipeline.index)} athlètes uniques pour {sum(pipeline.runners.values())} inscriptions")
+
+    return {
+        course_id: {
+            'frame': performances_to_frame(pipeline.course_performances(course_id)),
+            'runners': pipeline.runners[course_id],
+            'athletes': pipeline.course_athletes(course_id),
+            'invalid_names': pipeline.invalid_names[course_id],
+        }
+        for course_id in course_ids
+    }
+
+def show_ranking_page(table, key=None):
+    """
+    Affiche une page du classement : seules ses lignes sont envoyées au navigateur,
+    quelle que soit la taille du classement.
+    """
+    suffix = key or 'single'
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Lignes par page :", RANKING_PAGE_SIZES, index=1, key=f'page_size_{suffix}')
+    pages = max(1, -(-len(table) // page_size))
+    with col2:
+        # Sans maximum : une page au-delà de la dernière (filtres resserrés) ramène à la dernière
+        page = min(st.number_input("Page :", min_value=1, value=1, step=1, key=f'page_{suffix}'), pages)
+    start = (page - 1) * page_size
+    end = min(start + page_size, len(table))
+    st.caption(f"Page {page} sur {pages} : rangs {start + 1} à {end} sur {len(table)}")
+    st.dataframe(table.iloc[start:end])
+
+def show_ranking(dataset, min_age, max_age, sex_filter, min_distance_km, speed_threshold, key=None):
+    """Affiche le classement d'une épreuve, filtré en mémoire, page par page, et son export."""
+    if not dataset['runners']:
+        st.warning("Aucun coureur trouvé.")
+        return
+
+    st.write(f"Nombre total de coureurs récupérés : {dataset['runners']}")
+    for runner in dataset['invalid_names']:
+        st.warning(f"Nom mal formaté ignoré : {runner}")
+
+    st.write("Liste des athlètes récupérés :")
+    st.write(dataset['athletes'])
+
+    # Filtres appliqués en mémoire, de façon vectorisée, sur le DataFrame construit une seule fois
+    frame = dataset['frame']
+    filtered = filter_frame(frame, min_distance_km, sex_filter)
+    if filtered.empty:
+        st.warning("Aucune performance trouvée pour les athlètes avec ces filtres.")
+        return
+
+    # Filtrage par tranche d'âge
+    filtered = filter_frame_by_age(filtered, min_age, max_age)
+    if filtered.empty:
+        st.warning("Aucune performance trouvée dans la tranche d'âge spécifiée.")
+        return
+
+    # Calcul des meilleures performances
+    df_best_performances = best_performance_frame(filtered, speed_threshold)
+
+    if df_best_performances.empty:
+        st.warning("Aucune meilleure performance à afficher.")
+        return
+
+    # Temps au format h min s, colonnes renommées, tri par vitesse décroissante
+    df_best_performances_sorted = ranking_table(df_best_performances)
+
+    st.subheader("Meilleures performances (triées par vitesse) :")
+    show_ranking_page(df_best_performances_sorted, key)
+
+    # Fichier produit par groupes de lignes au clic seulement, pas à chaque réexécution du script
+    export_format = st.radio("Format d'export :", AVAILABLE_EXPORT_FORMATS[::-1], horizontal=True,
+                             key=f'format_{key or "single"}')
+    name = f'best_performances_sorted_{key}' if key else 'best_performances_sorted'
+    st.download_button(
+        label=f"Télécharger les résultats en {export_format.upper()}",
+        data=lambda: ranking_bytes(df_best_performances_sorted, export_format),
+        file_name=f'{name}.{export_format}',
+        mime=MIME_TYPES[export_format],
+        key=key,
+    )
 
 def main():
     st.title("Classement des Coureurs")
@@ -42,12 +304,18 @@ def main():
         st.header("Étape 2 : Sélectionner une épreuve")
         course_names = list(st.session_state['filtered_options'].keys())
         course_ids = list(st.session_state['filtered_options'].values())
-        selected_course = st.selectbox("Choisissez une épreuve :", course_names)
+        selected_course = st.selectbox(
+            "Choisissez une épreuve :", course_names + [ALL_COURSES],
+            help="Toutes les épreuves : chaque athlète n'est recherché qu'une fois, même s'il est inscrit à plusieurs."
+        )
         
         if st.button("Valider l'épreuve"):
-            selected_index = course_names.index(selected_course)
             st.session_state['selected_course_name'] = selected_course
-            st.session_state['course_id'] = course_ids[selected_index]
+            if selected_course == ALL_COURSES:
+                st.session_state['course_id'] = ALL_COURSES
+            else:
+                selected_index = course_names.index(selected_course)
+                st.session_state['course_id'] = course_ids[selected_index]
             st.success(f"Épreuve sélectionnée : {selected_course}")
 
     if 'selected_course_name' in st.session_state:
@@ -55,10 +323,19 @@ def main():
         min_age = st.number_input("Âge minimum pour le classement :", min_value=0, value=18)
         max_age = st.number_input("Âge maximum pour le classement :", min_value=0, value=100)
         sex_filter = st.selectbox("Filtrer par sexe :", ["Les deux", "Masculin", "Féminin"])
-        # Bouton "Boosting" expérimental pour augmenter le nombre de workers
-        boosting = st.checkbox(
-            "Activer le Boosting (Phase expérimentale : augmente le nombre de workers à 100, peut causer un crash)",
-            value=False
+        min_distance_km = st.number_input("Distance minimale des courses (km) :", min_value=0, value=5)
+        speed_threshold = st.number_input("Vitesse maximale retenue (km/h) :", min_value=1, value=25)
+        available_seasons = recent_seasons(5)
+        seasons = st.multiselect(
+            "Saisons athle à prendre en compte :",
+            available_seasons,
+            default=available_seasons[:2],
+            help="Les saisons passées sont mises en cache définitivement ; seule la saison en cours est rafraîchie."
+        )
+        backend = st.selectbox(
+            "Moteur de récupération :",
+            ["threads", "asyncio"],
+            help="asyncio garde des centaines de requêtes en vol sur un seul thread."
         )
 
         if st.button("Appliquer les filtres"):
@@ -70,8 +347,10 @@ def main():
                 st.session_state['sex_filter'] = 'f'
             else:
                 st.session_state['sex_filter'] = ''
-            # Stocker le paramètre de boosting dans le session_state
-            st.session_state['boosting'] = boosting
+            st.session_state['min_distance_km'] = min_distance_km
+            st.session_state['speed_threshold'] = speed_threshold
+            st.session_state['seasons'] = sorted(seasons or available_seasons[:1], reverse=True)
+            st.session_state['backend'] = backend
             st.success("Filtres appliqués")
 
     if 'sex_filter' in st.session_state:
@@ -84,141 +363,62 @@ def main():
         max_age = st.session_state['max_age']
         sex_filter = st.session_state['sex_filter']
         link = st.session_state['link']
-        boosting = st.session_state.get('boosting', False)
-
-        # Extraction des coureurs
-        page_number = 0
-        all_runners = []
-        with st.spinner("Récupération des coureurs..."):
-            with requests.Session() as session:
-                while True:
-                    html_content = fetch_data(session, page_number, course_id, reference_id)
-                    runners = extract_runners(html_content)
-                    if not runners:
-                        break
-                    all_runners.extend(runners)
-                    page_number += 1
-
-        if not all_runners:
-            st.warning("Aucun coureur trouvé.")
-            return
-
-        st.write(f"Nombre total de coureurs récupérés : {len(all_runners)}")
-
-        # Préparer la liste (Nom, Prénom)
-        athletes = []
-        for runner in all_runners:
-            split_name = runner.split()
-            if len(split_name) >= 2:
-                last_name = split_name[0].strip()
-                first_name = " ".join(split_name[1:]).strip()
-                athletes.append((last_name, first_name))
-            else:
-                st.warning(f"Nom mal formaté ignoré : {runner}")
-
-        st.write("Liste des athlètes récupérés :")
-        st.write(athletes)
-
-        # Paramètres pour les performances
-        min_distance_km = 5
-        speed_threshold = 25
-
-        # Déterminer le nombre de workers en fonction du boosting
-        max_workers = 100 if boosting else 15
-
-        # Récupération des performances en parallèle avec le nombre de workers défini
-        with st.spinner("Récupération des performances des athlètes..."):
-            total_athletes = len(athletes)
-            performances = []
-            progress_bar = st.progress(0)
-            time_info = st.empty()
-            start_time = time.time()
-
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_athlete = {
-                    executor.submit(fetch_athlete_performance, athlete, min_distance_km, sex_filter): athlete
-                    for athlete in athletes
-                }
-                completed = 0
-                for future in concurrent.futures.as_completed(future_to_athlete):
-                    result = future.result()
-                    if result:
-                        performances.extend(result)
-                    completed += 1
-                    progress_bar.progress(completed / total_athletes)
-                    
-                    elapsed = time.time() - start_time
-                    avg_time = elapsed / completed
-                    remaining = total_athletes - completed
-                    est_time_left = avg_time * remaining
-
-                    def format_seconds(sec):
-                        h = int(sec // 3600)
-                        m = int((sec % 3600) // 60)
-                        s = int(sec % 60)
-                        if h > 0:
-                            return f"{h}h {m}min {s}s"
-                        elif m > 0:
-                            return f"{m}min {s}s"
-                        else:
-                            return f"{s}s"
-
-                    elapsed_str = format_seconds(elapsed)
-                    est_str = format_seconds(est_time_left)
-                    time_info.markdown(f"**Temps écoulé :** {elapsed_str} | **Temps restant estimé :** {est_str}")
-
-        if not performances:
-            st.warning("Aucune performance trouvée pour les athlètes.")
-            return
-
-        # Filtrage par tranche d'âge
-        performances_by_age = filter_performances_by_age(performances, min_age, max_age)
-        if not performances_by_age:
-            st.warning("Aucune performance trouvée dans la tranche d'âge spécifiée.")
-            return
-
-        # Calcul des meilleures performances
-        best_performances = calculate_best_performance(performances_by_age, speed_threshold)
-        df_best_performances = pd.DataFrame(best_performances.values())
-
-        if df_best_performances.empty:
-            st.warning("Aucune meilleure performance à afficher.")
+        backend = st.session_state.get('backend', 'threads')
+
+        min_distance_km = st.session_state.get('min_distance_km', 5)
+        speed_threshold = st.session_state.get('speed_threshold', 25)
+        seasons = st.session_state.get('seasons') or recent_seasons(1)
+
+        if course_id == ALL_COURSES:
+            course_ids = list(st.session_state['filtered_options'].values())
+        else:
+            course_ids = [course_id]
+
+        # Les performances brutes (sans filtre) ne sont récupérées qu'une fois par épreuve :
+        # changer les filtres ne relance aucune requête.
+        raw_datasets = st.session_state.setdefault('raw_datasets', {})
+        dataset_key = (reference_id, course_id, tuple(seasons))
+        if st.button("Recharger les inscrits et les performances",
+                     help="Seuls les nouveaux inscrits sont recherchés sur athle."):
+            forget_listings(reference_id)
+            raw_datasets.pop(dataset_key, None)
+        if st.button("Tout recharger", help="Recherche de nouveau tous les inscrits, y compris ceux déjà connus."):
+            get_registrant_store().forget(reference_id)
+            forget_listings(reference_id)
+            open_seasons = {str(season) for season in seasons if not is_closed_season(season)}
+            get_shared_cache().invalidate(lambda key: key[0] == "athle" and key[3] in open_seasons)
+            raw_datasets.pop(dataset_key, None)
+        if dataset_key not in raw_datasets:
+            live_ranking = IncrementalRanking(
+                k=LIVE_TOP_K, min_age=min_age, max_age=max_age, speed_threshold=speed_threshold,
+                min_distance_km=min_distance_km, sex_filter=sex_filter
+            )
+            profile_mode = st.session_state.get('profile_mode')
+            with profile_run(profile_mode if profile_mode in PROFILE_MODES else None) as profile:
+                try:
+                    raw_datasets[dataset_key] = fetch_raw_dataset(reference_id, course_ids, backend, seasons,
+                                                                  live_ranking)
+                except requests.RequestException as e:
+                    # Liste d'inscrits incomplète : rien n'est affiché ni conservé, « Recharger » réessaie
+                    st.error(f"Erreur lors de la récupération des inscrits : {e}")
+                    return
+            if 'report' in profile:
+                st.session_state['profile_report'] = profile['report']
+        datasets = raw_datasets[dataset_key]
+
+        if len(course_ids) == 1:
+            show_ranking(datasets[course_id], min_age, max_age, sex_filter, min_distance_km, speed_threshold)
             return
 
-        df_best_performances['Speed (km/h)'] = df_best_performances['speed_kph']
-
-        # Conversion du temps (total_seconds) en format h min s
-        if 'total_seconds' in df_best_performances.columns:
-            def seconds_to_hms(seconds):
-                h = seconds // 3600
-                m = (seconds % 3600) // 60
-                s = seconds % 60
-                return f"{h}h {m}min {s}s"
-            df_best_performances['Temps'] = df_best_performances['total_seconds'].apply(seconds_to_hms)
-
-        df_best_performances.rename(columns={
-            'athlete': 'Nom complet',
-            'birth_year': 'date_of_birth'
-        }, inplace=True)
-
-        colonnes_ordre = ['Nom complet', 'date_of_birth', 'sex', 'distance_km', 'Temps', 'Speed (km/h)']
-        colonnes_existantes = [col for col in colonnes_ordre if col in df_best_performances.columns]
-
-        if len(colonnes_existantes) < len(colonnes_ordre):
-            st.warning("Certaines colonnes ne seront pas affichées car elles sont absentes du DataFrame.")
-
-        df_best_performances_sorted = df_best_performances[colonnes_existantes].sort_values(by='Speed (km/h)', ascending=False)
-
-        st.subheader("Meilleures performances (triées par vitesse) :")
-        st.dataframe(df_best_performances_sorted)
-
-        csv = df_best_performances_sorted.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="Télécharger les résultats en CSV",
-            data=csv,
-            file_name='best_performances_sorted.csv',
-            mime='text/csv',
-        )
+        # Un onglet par épreuve, classements issus d'une seule recherche par athlète
+        names = {value: name for name, value in st.session_state['filtered_options'].items()}
+        tabs = st.tabs([names[value] for value in course_ids])
+        for tab, value in zip(tabs, course_ids):
+            with tab:
+                show_ranking(datasets[value], min_age, max_age, sex_filter, min_distance_km, speed_threshold,
+                             key=value)
 
 if __name__ == "__main__":
     main()
+    metrics_panel()
+    shared_cache_panel()
@@ -1,19 +1,91 @@
+import time
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
 import requests
-from bs4 import BeautifulSoup
-from lxml import etree
-import re
 import pandas as pd
+from datetime import date, datetime
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def fetch_performance_data(last_name, first_name, min_distance_km, sex_filter=None):
-    base_url = "https://bases.athle.fr/asp.net/liste.aspx"
-    params = {
+from cache_athle import DEFAULT_TTL_SECONDS, PerformanceCache
+from cache_partage import PERFORMANCE_TTL_SECONDS, SharedCache
+from export_classement import write_ranking
+from mesures import METRICS
+from parse_athle import parse_performances
+
+if TYPE_CHECKING:
+    from analyse_parallele import ParsePool
+    from index_athle import BulkIndex
+    from resolution_noms import NameResolver
+
+ATHLE_URL = "https://bases.athle.fr/asp.net/liste.aspx"
+
+class AthleLookup(NamedTuple):
+    """
+    Ce qu'une recherche athle consulte ou utilise en plus du site, tout étant facultatif :
+    cache mémoire partagé, cache persistant et index collectif local (dans cet ordre, avant
+    toute requête), pool de processus d'analyse HTML et résolution des noms d'inscrits.
+    """
+    cache: Optional[PerformanceCache] = None
+    shared_cache: Optional[SharedCache] = None
+    index: Optional["BulkIndex"] = None
+    parse_pool: Optional["ParsePool"] = None
+    resolver: Optional["NameResolver"] = None
+
+NO_LOOKUP = AthleLookup()
+
+def current_season(today=None):
+    """Saison athle en cours : la saison N va du 1er septembre N-1 au 31 août N."""
+    today = today or date.today()
+    return str(today.year + 1 if today.month >= 9 else today.year)
+
+def recent_seasons(count=2, today=None):
+    """Les `count` dernières saisons, la plus récente en premier."""
+    season = int(current_season(today))
+    return [str(season - offset) for offset in range(count)]
+
+def is_closed_season(season, today=None):
+    """Une saison passée ne reçoit plus de résultats."""
+    return int(season) < int(current_season(today))
+
+def season_end(season):
+    """
+    Fin de la saison (timestamp du 1er septembre à minuit) : seules les données récupérées
+    après cette date sont complètes et n'expirent plus.
+    """
+    return datetime(int(season), 9, 1).timestamp()
+
+def merge_season_performances(results):
+    """
+    Fusionne les performances de plusieurs saisons d'un même athlète en supprimant les doublons.
+    Renvoie None si toutes les requêtes ont échoué.
+    """
+    if all(performances is None for performances in results):
+        return None
+    merged = []
+    seen = set()
+    for performances in results:
+        for performance in performances or []:
+            key = (performance['course_name'], performance['time'], performance['birth_year'], performance['sex'])
+            if key not in seen:
+                seen.add(key)
+                merged.append(performance)
+    return merged
+
+def filter_performances(performances, min_distance_km, sex_filter=None):
+    """Applique les filtres de distance minimale et de sexe aux performances brutes."""
+    return [
+        p for p in performances
+        if (p['distance_km'] is None or p['distance_km'] >= min_distance_km)
+        and not (sex_filter and p['sex'] is not None and p['sex'] != sex_filter)
+    ]
+
+def athle_query_params(last_name, first_name, season):
+    return {
         "frmpostback": "true",
         "frmbase": "resultats",
         "frmmode": "1",
         "frmespace": "0",
-        "frmsaison": "2024",
+        "frmsaison": season,
         "frmclub": "",
         "frmnom": last_name,
         "frmprenom": first_name,
@@ -24,148 +96,105 @@ def fetch_performance_data(last_name, first_name, min_distance_km, sex_filter=No
         "frmcomprch": ""
     }
 
-    response = requests.get(base_url, params=params)
-    if response.status_code == 200:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        dom = etree.HTML(str(soup))
-
-        performances = []
-        rows = dom.xpath('//*[@id="ctnResultats"]/tr[td]')
-        for row in rows:
-            course_name = row.xpath('td[5]/text()')
-            if course_name:
-                course_name = course_name[0].strip().lower()
-
-                if any(trail in course_name for trail in ["trail xxs", "trail xs","trail s", "trail l", "trail xl", "trail m"]):
-                    continue
-
-                if 'semi marathon' in course_name:
-                    distance_km = 21.0
-                elif '1/2' in course_name and 'marathon' in course_name:
-                    distance_km = 21.0
-                elif 'semi_marathon' in course_name:
-                    distance_km = 21.0
-                elif 'half marathon' in course_name:
-                    distance_km = 21.0
-                elif 'marathon' in course_name:
-                    distance_km = 42.0
-                else:
-                    match = re.search(r'(?<!semi )(\d+)\s?km', course_name)
-                    if match:
-                        distance_km = float(match.group(1))
-                    else:
-                        distance_km = None
-
-                if distance_km is not None and distance_km < min_distance_km:
-                    continue
-
-                time = row.xpath('td[11]//b/text()') or row.xpath('td[11]//u/text()')
-                birth_year_data = row.xpath('td[15]/text()')
-
-                if birth_year_data:
-                    birth_year_str = birth_year_data[0].split("/")[-1].strip()
-                    sex = birth_year_data[0].split("/")[-2][-1].lower()  # Extraire le sexe
-                    if sex_filter and sex != sex_filter:
-                        continue
-                    try:
-                        birth_year = int(birth_year_str)
-                        if 0 <= birth_year <= 19:
-                            birth_year += 2000
-                        elif 20 <= birth_year <= 99:
-                            birth_year += 1900
-                    except ValueError:
-                        birth_year = None
-                else:
-                    birth_year = None
-                    sex = None
-
-                if time:
-                    time = time[0].strip()
-                    hours = minutes = seconds = 0
-
-                    try:
-                        if "h" in time and "'" in time and "''" in time:
-                            time_parts = re.split("[h'’\"]+", time)
-                            if len(time_parts) >= 3:
-                                hours = int(time_parts[0])
-                                minutes = int(time_parts[1])
-                                seconds = int(time_parts[2])
-                        elif "'" in time and "''" in time:
-                            time_parts = re.split("[\'’\"]+", time)
-                            if len(time_parts) >= 2:
-                                minutes = int(time_parts[0])
-                                seconds = int(time_parts[1])
-                        elif "'" in time and not "''" in time:
-                            time_parts = time.split("'")
-                            if len(time_parts) == 2:
-                                minutes = int(time_parts[0])
-                                seconds = int(time_parts[1])
-                        elif ":" in time:
-                            time_parts = time.split(":")
-                            if len(time_parts) == 3:
-                                hours = int(time_parts[0])
-                                minutes = int(time_parts[1])
-                                seconds = int(time_parts[2])
-                            elif len(time_parts) == 2:
-                                minutes = int(time_parts[0])
-                                seconds = int(time_parts[1])
-                        else:
-                            if 'h' in time:
-                                time_parts = re.split("[h'’\"]+", time)
-                                if len(time_parts) >= 2:
-                                    hours = int(time_parts[0])
-                                    min_sec_parts = time_parts[1].split("'")
-                                    if len(min_sec_parts) == 2:
-                                        minutes = int(min_sec_parts[0])
-                                        seconds = int(min_sec_parts[1])
-                                    else:
-                                        minutes = int(min_sec_parts[0])
-                                        seconds = 0
-                            else:
-                                continue
-
-                        total_seconds = hours * 3600 + minutes * 60 + seconds
-                        total_hours = total_seconds / 3600
-
-                        if total_hours > 0 and distance_km is not None:
-                            speed_kph = distance_km / total_hours
-                        else:
-                            speed_kph = 0
-
-                        performance = {
-                            "course_name": course_name,
-                            "distance_km": distance_km,
-                            "time": time,
-                            "total_seconds": total_seconds,
-                            "speed_kph": speed_kph,
-                            "birth_year": birth_year,
-                            "sex": sex
-                        }
-                        performances.append(performance)
-                    except ValueError:
-                        continue
-        return performances
+def shared_performance_key(last_name, first_name, season):
+    """Clé des performances brutes d'un athlète dans le cache partagé (SharedCache)."""
+    return ("athle", last_name.strip().lower(), first_name.strip().lower(), str(season))
+
+def shared_performance_ttl(season):
+    """
+    Les saisons closes restent en mémoire jusqu'à éviction, la saison en cours expire.
+    Juste après la fin d'une saison, le cache persistant peut encore servir des données
+    récupérées avant : elles expirent aussi, jusqu'à ce que son TTL soit écoulé.
+    """
+    if time.time() >= season_end(season) + DEFAULT_TTL_SECONDS:
+        return None
+    return PERFORMANCE_TTL_SECONDS
+
+def lookup_index(index, last_name, first_name, season):
+    """Performances de l'index collectif local (BulkIndex), ou None si l'athlète n'y figure pas."""
+    if index is None:
+        return None
+    performances = index.lookup(last_name, first_name, season)
+    if performances is not None:
+        METRICS.increment("athle_index_hits")
+    return performances
+
+def load_performances(last_name, first_name, season, session=None, lookup=NO_LOOKUP):
+    """
+    Performances brutes d'une saison : cache persistant, sinon index collectif local,
+    sinon requête athle et analyse (dans le pool de processus de `lookup` s'il est fourni).
+    None en cas d'échec.
+    """
+    cache = lookup.cache
+    performances = None
+    if cache is not None:
+        performances = cache.get(last_name, first_name, season, final_after=season_end(season))
+    if performances is None:
+        performances = lookup_index(lookup.index, last_name, first_name, season)
+    if performances is None:
+        params = athle_query_params(last_name, first_name, season)
+        METRICS.increment("athle_requests")
+        response = (session or requests).get(ATHLE_URL, params=params)
+        if response.status_code != 200:
+            METRICS.increment("athle_errors")
+            return None
+        if lookup.parse_pool is None:
+            performances = parse_performances(response.content)
+        else:
+            performances = lookup.parse_pool.parse_performances(response.content)
+        if cache is not None:
+            cache.set(last_name, first_name, season, performances)
+    return performances
+
+def fetch_performance_data(last_name, first_name, min_distance_km, sex_filter=None, season=None, session=None,
+                           lookup=NO_LOOKUP):
+    season = season or current_season()
+    if lookup.shared_cache is None:
+        performances = load_performances(last_name, first_name, season, session, lookup)
     else:
+        performances = lookup.shared_cache.get_or_fetch(
+            shared_performance_key(last_name, first_name, season),
+            lambda: load_performances(last_name, first_name, season, session, lookup),
+            ttl=shared_performance_ttl(season),
+        )
+    if performances is None:
         return None
+    return filter_performances(performances, min_distance_km, sex_filter)
 
-def get_athlete_performance_threaded(athlete, min_distance_km, sex_filter):
+def tag_athlete(performances, athlete):
+    """Copies des performances (Performance) avec le nom de l'athlète : les performances en cache restent intactes."""
     last_name, first_name = athlete
-    performances = fetch_performance_data(last_name, first_name, min_distance_km, sex_filter)
-    if performances:
-        for performance in performances:
-            performance['athlete'] = f"{first_name} {last_name}"
-    return performances
+    if not performances:
+        return performances
+    name = f"{first_name} {last_name}"
+    return [performance.with_athlete(name) for performance in performances]
+
+def get_athlete_performance_threaded(athlete, min_distance_km, sex_filter, session=None, season=None,
+                                     lookup=NO_LOOKUP):
+    last_name, first_name = athlete
+    performances = fetch_performance_data(last_name, first_name, min_distance_km, sex_filter, season=season,
+                                          session=session, lookup=lookup)
+    return tag_athlete(performances, athlete)
+
+def get_athletes_performances(athletes, min_distance_km, sex_filter, lookup=NO_LOOKUP, engine=None,
+                              backend="threads", seasons=None):
+    from moteur_athle import create_engine
 
-def get_athletes_performances(athletes, min_distance_km, sex_filter):
     all_performances = []
-    with ThreadPoolExecutor() as executor:
-        futures = {executor.submit(get_athlete_performance_threaded, athlete, min_distance_km, sex_filter): athlete for athlete in athletes}
-        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing Athletes"):
-            performances = future.result()
+    owns_engine = engine is None
+    if owns_engine:
+        engine = create_engine(backend, seasons=seasons, lookup=lookup)
+    try:
+        results = engine.fetch_many(athletes, min_distance_km, sex_filter)
+        for _, performances in tqdm(results, total=len(athletes), desc="Processing Athletes"):
             if performances:
                 all_performances.extend(performances)
+    finally:
+        if owns_engine:
+            engine.close()
     return all_performances
 
+@METRICS.timed("filter_by_age")
 def filter_performances_by_age(performances, min_age, max_age):
     current_year = pd.Timestamp.now().year
     filtered_performances = [
@@ -174,6 +203,7 @@ def filter_performances_by_age(performances, min_age, max_age):
     ]
     return filtered_performances
 
+@METRICS.timed("best_performance")
 def calculate_best_performance(performances, speed_threshold):
     best_performances = {}
     for performance in performances:
@@ -193,7 +223,8 @@ def main():
         "Pierre Audouin", "Rachel Authier", "Julien Bacle", "Jerome Barataud", "Monique Barban","luca Mercier", "romain trohel","charline mercier"
     ]
 
-    athletes = [(name.split()[1], name.split()[0]) for name in additional_runners]
+    # Noms « Prénom Nom » : le nom de famille peut être composé (« Frederique Astier Saintamand »)
+    athletes = [(" ".join(name.split()[1:]), name.split()[0]) for name in additional_runners]
 
     min_distance_km = 5
     speed_threshold = 25
@@ -206,7 +237,11 @@ def main():
         print("Invalid input for sex. Defaulting to both.")
         sex_filter = None
 
-    performances = get_athletes_performances(athletes, min_distance_km, sex_filter)
+    cache = PerformanceCache()
+    performances = get_athletes_performances(athletes, min_distance_km, sex_filter, AthleLookup(cache=cache),
+                                             seasons=recent_seasons(2))
+    stats = cache.stats()
+    print(f"Cache : {stats['hits']} succès, {stats['misses']} échecs ({stats['entries']} entrées).")
 
     performances_by_age = filter_performances_by_age(performances, min_age, max_age)
 
@@ -222,7 +257,7 @@ def main():
         print("\nBest Performances Below Threshold (Sorted by Speed):")
         print(df_best_performances_sorted.to_string(index=False))
 
-        df_best_performances_sorted.to_csv('best_performances_by_age_and_sex_below_25kph.csv', index=False)
+        write_ranking(df_best_performances_sorted, 'best_performances_by_age_and_sex_below_25kph.csv', "csv")
 
         print("Data exported to 'best_performances_by_age_and_sex_below_25kph.csv'.")
     else:
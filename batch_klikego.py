@@ -0,0 +1,198 @@
+import argparse
+import importlib.util
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from analyse_parallele import ParsePool, default_processes
+from baseathle import NO_LOOKUP, AthleLookup, recent_seasons
+from cache_athle import PerformanceCache
+from classement import performances_to_frame, rank_performances, ranking_table
+from export_classement import EXPORT_FORMATS, write_ranking
+from index_athle import BulkIndex
+from mesures import METRICS
+from moteur_athle import BACKENDS, create_engine
+from pipeline import EventPipeline
+from recup_klikego import fetch_course_options, parse_link
+from resolution_noms import DEFAULT_RESOLUTIONS_PATH, NameResolver
+from suivi_inscrits import RegistrantStore
+
+# Échecs propres à une entrée (réseau, page inattendue, classement, écriture du fichier) :
+# l'entrée est comptée en échec et le lot continue avec la suivante.
+ENTRY_ERRORS: Tuple[type, ...] = (ValueError, OSError, requests.RequestException)
+if importlib.util.find_spec("pyarrow") is not None:
+    from pyarrow import ArrowException
+
+    ENTRY_ERRORS += (ArrowException,)
+
+def parse_entry(entry: str) -> Tuple[str, Optional[str]]:
+    """
+    Découpe une entrée « LIEN_OU_REFERENCE[#ID_EPREUVE] » en (référence, épreuve).
+    Sans épreuve, toutes les épreuves de la course sont classées.
+    """
+    link, _, course_id = entry.strip().partition("#")
+    return parse_link(link), course_id.strip() or None
+
+
+def read_entries(entries: Iterable[str], files: Iterable[str]) -> List[str]:
+    """Entrées de la ligne de commande puis des fichiers (une par ligne, # en début de ligne : commentaire)."""
+    result = [entry for entry in entries if entry.strip()]
+    for path in files:
+        with open(path, encoding="utf-8") as file:
+            result.extend(line.strip() for line in file if line.strip() and not line.startswith("#"))
+    return result
+
+
+def output_path(output_dir: Path, reference_id: str, course_id: str, output_format: str) -> Path:
+    name = re.sub(r"[^\w.-]", "_", f"{reference_id}_{course_id}")
+    return output_dir / f"{name}.{output_format}"
+
+
+def rank_courses(session: requests.Session, engine, reference_id: str, course_ids: List[str],
+                 settings: Dict, store=None) -> Iterator[Tuple[str, object, int]]:
+    """
+    Récupère les inscrits des épreuves d'un événement, recherche une seule fois chaque athlète
+    (dédoublonné sur toutes les épreuves) avec le moteur partagé, puis renvoie pour chaque
+    épreuve (identifiant, classement mis en forme, nombre d'inscrits).
+    Avec `store` (RegistrantStore), seuls les inscrits nouveaux depuis le passage précédent sont recherchés.
+    """
+    pipeline = EventPipeline(session, reference_id, course_ids, engine, 0, store=store)
+    for _ in pipeline:
+        pass
+    for course_id in course_ids:
+        ranked = rank_performances(performances_to_frame(pipeline.course_performances(course_id)), **settings)
+        yield course_id, ranking_table(ranked), pipeline.runners[course_id]
+
+
+def write_table(table, path: Path, output_format: str) -> None:
+    """
+    Écrit un classement par groupes de lignes (Parquet, Arrow IPC ou CSV), sans copie complète du tableau.
+    Un fichier dont l'écriture échoue est supprimé plutôt que laissé tronqué.
+    """
+    try:
+        write_ranking(table, str(path), output_format)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+
+def run_batch(entries: List[str], settings: Dict, output_dir: Path, output_format: str = "parquet",
+              backend: str = "threads", seasons: Optional[List[str]] = None, lookup: AthleLookup = NO_LOOKUP,
+              store=None) -> int:
+    """
+    Classe toutes les épreuves demandées avec une seule session Klikego, un seul moteur
+    athle et un seul cache. Au sein d'un événement, un athlète inscrit à plusieurs épreuves
+    n'est recherché qu'une fois ; d'un événement à l'autre, le cache évite de le rechercher de nouveau.
+    Renvoie le nombre d'entrées en échec (les autres sont traitées malgré tout).
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    failures = 0
+    with requests.Session() as session, create_engine(backend, seasons=seasons, lookup=lookup) as engine:
+        for entry in entries:
+            try:
+                reference_id, wanted_course = parse_entry(entry)
+                course_options = fetch_course_options(session, reference_id)
+            except ENTRY_ERRORS as e:
+                print(f"{entry} : erreur : {e}", file=sys.stderr)
+                failures += 1
+                continue
+            courses = {name: course_id for name, course_id in course_options.items()
+                       if wanted_course is None or wanted_course in (course_id, name)}
+            if not courses:
+                print(f"{entry} : épreuve {wanted_course} introuvable", file=sys.stderr)
+                failures += 1
+                continue
+            names = {course_id: name for name, course_id in courses.items()}
+            start = time.perf_counter()
+            try:
+                for course_id, table, runners in rank_courses(session, engine, reference_id, list(names), settings,
+                                                             store):
+                    path = output_path(output_dir, reference_id, course_id, output_format)
+                    write_table(table, path, output_format)
+                    print(f"{reference_id} / {names[course_id]} : {runners} inscrits, {len(table)} classés -> {path}")
+            except ENTRY_ERRORS as e:
+                print(f"{entry} : erreur : {e}", file=sys.stderr)
+                failures += 1
+                continue
+            print(f"{reference_id} : {len(names)} épreuve(s) en {time.perf_counter() - start:.1f} s")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Classe sans interface une liste de courses Klikego "
+                    "et écrit chaque classement en Parquet, Arrow ou CSV."
+    )
+    parser.add_argument("entries", nargs="*", metavar="LIEN[#EPREUVE]",
+                        help="Lien Klikego ou référence, suivi éventuellement de #identifiant (ou nom) d'épreuve.")
+    parser.add_argument("-f", "--file", action="append", default=[], help="Fichier d'entrées, une par ligne.")
+    parser.add_argument("-o", "--output-dir", default="classements", help="Répertoire des classements.")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="parquet")
+    parser.add_argument("--min-age", type=int, default=18)
+    parser.add_argument("--max-age", type=int, default=100)
+    parser.add_argument("--sex", choices=["m", "f"], help="Filtrer par sexe (par défaut : les deux).")
+    parser.add_argument("--min-distance", type=float, default=5, help="Distance minimale des courses (km).")
+    parser.add_argument("--speed-threshold", type=float, default=25, help="Vitesse maximale retenue (km/h).")
+    parser.add_argument("--seasons", nargs="+", help="Saisons athle (par défaut les deux dernières).")
+    parser.add_argument("--backend", choices=BACKENDS, default="threads")
+    parser.add_argument("--index", help="Index collectif local construit par index_athle.py.")
+    parser.add_argument("--incremental", metavar="FICHIER",
+                        help="Mémoire des inscrits (SQLite) : d'un passage à l'autre, "
+                             "seuls les nouveaux inscrits sont recherchés.")
+    parser.add_argument("--parse-processes", type=int,
+                        help="Processus d'analyse HTML (par défaut : un par cœur s'il y en a plusieurs ; "
+                             "0 : analyse dans les threads).")
+    parser.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS_PATH,
+                        help="Découpages de noms confirmés (SQLite), réutilisés d'un lot à l'autre.")
+    parser.add_argument("--metrics", help="Ajoute les mesures par étape à ce fichier JSON lines.")
+    args = parser.parse_args()
+
+    entries = read_entries(args.entries, args.file)
+    if not entries:
+        parser.error("aucune course à classer.")
+    if args.format != "csv" and importlib.util.find_spec("pyarrow") is None:
+        parser.error(f"l'export {args.format} nécessite pyarrow (pip install pyarrow) ; sinon utilisez --format csv.")
+
+    settings = dict(min_age=args.min_age, max_age=args.max_age, speed_threshold=args.speed_threshold,
+                    min_distance_km=args.min_distance, sex_filter=args.sex)
+    cache = PerformanceCache()
+    index = BulkIndex(args.index) if args.index else None
+    store = RegistrantStore(args.incremental) if args.incremental else None
+    processes = args.parse_processes
+    if processes is None:
+        processes = default_processes() if default_processes() > 1 else 0
+    parse_pool = ParsePool(processes) if processes else None
+    resolver = NameResolver(args.resolutions)
+    try:
+        lookup = AthleLookup(cache=cache, index=index, parse_pool=parse_pool, resolver=resolver)
+        failures = run_batch(entries, settings, Path(args.output_dir), args.format, args.backend,
+                             args.seasons or recent_seasons(2), lookup, store)
+    finally:
+        stats = cache.stats()
+        print(f"Cache : {stats['hits']} succès, {stats['misses']} échecs ({stats['entries']} entrées).")
+        cache.close()
+        if index is not None:
+            stats = index.stats()
+            print(f"Index : {stats['hits']} athlètes-saisons trouvés, {stats['misses']} recherchés sur athle.")
+            index.close()
+        if parse_pool is not None:
+            parse_pool.close()
+        if store is not None:
+            stats = store.stats()
+            print(f"Inscrits : {stats['unchanged_pages']} pages inchangées, {stats['changed_pages']} analysées.")
+            store.close()
+        stats = resolver.stats()
+        print(f"Noms : {stats['remembered']} découpages repris, {stats['confirmed']} nouveaux confirmés, "
+              f"{stats['forgotten']} oubliés.")
+        resolver.close()
+        if args.metrics:
+            METRICS.export_jsonl(args.metrics, label="batch")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,569 @@
+import argparse
+import ctypes
+import gc
+import json
+import multiprocessing
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import requests
+from bs4 import BeautifulSoup
+from lxml import etree
+
+import baseathle
+from baseathle import AthleLookup
+import pandas as pd
+from analyse_parallele import ParsePool, default_processes
+from classement import IncrementalRanking, performances_to_frame, rank_performances, ranking_table
+from concurrence import AIMDController
+from export_classement import ranking_bytes, write_ranking
+from mesures import METRICS
+from moteur_athle import create_engine
+from parse_athle import (TRAIL, clear_memos, course_distance, parse_performance_rows, parse_performances,
+                         parse_time, performances_to_json)
+from pipeline import EventPipeline, split_runner_name
+from recup_klikego import extract_runners, fetch_all_runners, fetch_course_options, parse_course_options
+from replay_server import (DEFAULT_ATHLE_ROWS, SAMPLE_COURSES, ReplayServer, athle_fixture_page,
+                           klikego_course_page, klikego_runners_page)
+from resolution_noms import NameResolver
+
+
+def _legacy_extract_runners(html_content: str) -> List[str]:
+    # Ancien extracteur BeautifulSoup (html.parser), conservé comme référence
+    soup = BeautifulSoup(html_content, 'html.parser')
+    runners = []
+    table = soup.find('table', class_='table table-sm table-bordered table-striped')
+    if not table:
+        return runners
+    for row in table.find_all('tr', class_='mt-1'):
+        cells = row.find_all('td')
+        if not cells:
+            continue
+        dossard_tag = cells[0].find('b')
+        if dossard_tag and dossard_tag.get_text(strip=True).isdigit():
+            if len(cells) <= 1:
+                continue
+            name_cell = cells[1]
+        else:
+            name_cell = cells[0]
+        name_divs = name_cell.find_all('div')
+        if len(name_divs) > 1:
+            runners.append(name_divs[1].get_text(strip=True))
+    return runners
+
+
+def _legacy_course_options(html_content: str):
+    # Ancienne lecture BeautifulSoup de <select id="course">
+    course_select = BeautifulSoup(html_content, 'html.parser').find('select', {'id': 'course'})
+    if not course_select:
+        raise ValueError("Impossible de trouver la liste d'épreuves (select id='course').")
+    course_options = {}
+    for option in course_select.find_all('option'):
+        text = option.text.strip()
+        value = option.get('value', '').strip()
+        if text and value:
+            course_options[text] = value
+    if not course_options:
+        raise ValueError("Aucune épreuve trouvée dans le select id='course'.")
+    return course_options
+
+
+def _legacy_time_seconds(time_text: str):
+    # Ancienne chaîne if/elif de fetch_performance_data, conservée comme référence de vitesse
+    hours = minutes = seconds = 0
+    try:
+        if "h" in time_text and "'" in time_text and "''" in time_text:
+            time_parts = re.split("[h'’\"]+", time_text)
+            if len(time_parts) >= 3:
+                hours, minutes, seconds = int(time_parts[0]), int(time_parts[1]), int(time_parts[2])
+        elif "'" in time_text and "''" in time_text:
+            time_parts = re.split("['’\"]+", time_text)
+            if len(time_parts) >= 2:
+                minutes, seconds = int(time_parts[0]), int(time_parts[1])
+        elif "'" in time_text and "''" not in time_text:
+            time_parts = time_text.split("'")
+            if len(time_parts) == 2:
+                minutes, seconds = int(time_parts[0]), int(time_parts[1])
+        elif ":" in time_text:
+            time_parts = time_text.split(":")
+            if len(time_parts) == 3:
+                hours, minutes, seconds = int(time_parts[0]), int(time_parts[1]), int(time_parts[2])
+            elif len(time_parts) == 2:
+                minutes, seconds = int(time_parts[0]), int(time_parts[1])
+        elif "h" in time_text:
+            time_parts = re.split("[h'’\"]+", time_text)
+            if len(time_parts) >= 2:
+                hours = int(time_parts[0])
+                min_sec_parts = time_parts[1].split("'")
+                minutes = int(min_sec_parts[0])
+                seconds = int(min_sec_parts[1]) if len(min_sec_parts) == 2 else 0
+        else:
+            return None
+    except ValueError:
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _legacy_course_distance(course_name: str):
+    # Ancienne détection de distance : jusqu'à six recherches de sous-chaînes puis une regex
+    if any(trail in course_name for trail in ["trail xxs", "trail xs", "trail s", "trail l", "trail xl", "trail m"]):
+        return TRAIL
+    if 'semi marathon' in course_name:
+        return 21.0
+    if '1/2' in course_name and 'marathon' in course_name:
+        return 21.0
+    if 'semi_marathon' in course_name or 'half marathon' in course_name:
+        return 21.0
+    if 'marathon' in course_name:
+        return 42.0
+    match = re.search(r'(?<!semi )(\d+)\s?km', course_name)
+    return float(match.group(1)) if match else None
+
+
+def bench_parsers(repeat: int) -> List[str]:
+    """
+    Compare les analyseurs précompilés (parse_athle) à l'ancienne chaîne if/elif
+    (corpus de référence : test_parse_athle.py).
+    """
+    rng = random.Random(0)
+    times = []
+    for _ in range(50000):
+        seconds = rng.randint(15 * 60, 4 * 3600)
+        h, m, sec = seconds // 3600, (seconds % 3600) // 60, seconds % 60
+        times.append(rng.choice([f"{h}h{m:02d}'{sec:02d}''", f"{h * 60 + m}'{sec:02d}''", f"{h}:{m:02d}:{sec:02d}"]))
+    courses = [rng.choice(SAMPLE_COURSES).lower() for _ in range(50000)]
+    lines = [f"Analyse de {len(times)} temps et {len(courses)} noms de courses :"]
+    for label, legacy, current, values in [("temps", _legacy_time_seconds, parse_time, times),
+                                           ("distances", _legacy_course_distance, course_distance, courses)]:
+        before = _time_per_call(lambda v: [legacy(x) for x in v], values, repeat)
+        clear_memos()
+        cold = _time_per_call(lambda v: [current(x) for x in v], values, 1)
+        warm = _time_per_call(lambda v: [current(x) for x in v], values, repeat)
+        lines.append(f"  {label:<10}: {before * 1000:.1f} ms -> {cold * 1000:.1f} ms à froid (x{before / cold:.1f}), "
+                     f"{warm * 1000:.1f} ms mémo chaud (x{before / warm:.1f})")
+    return lines
+
+
+def synthetic_performances(count: int, athletes: int, seed: int = 0) -> List[dict]:
+    """
+    Génère `count` performances au format de parse_athle, réparties sur `athletes` athlètes.
+    """
+    rng = random.Random(seed)
+    profiles = [(f"Prenom{i} NOM{i}", rng.randint(1950, 2012), rng.choice("mf")) for i in range(athletes)]
+    performances = []
+    for _ in range(count):
+        athlete, birth_year, sex = profiles[rng.randrange(athletes)]
+        distance_km = rng.choice([5.0, 10.0, 15.0, 21.0, 42.0, None])
+        total_seconds = rng.randint(900, 18000)
+        speed_kph = distance_km / (total_seconds / 3600) if distance_km else 0
+        performances.append({
+            "course_name": f"{distance_km} km", "distance_km": distance_km, "time": "-",
+            "total_seconds": total_seconds, "speed_kph": speed_kph,
+            "birth_year": birth_year if rng.random() < 0.95 else None, "sex": sex, "athlete": athlete,
+        })
+    return performances
+
+
+def _parse_roundtrip(content: bytes):
+    # Ancienne chaîne : BeautifulSoup -> str -> etree.HTML
+    soup = BeautifulSoup(content, 'html.parser')
+    return parse_performance_rows(etree.HTML(str(soup)))
+
+
+def _time_per_call(func: Callable, arg, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(arg)
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_parse(rows: int, repeat: int) -> List[str]:
+    """
+    Compare le temps d'analyse par page de l'ancienne chaîne et du parseur lxml.
+    """
+    page = athle_fixture_page(rows)
+    before = _time_per_call(_parse_roundtrip, page, repeat)
+    after = _time_per_call(parse_performances, page, repeat)
+    return [
+        f"Page athle de {rows} lignes :",
+        f"  BeautifulSoup -> str -> etree : {before * 1000:.2f} ms/page",
+        f"  lxml une passe               : {after * 1000:.2f} ms/page (x{before / after:.1f})",
+    ]
+
+
+def _rank_with_dicts(performances: List[dict], min_age: int, max_age: int, speed_threshold: float,
+                     min_distance_km: float, sex_filter: str) -> pd.DataFrame:
+    # Ancienne chaîne : boucles sur des dicts puis apply ligne à ligne
+    filtered = baseathle.filter_performances(performances, min_distance_km, sex_filter)
+    filtered = baseathle.filter_performances_by_age(filtered, min_age, max_age)
+    best = pd.DataFrame(baseathle.calculate_best_performance(filtered, speed_threshold).values())
+    best = best.sort_values(by="speed_kph", ascending=False, kind="stable")
+    best["Temps"] = best["total_seconds"].apply(lambda s: f"{s // 3600}h {(s % 3600) // 60}min {s % 60}s")
+    return best
+
+
+def bench_ranking(count: int, repeat: int) -> List[str]:
+    """
+    Compare le classement par boucles de dicts au moteur vectorisé de classement.py.
+    """
+    performances = synthetic_performances(count, max(1, count // 20))
+    settings = dict(min_age=18, max_age=60, speed_threshold=25, min_distance_km=5, sex_filter="f")
+
+    start = time.perf_counter()
+    frame = performances_to_frame(performances)
+    build = time.perf_counter() - start
+
+    ranked = rank_performances(frame, **settings)
+    before = _time_per_call(lambda p: _rank_with_dicts(p, **settings), performances, repeat)
+    # Temps formaté des deux côtés : l'ancienne chaîne le calculait ligne à ligne
+    after = _time_per_call(lambda f: ranking_table(rank_performances(f, **settings)), frame, repeat)
+    return [
+        f"Classement de {count} performances ({len(ranked)} athlètes classés) :",
+        f"  boucles sur dicts     : {before * 1000:.1f} ms",
+        f"  vectorisé (pandas)    : {after * 1000:.1f} ms (x{before / after:.1f}), "
+        f"construction unique du DataFrame : {build * 1000:.1f} ms",
+    ]
+
+
+def bench_backends(athletes: int, rows: int, latency: float) -> List[str]:
+    """
+    Débit des moteurs "threads" et "asyncio" face à un serveur athle local.
+    """
+    names = [(f"Nom{i}", "Prenom") for i in range(athletes)]
+    lines = [f"{athletes} athlètes, pages de {rows} lignes, latence {latency * 1000:.0f} ms :"]
+    with ReplayServer(athle_rows=rows, latency=latency) as server, server.patched():
+        for backend, concurrency, adaptive in [("threads", 15, False), ("threads", 100, False),
+                                               ("threads", 100, True), ("asyncio", 100, False),
+                                               ("asyncio", 300, False), ("asyncio", 300, True)]:
+            controller = None if adaptive else AIMDController(concurrency, concurrency, concurrency)
+            with create_engine(backend, concurrency=concurrency, controller=controller,
+                               rate_limiter=None) as engine:
+                start = time.perf_counter()
+                for _ in engine.fetch_many(names, 0):
+                    pass
+                elapsed = time.perf_counter() - start
+                label = f"AIMD <= {concurrency} (fin : {engine.controller.limit})" if adaptive else f"x{concurrency}"
+            lines.append(f"  {backend:<8} {label:<24}: {athletes / elapsed:8.1f} requêtes/s")
+    return lines
+
+
+def _run_e2e(backend: str, race_size: int, rows: int, latency: float, error_rate: float,
+             trace_memory: bool = False) -> dict:
+    # Un parcours complet de l'application (épreuves, inscrits, athle, classements) face au serveur de rejeu
+    settings = dict(min_age=18, max_age=60, speed_threshold=25, min_distance_km=5)
+    with ReplayServer(courses={"1": race_size}, athle_rows=rows, latency=latency,
+                      error_rate=error_rate) as server, server.patched():
+        if trace_memory:
+            tracemalloc.start()
+        METRICS.reset()
+        start = time.perf_counter()
+        with requests.Session() as session:
+            fetch_course_options(session, "replay")
+            listing_start = time.perf_counter()
+            runners = fetch_all_runners(session, "1", "replay")
+            listing = time.perf_counter() - listing_start
+            pages = server.stats().get("findInInscrits", 0)
+            with create_engine(backend, rate_limiter=None) as engine:
+                athle_start = time.perf_counter()
+                live = IncrementalRanking(k=50, **settings)
+                performances = []
+                pipeline = EventPipeline(session, "replay", ["1"], engine, 0)
+                for _, athlete_performances in pipeline:
+                    if athlete_performances:
+                        performances.extend(athlete_performances)
+                        live.add(athlete_performances)
+                athle = time.perf_counter() - athle_start
+            ranked = rank_performances(performances_to_frame(performances), **settings)
+        elapsed = time.perf_counter() - start
+        peak = 0
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        stats = server.stats()
+    if len(runners) != race_size or pipeline.completed != race_size:
+        raise AssertionError(f"{len(runners)} inscrits et {pipeline.completed} athlètes traités au lieu de {race_size}.")
+    return {
+        "pages_per_second": pages / listing, "athle_per_second": stats.get("athle", 0) / athle,
+        "errors": stats.get("errors", 0), "ranked": len(ranked), "elapsed": elapsed, "peak": peak,
+        "stages": METRICS.snapshot(),
+    }
+
+
+def bench_e2e(race_size: int, rows: int, latency: float, error_rate: float, repeat: int) -> List[str]:
+    """
+    Parcours complet de l'application face au serveur de rejeu : liste des épreuves,
+    pages d'inscrits, puis pipeline inscrits -> athle -> classement (live et final)
+    pour chaque moteur. Rapporte le débit, le temps d'analyse par page, le temps total
+    et, lors d'un second parcours sous tracemalloc, le pic mémoire Python.
+    """
+    klikego_page = klikego_runners_page("1", 0, race_size).decode("utf-8")
+    athle_page = athle_fixture_page(rows)
+    lines = [
+        f"Épreuve de {race_size} inscrits, pages athle de {rows} lignes, latence {latency * 1000:.0f} ms, "
+        f"{error_rate:.0%} d'erreurs athle :",
+        f"  analyse : {_time_per_call(extract_runners, klikego_page, repeat) * 1000:.2f} ms/page d'inscrits, "
+        f"{_time_per_call(parse_performances, athle_page, repeat) * 1000:.2f} ms/page athle",
+    ]
+    for backend in ("threads", "asyncio"):
+        run = _run_e2e(backend, race_size, rows, latency, error_rate)
+        peak = _run_e2e(backend, race_size, rows, latency, error_rate, trace_memory=True)["peak"]
+        lines.append(
+            f"  {backend:<8}: inscrits {run['pages_per_second']:6.1f} pages/s, athle {run['athle_per_second']:7.1f} "
+            f"requêtes/s ({run['errors']} erreurs injectées), {run['ranked']} classés, "
+            f"total {run['elapsed']:.2f} s, pic mémoire {peak / 2 ** 20:.1f} Mo"
+        )
+        lines.append("            " + ", ".join(
+            f"{stage} {stats['mean'] * 1000:.1f} ms x{stats['count']} (p95 {stats['p95'] * 1000:.0f} ms)"
+            for stage, stats in run["stages"].items()
+        ))
+    return lines
+
+
+def bench_parse_pool(pages: int, rows: int, workers: int, latency: float,
+                     processes: Optional[int] = None) -> List[str]:
+    """
+    Étage d'analyse dans les threads d'entrée/sortie ou dans un pool de processus :
+    `workers` threads « téléchargent » (attente de `latency` secondes) puis analysent
+    chacun leurs pages athle, soit eux-mêmes (GIL), soit en les confiant au ParsePool.
+    """
+    contents = [athle_fixture_page(rows, seed=seed) for seed in range(pages)]
+
+    def run(parse) -> float:
+        def fetch_and_parse(content):
+            time.sleep(latency)
+            return parse(content)
+        with ThreadPoolExecutor(max_workers=workers) as io_workers:
+            start = time.perf_counter()
+            list(io_workers.map(fetch_and_parse, contents))
+        return time.perf_counter() - start
+
+    clear_memos()
+    before = run(parse_performances)
+    with ParsePool(processes) as pool:
+        # Démarrage des processus hors mesure
+        with ThreadPoolExecutor(max_workers=pool.processes) as warmup:
+            list(warmup.map(pool.parse_performances, contents[:pool.processes]))
+        after = run(pool.parse_performances)
+        used = pool.processes
+    return [
+        f"{pages} pages athle de {rows} lignes, {workers} threads d'E/S, latence {latency * 1000:.0f} ms, "
+        f"{default_processes()} cœur(s) :",
+        f"  analyse dans les threads d'E/S : {pages / before:7.1f} pages/s",
+        f"  pool de {used} processus        : {pages / after:7.1f} pages/s (x{before / after:.2f})",
+    ]
+
+
+def _retained_memory(build: Callable[[], list]) -> tuple:
+    # Mémoire encore allouée à la fin de build() : ce que le résultat garde en vie
+    tracemalloc.start()
+    result = build()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained
+
+
+def bench_memory(runners: int, seasons: int = 2, rows: int = DEFAULT_ATHLE_ROWS) -> List[str]:
+    """
+    Mémoire des performances d'un lot de `runners` inscrits sur `seasons` saisons :
+    anciens dicts (chaînes recréées pour chaque ligne, comme à la sortie du parseur ou
+    du cache JSON) contre enregistrements Performance à __slots__ et chaînes internées.
+    """
+    pages = [(f"Prenom{i} NOM{i}", seed) for i in range(runners) for seed in (i * seasons + s for s in range(seasons))]
+
+    def as_dicts():
+        performances = []
+        for name, seed in pages:
+            legacy = json.loads(performances_to_json(parse_performances(athle_fixture_page(rows, seed))))
+            performances.extend(dict(p, athlete=name) for p in legacy)
+        return performances
+
+    def as_records():
+        performances = []
+        for name, seed in pages:
+            performances.extend(p.with_athlete(name) for p in parse_performances(athle_fixture_page(rows, seed)))
+        return performances
+
+    parse_performances(athle_fixture_page(rows))
+    _, before = _retained_memory(as_dicts)
+    records, after = _retained_memory(as_records)
+    count = len(records)
+    return [
+        f"{runners} inscrits x {seasons} saisons, pages de {rows} lignes : {count} performances",
+        f"  dicts               : {before / 2 ** 20:7.1f} Mo ({before / count:.0f} octets/performance)",
+        f"  Performance (slots) : {after / 2 ** 20:7.1f} Mo ({after / count:.0f} octets/performance, "
+        f"-{1 - after / before:.0%})",
+    ]
+
+
+def bench_klikego(rows: int, repeat: int) -> List[str]:
+    """
+    Compare les temps des extracteurs lxml de recup_klikego et des anciens extracteurs
+    BeautifulSoup sur une page de `rows` inscrits et une liste de 50 épreuves
+    (cas particuliers vérifiés par test_recup_klikego.py).
+    """
+    page = klikego_runners_page("1", 0, rows, per_page=rows).decode("utf-8")
+    course_page = klikego_course_page({str(i): 100 for i in range(50)}).decode("utf-8")
+    lines = ["Extraction Klikego :"]
+    for label, legacy, current, html in [(f"page de {rows} inscrits", _legacy_extract_runners, extract_runners, page),
+                                         ("liste de 50 épreuves", _legacy_course_options, parse_course_options,
+                                          course_page)]:
+        before = _time_per_call(legacy, html, repeat)
+        after = _time_per_call(current, html, repeat)
+        lines.append(f"  {label:<22}: BeautifulSoup {before * 1000:.2f} ms -> lxml {after * 1000:.2f} ms "
+                     f"(x{before / after:.1f})")
+    return lines
+
+
+def name_population(runners: int):
+    """
+    Inscrits tels qu'écrits sur Klikego et licenciés athle correspondants ((nom, prénom) -> profil) :
+    noms composés sans indice de casse, prénoms accentués enregistrés sans accents sur athle,
+    « Prénom NOM », noms simples et non-licenciés, à parts égales.
+    """
+    names, licensees = [], {}
+    for i in range(runners):
+        profile = (i % 100, "MF"[i % 2])
+        kind = i % 5
+        if kind == 0:
+            names.append(f"Nom{i} Bis{i} Prenom{i}")
+            licensees[(f"nom{i} bis{i}", f"prenom{i}")] = profile
+        elif kind == 1:
+            names.append(f"Nom{i} Hélène{i}")
+            licensees[(f"nom{i}", f"helene{i}")] = profile
+        elif kind == 2:
+            names.append(f"Prenom{i} NOM{i}")
+            licensees[(f"nom{i}", f"prenom{i}")] = profile
+        elif kind == 3:
+            names.append(f"Nom{i} Prenom{i}")
+            licensees[(f"nom{i}", f"prenom{i}")] = profile
+        else:
+            names.append(f"Absent{i} Prenom{i}")
+    return names, licensees
+
+
+def bench_names(runners: int) -> List[str]:
+    """
+    Résolution des noms face à un serveur athle qui ne connaît que les licenciés :
+    découpage historique (premier mot = nom), puis NameResolver au premier passage
+    (découpages essayés tour à tour) et au second (découpages confirmés mémorisés).
+    """
+    names, licensees = name_population(runners)
+    athletes = [split_runner_name(name) for name in names]
+    lines = [f"{runners} inscrits dont {len(licensees)} licenciés athle :"]
+    with ReplayServer(licensees=licensees) as server, server.patched(), tempfile.TemporaryDirectory() as tmp:
+        for backend in ("threads", "asyncio"):
+            resolver = NameResolver(f"{tmp}/{backend}.sqlite")
+            for label, engine_resolver in [("premier mot = nom", None), ("résolution, 1er passage", resolver),
+                                           ("résolution, 2e passage", resolver)]:
+                requests_before = server.stats().get("athle", 0)
+                with create_engine(backend, rate_limiter=None, lookup=AthleLookup(resolver=engine_resolver)) as engine:
+                    results = {athlete: performances for athlete, performances in engine.fetch_many(athletes, 0)}
+                sent = server.stats().get("athle", 0) - requests_before
+                resolved = sum(1 for performances in results.values() if performances)
+                lines.append(f"  {backend:<8} {label:<24}: {resolved:5d} résolus, {sent:5d} requêtes athle "
+                             f"({sent / max(resolved, 1):.2f} par inscrit résolu)")
+            resolver.close()
+    return lines
+
+
+def synthetic_ranking(rows: int):
+    """Classement mis en forme (ranking_table) de `rows` performances synthétiques."""
+    return ranking_table(performances_to_frame(synthetic_performances(rows, rows)))
+
+
+def _memory_kib(field: str) -> int:
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith(field))
+
+
+def _export_peak(method: str, rows: int, path: str) -> tuple:
+    # Dans un processus neuf : pic de mémoire résidente (Linux) pendant le seul export du classement
+    table = synthetic_ranking(rows)
+    # Mémoire libérée par la construction du classement rendue au système avant la mesure
+    gc.collect()
+    ctypes.CDLL("libc.so.6").malloc_trim(0)
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    before = _memory_kib("VmRSS:")
+    start = time.perf_counter()
+    if method == "to_parquet":
+        table.to_parquet(path, index=False)
+    elif method == "to_csv":
+        size = len(table.to_csv(index=False).encode("utf-8"))
+    elif method == "csv_bytes":
+        size = len(ranking_bytes(table, "csv"))
+    elif method == "parquet_bytes":
+        size = len(ranking_bytes(table, "parquet"))
+    else:
+        write_ranking(table, path, method)
+    elapsed = time.perf_counter() - start
+    if not method.endswith("bytes") and method != "to_csv":
+        size = os.path.getsize(path)
+    return (_memory_kib("VmHWM:") - before) * 1024, elapsed, size
+
+
+def bench_export(rows: int) -> List[str]:
+    """
+    Export d'un classement de `rows` lignes : anciens exports complets (DataFrame.to_parquet,
+    to_csv().encode() du bouton de téléchargement) et écriture en flux par groupes de lignes
+    (export_classement). Chaque mesure tourne dans un processus neuf (pic de mémoire résidente).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        lines = [f"Export d'un classement de {rows} lignes (pic de mémoire résidente pendant l'export) :"]
+        context = multiprocessing.get_context("spawn")
+        for label, method in [("fichier, DataFrame.to_parquet", "to_parquet"),
+                              ("fichier Parquet en flux", "parquet"), ("fichier Arrow en flux", "arrow"),
+                              ("téléchargement, to_csv().encode()", "to_csv"),
+                              ("téléchargement CSV en flux", "csv_bytes"),
+                              ("téléchargement Parquet en flux", "parquet_bytes")]:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as child:
+                peak, elapsed, size = child.submit(_export_peak, method, rows, f"{tmp}/{method}").result()
+            lines.append(f"  {label:<34}: +{peak / 2 ** 20:6.1f} Mo, {elapsed:5.2f} s, "
+                         f"fichier {size / 2 ** 20:5.1f} Mo")
+    return lines
+
+
+BENCHMARKS = {
+    "parse": lambda args: bench_parse(args.rows, args.repeat),
+    "parsers": lambda args: bench_parsers(args.repeat),
+    "backends": lambda args: bench_backends(args.athletes, args.rows, args.latency),
+    "ranking": lambda args: bench_ranking(args.performances, max(1, args.repeat // 5)),
+    "klikego": lambda args: bench_klikego(args.rows, args.repeat),
+    "e2e": lambda args: bench_e2e(args.athletes, args.rows, args.latency, args.error_rate, args.repeat),
+    "memory": lambda args: bench_memory(args.runners),
+    "names": lambda args: bench_names(args.athletes),
+    "export": lambda args: bench_export(args.ranking_rows),
+    "parse-pool": lambda args: bench_parse_pool(args.athletes, args.rows, args.workers, args.latency,
+                                                args.processes),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du scraping Klikego / athle.")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ["all"])
+    parser.add_argument("--rows", type=int, default=300, help="Nombre de lignes par page générée.")
+    parser.add_argument("--repeat", type=int, default=20, help="Nombre de répétitions par mesure.")
+    parser.add_argument("--athletes", type=int, default=500, help="Nombre d'athlètes simulés.")
+    parser.add_argument("--performances", type=int, default=500000, help="Taille du jeu de performances synthétique.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latence simulée du serveur (secondes).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction de réponses athle en erreur 503.")
+    parser.add_argument("--runners", type=int, default=10000, help="Nombre d'inscrits du lot (memory).")
+    parser.add_argument("--ranking-rows", type=int, default=300000, help="Lignes du classement exporté (export).")
+    parser.add_argument("--workers", type=int, default=32, help="Threads d'entrée/sortie simulés (parse-pool).")
+    parser.add_argument("--processes", type=int, help="Processus d'analyse (par défaut : un par cœur).")
+    args = parser.parse_args()
+
+    names = sorted(BENCHMARKS) if args.benchmark == "all" else [args.benchmark]
+    for name in names:
+        for line in BENCHMARKS[name](args):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
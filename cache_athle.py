@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from parse_athle import Performance, performances_from_json, performances_to_json
+
+DEFAULT_CACHE_PATH = "athle_cache.sqlite"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 50000
+# Dates de dernier accès gardées en mémoire et écrites par lots (une transaction pour tout le lot)
+ACCESS_FLUSH_SIZE = 500
+# Au-delà de la taille maximale, 1 % des entrées est évincé d'un coup : le recomptage ne se fait
+# qu'une fois par lot d'insertions, pas à chaque insertion une fois le cache plein
+EVICTION_FRACTION = 0.01
+
+
+class PerformanceCache:
+    """
+    Cache persistant (SQLite) des performances bases.athle.fr déjà analysées.
+    Clé : (nom, prénom, saison). Les entrées expirent après `ttl_seconds`
+    et les moins récemment utilisées sont évincées au-delà de `max_entries`.
+    Un succès ne touche pas la base : sa date d'accès est écrite avec les suivantes, par lots
+    de ACCESS_FLUSH_SIZE, avant chaque éviction et à la fermeture. Le nombre d'entrées est tenu
+    à jour à chaque écriture ; il n'est recompté (autres processus sur la même base) qu'avant
+    d'évincer, par lots de EVICTION_FRACTION de `max_entries`.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS performances (
+                last_name TEXT NOT NULL,
+                first_name TEXT NOT NULL,
+                season TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (last_name, first_name, season)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON performances (last_access)")
+        self._conn.commit()
+        self._entries = self._count()
+        self._accessed: Dict[tuple, float] = {}
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM performances").fetchone()[0]
+
+    def _flush_accesses(self) -> None:
+        # Appelé sous le verrou
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE performances SET last_access = ? WHERE last_name = ? AND first_name = ? AND season = ?",
+                [(accessed_at, *key) for key, accessed_at in self._accessed.items()]
+            )
+            self._conn.commit()
+            self._accessed.clear()
+
+    @staticmethod
+    def _key(last_name: str, first_name: str, season: str):
+        return last_name.strip().lower(), first_name.strip().lower(), str(season)
+
+    def get(self, last_name: str, first_name: str, season: str,
+            final_after: Optional[float] = None) -> Optional[List[Performance]]:
+        """
+        Renvoie les performances en cache, ou None si absentes ou expirées.
+        Une entrée enregistrée après `final_after` (fin de la saison, baseathle.season_end)
+        est définitive et n'expire pas ; les autres suivent le TTL.
+        """
+        key = self._key(last_name, first_name, season)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, created_at FROM performances WHERE last_name = ? AND first_name = ? AND season = ?",
+                key
+            ).fetchone()
+            final = final_after is not None and row is not None and row[1] >= final_after
+            if row is None or (not final and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds):
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                self._flush_accesses()
+            self.hits += 1
+        return performances_from_json(row[0])
+
+    def set(self, last_name: str, first_name: str, season: str, performances: List[Performance]) -> None:
+        """
+        Enregistre les performances d'un athlète puis évince les entrées
+        les moins récemment utilisées si la taille maximale est dépassée.
+        """
+        key = self._key(last_name, first_name, season)
+        now = time.time()
+        data = performances_to_json(performances)
+        with self._lock:
+            self._accessed.pop(key, None)
+            updated = self._conn.execute(
+                "UPDATE performances SET data = ?, created_at = ?, last_access = ? "
+                "WHERE last_name = ? AND first_name = ? AND season = ?",
+                (data, now, now, *key)
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO performances "
+                    "(last_name, first_name, season, data, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, data, now, now)
+                )
+                self._entries += 1
+            if self._entries > self.max_entries:
+                self._flush_accesses()
+                self._entries = self._count()
+                if self._entries > self.max_entries:
+                    keep = self.max_entries - int(self.max_entries * EVICTION_FRACTION)
+                    self._entries -= self._conn.execute(
+                        "DELETE FROM performances WHERE rowid IN "
+                        "(SELECT rowid FROM performances ORDER BY last_access ASC LIMIT ?)",
+                        (self._entries - keep,)
+                    ).rowcount
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Compteurs de succès/échecs et nombre d'entrées stockées.
+        """
+        with self._lock:
+            size = self._count()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": size,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM performances")
+            self._conn.commit()
+            self._entries = 0
+            self._accessed.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_accesses()
+            self._conn.close()
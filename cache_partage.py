@@ -0,0 +1,226 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+# Durée de vie des listes d'inscrits (les inscriptions évoluent jusqu'au jour de la course)
+LISTING_TTL_SECONDS = 10 * 60
+# Durée de vie des performances d'une saison en cours (les saisons closes n'expirent pas)
+PERFORMANCE_TTL_SECONDS = 60 * 60
+
+
+def approximate_size(value: Any) -> int:
+    """
+    Taille mémoire approchée (octets) d'une valeur faite de listes, tuples, dicts,
+    enregistrements (Mapping à __slots__, dont les clés ne coûtent rien) et scalaires.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    elif isinstance(value, Mapping):
+        size += sum(approximate_size(v) for v in value.values())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approximate_size(item) for item in value)
+    return size
+
+
+def is_cacheable(value: Any) -> bool:
+    # Par défaut, None signale un échec et n'est pas mis en cache
+    return value is not None
+
+
+class _Flight:
+    """Récupération en cours d'une clé, attendue par tous les demandeurs concurrents."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[Exception] = None
+        # Meneur interrompu (annulation, arrêt) : les demandeurs en attente reprennent la main
+        self.abandoned = False
+        # Coroutines en attente : (boucle, asyncio.Event), réveillées à l'atterrissage
+        self.async_waiters = []
+
+
+class SharedCache:
+    """
+    Cache mémoire commun à tout le processus (toutes les sessions Streamlit, tous les threads),
+    pour les pages d'inscrits Klikego et les performances athle :
+    - coalescence des requêtes en vol (« single flight ») : les demandes concurrentes d'une même
+      clé attendent l'unique récupération en cours au lieu d'interroger le site chacune,
+    - éviction LRU dès que la taille approchée des valeurs dépasse `max_bytes`,
+    - durée de vie optionnelle par entrée.
+    Les échecs (exceptions, valeurs non `cacheable`) sont transmis aux demandeurs en attente
+    mais jamais mis en cache. `clock` (time.monotonic par défaut) date les expirations.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        # clé -> (valeur, taille, date d'expiration ou None), de la moins à la plus récemment utilisée
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable):
+        # Appelé sous verrou
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] is not None and entry[2] < self.clock():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def _claim(self, key: Hashable):
+        """Renvoie ("hit", valeur), ("wait", vol en cours) ou ("lead", nouveau vol)."""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return "hit", entry[0]
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return "wait", flight
+            self.misses += 1
+            flight = self._flights[key] = _Flight()
+            return "lead", flight
+
+    def _land(self, key: Hashable, flight: _Flight, value: Any, error: Optional[BaseException],
+              ttl: Optional[float], cacheable: Callable[[Any], bool]) -> None:
+        if error is None and cacheable(value):
+            self.set(key, value, ttl)
+        if error is not None and not isinstance(error, Exception):
+            flight.abandoned = True
+        flight.value, flight.error = value, error
+        with self._lock:
+            del self._flights[key]
+            flight.done.set()
+        for loop, event in flight.async_waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+
+    async def _wait_async(self, flight: _Flight) -> None:
+        # Inscription sous verrou : l'atterrissage ne peut pas passer entre le test et l'attente
+        event = asyncio.Event()
+        with self._lock:
+            if flight.done.is_set():
+                return
+            flight.async_waiters.append((asyncio.get_running_loop(), event))
+        await event.wait()
+
+    @staticmethod
+    def _result(flight: _Flight) -> Any:
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._lookup(key)
+            return default if entry is None else entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        size = approximate_size(value)
+        if size > self.max_bytes:
+            return
+        expires_at = self.clock() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any], ttl: Optional[float] = None,
+                     cacheable: Callable[[Any], bool] = is_cacheable) -> Any:
+        """
+        Renvoie la valeur en cache, sinon attend la récupération déjà en cours pour cette clé,
+        sinon appelle `fetch()` dans le thread courant et partage son résultat.
+        """
+        state, found = self._claim(key)
+        while state == "wait":
+            found.done.wait()
+            if not found.abandoned:
+                return self._result(found)
+            state, found = self._claim(key)
+        if state == "hit":
+            return found
+        try:
+            value = fetch()
+        except BaseException as exc:
+            self._land(key, found, None, exc, ttl, cacheable)
+            raise
+        self._land(key, found, value, None, ttl, cacheable)
+        return value
+
+    async def get_or_fetch_async(self, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+                                 ttl: Optional[float] = None,
+                                 cacheable: Callable[[Any], bool] = is_cacheable) -> Any:
+        """
+        Variante asyncio de get_or_fetch : `fetch` est une coroutine. L'attente d'une récupération
+        menée par un autre thread ne bloque pas la boucle : elle est réveillée à l'atterrissage.
+        """
+        state, found = self._claim(key)
+        while state == "wait":
+            await self._wait_async(found)
+            if not found.abandoned:
+                return self._result(found)
+            state, found = self._claim(key)
+        if state == "hit":
+            return found
+        try:
+            value = await fetch()
+        except BaseException as exc:
+            self._land(key, found, None, exc, ttl, cacheable)
+            raise
+        self._land(key, found, value, None, ttl, cacheable)
+        return value
+
+    def invalidate(self, match: Callable[[Hashable], bool]) -> int:
+        """
+        Supprime les entrées dont la clé vérifie `match` (rechargement demandé par l'utilisateur) ;
+        les récupérations en cours ne sont pas interrompues. Renvoie le nombre d'entrées supprimées.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if match(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "in_flight": len(self._flights),
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,175 @@
+import heapq
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from mesures import METRICS
+
+PERFORMANCE_COLUMNS = ["athlete", "course_name", "distance_km", "time", "total_seconds", "speed_kph", "birth_year", "sex"]
+# Colonnes du classement affiché et exporté, et leur intitulé
+RANKING_COLUMNS = {
+    "athlete": "Nom complet", "birth_year": "date_of_birth", "sex": "sex", "distance_km": "distance_km",
+    "Temps": "Temps", "speed_kph": "Speed (km/h)",
+}
+
+
+def performances_to_frame(performances: Iterable[Dict]) -> pd.DataFrame:
+    """
+    Construit une seule fois le DataFrame colonnaire de toutes les performances
+    (une ligne par performance, types numériques compacts).
+    """
+    performances = list(performances)
+    columns = {column: [p.get(column) for p in performances] for column in PERFORMANCE_COLUMNS}
+    return pd.DataFrame({
+        "athlete": pd.Series(columns["athlete"], dtype="object"),
+        "course_name": pd.Series(columns["course_name"], dtype="object"),
+        "distance_km": pd.Series(columns["distance_km"], dtype="float64"),
+        "time": pd.Series(columns["time"], dtype="object"),
+        "total_seconds": pd.Series(columns["total_seconds"], dtype="int64"),
+        "speed_kph": pd.Series(columns["speed_kph"], dtype="float64"),
+        "birth_year": pd.Series(columns["birth_year"], dtype="Int64"),
+        "sex": pd.Series(columns["sex"], dtype="category"),
+    })
+
+
+def filter_frame(frame: pd.DataFrame, min_distance_km: float = 0, sex_filter: Optional[str] = None) -> pd.DataFrame:
+    """
+    Équivalent vectorisé de baseathle.filter_performances : distance minimale
+    (les distances inconnues sont conservées) et sexe (les sexes inconnus sont conservés).
+    """
+    mask = frame["distance_km"].isna() | (frame["distance_km"] >= min_distance_km)
+    if sex_filter:
+        mask &= frame["sex"].isna() | (frame["sex"] == sex_filter)
+    return frame[mask.to_numpy(dtype=bool)]
+
+
+@METRICS.timed("filter_by_age")
+def filter_frame_by_age(frame: pd.DataFrame, min_age: int, max_age: int,
+                        current_year: Optional[int] = None) -> pd.DataFrame:
+    """
+    Équivalent vectorisé de baseathle.filter_performances_by_age ; l'année courante
+    n'est calculée qu'une fois.
+    """
+    if current_year is None:
+        current_year = pd.Timestamp.now().year
+    age = current_year - frame["birth_year"]
+    mask = frame["birth_year"].notna() & (age >= min_age) & (age <= max_age)
+    return frame[mask.fillna(False).to_numpy(dtype=bool)]
+
+
+@METRICS.timed("best_performance")
+def best_performance_frame(frame: pd.DataFrame, speed_threshold: float) -> pd.DataFrame:
+    """
+    Équivalent vectorisé de baseathle.calculate_best_performance : meilleure vitesse
+    (strictement sous le seuil) de chaque athlète, la première en cas d'égalité.
+    """
+    below = frame[(frame["speed_kph"] < speed_threshold).to_numpy(dtype=bool)]
+    if below.empty:
+        return below
+    best_index = below.groupby("athlete", sort=False)["speed_kph"].idxmax()
+    return below.loc[best_index.to_numpy()]
+
+
+def format_hms(seconds: pd.Series) -> pd.Series:
+    """
+    Formate des durées en secondes en « Xh Ymin Zs », sans boucle Python.
+    """
+    values = seconds.to_numpy(dtype=np.int64)
+    hours = pd.Series(values // 3600, index=seconds.index).astype(str)
+    minutes = pd.Series((values % 3600) // 60, index=seconds.index).astype(str)
+    secs = pd.Series(values % 60, index=seconds.index).astype(str)
+    return hours + "h " + minutes + "min " + secs + "s"
+
+
+def rank_performances(frame: pd.DataFrame, min_age: int, max_age: int, speed_threshold: float,
+                      min_distance_km: float = 0, sex_filter: Optional[str] = None,
+                      current_year: Optional[int] = None) -> pd.DataFrame:
+    """
+    Enchaîne tous les filtres et renvoie la meilleure performance de chaque athlète,
+    triée par vitesse décroissante, colonnes numériques inchangées (mise en forme : ranking_table).
+    """
+    filtered = filter_frame(frame, min_distance_km, sex_filter)
+    filtered = filter_frame_by_age(filtered, min_age, max_age, current_year)
+    best = best_performance_frame(filtered, speed_threshold)
+    return best.sort_values(by="speed_kph", ascending=False, kind="stable")
+
+
+def ranking_table(best: pd.DataFrame) -> pd.DataFrame:
+    """
+    Met en forme les meilleures performances (une par athlète) avec les colonnes
+    et intitulés de l'application, triées par vitesse décroissante.
+    """
+    table = best.assign(Temps=format_hms(best["total_seconds"]))[list(RANKING_COLUMNS)]
+    table = table.rename(columns=RANKING_COLUMNS)
+    return table.sort_values(by="Speed (km/h)", ascending=False, kind="stable")
+
+
+class IncrementalRanking:
+    """
+    Classement mis à jour au fil de l'arrivée des performances :
+    meilleure performance par athlète (mêmes filtres que rank_performances)
+    et tas des K meilleurs athlètes, pour un coût O(log K) par mise à jour
+    au lieu d'une reconstruction et d'un tri complets du DataFrame.
+    """
+
+    def __init__(self, k: int = 100, min_age: int = 0, max_age: int = 200, speed_threshold: float = float("inf"),
+                 min_distance_km: float = 0, sex_filter: Optional[str] = None, current_year: Optional[int] = None):
+        self.k = k
+        self.min_age = min_age
+        self.max_age = max_age
+        self.speed_threshold = speed_threshold
+        self.min_distance_km = min_distance_km
+        self.sex_filter = sex_filter
+        self.current_year = current_year if current_year is not None else pd.Timestamp.now().year
+        self.best: Dict[str, Dict] = {}
+        # Entrées (vitesse, athlète) ; une entrée est périmée si sa vitesse n'est plus celle de `_members`
+        self._heap = []
+        self._members: Dict[str, float] = {}
+
+    def _accepts(self, performance: Dict) -> bool:
+        distance_km = performance["distance_km"]
+        if distance_km is not None and distance_km < self.min_distance_km:
+            return False
+        sex = performance["sex"]
+        if self.sex_filter and sex is not None and sex != self.sex_filter:
+            return False
+        birth_year = performance["birth_year"]
+        if not birth_year or not self.min_age <= self.current_year - birth_year <= self.max_age:
+            return False
+        return performance["speed_kph"] < self.speed_threshold
+
+    def _discard_stale(self) -> None:
+        while self._heap and self._members.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def _offer(self, athlete: str, speed: float) -> None:
+        if athlete in self._members or len(self._members) < self.k:
+            self._members[athlete] = speed
+            heapq.heappush(self._heap, (speed, athlete))
+        else:
+            self._discard_stale()
+            if speed <= self._heap[0][0]:
+                return
+            _, evicted = heapq.heapreplace(self._heap, (speed, athlete))
+            del self._members[evicted]
+            self._members[athlete] = speed
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(speed, athlete) for athlete, speed in self._members.items()]
+            heapq.heapify(self._heap)
+
+    def add(self, performances: Iterable[Dict]) -> None:
+        """Intègre les performances d'un athlète (ou d'un lot) au classement."""
+        for performance in performances:
+            if not self._accepts(performance):
+                continue
+            athlete = performance["athlete"]
+            current = self.best.get(athlete)
+            if current is None or performance["speed_kph"] > current["speed_kph"]:
+                self.best[athlete] = performance
+                self._offer(athlete, performance["speed_kph"])
+
+    def top(self) -> List[Dict]:
+        """Les K meilleures performances, triées par vitesse décroissante."""
+        athletes = sorted(self._members, key=self._members.get, reverse=True)
+        return [self.best[athlete] for athlete in athletes]
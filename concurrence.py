@@ -0,0 +1,233 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+import requests
+
+from mesures import METRICS
+
+# Statuts HTTP considérés comme transitoires (surcharge, limitation de débit)
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_RETRIES = 3
+
+
+class AIMDController:
+    """
+    Contrôleur de concurrence adaptatif façon AIMD (TCP) :
+    - démarrage lent (+1 par succès) jusqu'au premier signal de surcharge,
+    - puis augmentation additive (+1 par fenêtre de `limit` succès),
+    - diminution multiplicative sur erreur HTTP/timeout, et plus douce lorsque la
+      latence moyenne dépasse `latency_tolerance` fois la latence minimale observée
+      (et d'au moins `latency_slack` secondes, pour ignorer la gigue des serveurs rapides).
+    Une seule diminution par intervalle de latence, pour ne pas s'effondrer sur une rafale d'erreurs.
+    `clock` (time.monotonic par défaut) date les diminutions.
+    """
+
+    def __init__(self, initial: int = 15, minimum: int = 2, maximum: int = 100,
+                 backoff: float = 0.5, latency_backoff: float = 0.9, latency_tolerance: float = 3.0,
+                 latency_slack: float = 0.25, window: int = 100, clock: Callable[[], float] = time.monotonic):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.latency_backoff = latency_backoff
+        self.latency_tolerance = latency_tolerance
+        self.latency_slack = latency_slack
+        self.clock = clock
+        self._limit = float(max(minimum, min(initial, maximum)))
+        self._in_flight = 0
+        self._slow_start = True
+        self._min_latency = None
+        self._avg_latency = None
+        self._last_decrease = 0.0
+        self._outcomes = deque(maxlen=window)
+        self._condition = threading.Condition()
+        # Coroutines en attente d'une place : (boucle, asyncio.Event), réveillées par release
+        self._async_waiters = []
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def error_rate(self) -> float:
+        with self._condition:
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self._in_flight < int(self._limit):
+                self._in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        """Bloque jusqu'à ce qu'une place soit libre sous la limite courante."""
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    async def acquire_async(self) -> None:
+        """
+        Variante asyncio de acquire : la coroutine attend sans bloquer sa boucle
+        et est réveillée par release, appelé depuis n'importe quel thread.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._in_flight < int(self._limit):
+                    self._in_flight += 1
+                    return
+                event = asyncio.Event()
+                self._async_waiters.append((loop, event))
+            await event.wait()
+
+    def release(self, latency: Optional[float] = None, ok: bool = True) -> None:
+        """Libère une place et ajuste la limite selon le résultat de la requête."""
+        with self._condition:
+            self._in_flight -= 1
+            if latency is not None:
+                self._record(latency, ok)
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, event in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+
+    def _record(self, latency: float, ok: bool) -> None:
+        self._outcomes.append(ok)
+        now = self.clock()
+        if ok:
+            self._min_latency = latency if self._min_latency is None else min(self._min_latency, latency)
+            self._avg_latency = latency if self._avg_latency is None else 0.8 * self._avg_latency + 0.2 * latency
+        can_decrease = now - self._last_decrease > (self._avg_latency or 0.0)
+
+        if not ok:
+            if can_decrease:
+                self._decrease(self.backoff, now)
+        elif (self._avg_latency > self.latency_tolerance * self._min_latency
+              and self._avg_latency - self._min_latency > self.latency_slack):
+            if can_decrease:
+                self._decrease(self.latency_backoff, now)
+        elif self._slow_start:
+            self._limit = min(self.maximum, self._limit + 1)
+        else:
+            self._limit = min(self.maximum, self._limit + 1 / self._limit)
+
+    def _decrease(self, factor: float, now: float) -> None:
+        self._slow_start = False
+        self._limit = max(self.minimum, self._limit * factor)
+        self._last_decrease = now
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "error_rate": self.error_rate,
+            "avg_latency": self._avg_latency or 0.0,
+        }
+
+
+class TokenBucket:
+    """
+    Limiteur de débit à seau de jetons partagé entre threads :
+    `rate` requêtes par seconde en moyenne, rafales jusqu'à `burst`.
+    `clock` (time.monotonic par défaut) mesure le temps écoulé entre deux réservations.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Réserve un jeton et renvoie le délai (en secondes) à attendre avant de l'utiliser.
+        Utilisable depuis asyncio : `await asyncio.sleep(bucket.reserve())`.
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Délai de nouvelle tentative exponentiel avec gigue complète (« full jitter »)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class ThrottledSession:
+    """
+    Enveloppe d'une requests.Session qui applique, pour chaque GET : le limiteur de débit,
+    la limite de concurrence du contrôleur AIMD, un timeout et des nouvelles tentatives
+    avec gigue sur les échecs transitoires. S'utilise partout où une session est attendue.
+    Les mesures `<stage>_network` (requête HTTP seule) et `<stage>_queue` (limiteur, contrôleur
+    et pauses entre tentatives) sont enregistrées si `stage` est donné.
+    """
+
+    def __init__(self, session: requests.Session, controller: AIMDController,
+                 rate_limiter: Optional[TokenBucket] = None, timeout: float = DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES, stage: Optional[str] = None):
+        self.session = session
+        self.controller = controller
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.stage = stage
+
+    def _record(self, kind: str, seconds: float) -> None:
+        if self.stage is not None:
+            METRICS.record(f"{self.stage}_{kind}", seconds)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        queued = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            self.controller.acquire()
+            start = time.monotonic()
+            self._record("queue", start - queued)
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.Timeout, requests.ConnectionError):
+                latency = time.monotonic() - start
+                self._record("network", latency)
+                self.controller.release(latency, ok=False)
+                if attempt == self.max_retries:
+                    raise
+            else:
+                latency = time.monotonic() - start
+                self._record("network", latency)
+                transient = response.status_code in TRANSIENT_STATUS
+                self.controller.release(latency, ok=not transient)
+                if not transient or attempt == self.max_retries:
+                    return response
+            queued = time.monotonic()
+            time.sleep(backoff_delay(attempt))
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,128 @@
+import io
+from typing import BinaryIO, Dict, Union
+
+import pandas as pd
+
+EXPORT_FORMATS = ("parquet", "arrow", "csv")
+MIME_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+    "csv": "text/csv",
+}
+# Lignes converties et écrites à la fois : la mémoire de l'export ne dépend pas de la taille du classement
+DEFAULT_ROW_GROUP_SIZE = 10000
+
+
+class RankingWriter:
+    """
+    Écriture en flux d'un classement (ou de tout DataFrame aux mêmes colonnes) vers un fichier
+    ou un flux binaire, par groupes d'au plus `row_group_size` lignes :
+    - parquet : un groupe de lignes Parquet par tranche (pyarrow),
+    - arrow : un lot d'enregistrements du format fichier Arrow IPC par tranche (pyarrow),
+    - csv : l'en-tête une seule fois, puis les lignes de chaque tranche.
+    Seule la tranche en cours est convertie (Arrow ou texte) : le tableau complet n'est jamais
+    copié. write() peut être appelé plusieurs fois (lignes ajoutées à la suite) ; l'application,
+    le traitement par lots et write_ranking lui passent aujourd'hui un classement complet, dont
+    seule la conversion se fait par tranches.
+    """
+
+    def __init__(self, sink: Union[str, BinaryIO], output_format: str = "parquet",
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        if output_format not in EXPORT_FORMATS:
+            raise ValueError(f"Format d'export inconnu : {output_format}")
+        self.output_format = output_format
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self.row_groups = 0
+        self._owns_file = isinstance(sink, str)
+        self._file = open(sink, "wb") if self._owns_file else sink
+        self._schema = None
+        self._writer = None
+
+    def _arrow_writer(self, schema):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.output_format == "parquet":
+            return pq.ParquetWriter(self._file, schema)
+        return pa.ipc.new_file(self._file, schema)
+
+    def _file_schema(self, schema):
+        # Le format fichier Arrow IPC n'admet qu'un dictionnaire par colonne pour tout le fichier :
+        # les colonnes category y sont écrites en valeurs simples, quelles que soient les
+        # catégories de chaque DataFrame passé à write()
+        if self.output_format != "arrow":
+            return schema
+        import pyarrow as pa
+
+        for index, field in enumerate(schema):
+            if pa.types.is_dictionary(field.type):
+                schema = schema.set(index, field.with_type(field.type.value_type))
+        return schema
+
+    def _write_chunk(self, chunk: pd.DataFrame) -> None:
+        if self.output_format == "csv":
+            self._file.write(chunk.to_csv(index=False, header=self.rows == 0).encode("utf-8"))
+            return
+        import pyarrow as pa
+
+        # Schéma fixé par la première tranche (types pandas, dont Int64 et category en Parquet,
+        # conservés à la relecture)
+        if self._schema is None:
+            self._schema = self._file_schema(pa.Schema.from_pandas(chunk, preserve_index=False))
+        table = pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._arrow_writer(self._schema)
+        self._writer.write_table(table)
+
+    def write(self, frame: pd.DataFrame) -> None:
+        """Ajoute les lignes de `frame`, une tranche de `row_group_size` lignes après l'autre."""
+        for start in range(0, len(frame), self.row_group_size):
+            chunk = frame.iloc[start:start + self.row_group_size]
+            self._write_chunk(chunk)
+            self.rows += len(chunk)
+            self.row_groups += 1
+
+    def close(self, empty: pd.DataFrame = None) -> None:
+        """
+        Termine le fichier. Sans aucune ligne écrite, `empty` (DataFrame vide aux bonnes colonnes)
+        en fournit l'en-tête ou le schéma.
+        """
+        if self.rows == 0 and empty is not None:
+            if self.output_format == "csv":
+                self._file.write(empty.iloc[:0].to_csv(index=False).encode("utf-8"))
+            else:
+                import pyarrow as pa
+
+                schema = self._file_schema(pa.Schema.from_pandas(empty.iloc[:0], preserve_index=False))
+                self._writer = self._arrow_writer(schema)
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def write_ranking(table: pd.DataFrame, sink: Union[str, BinaryIO], output_format: str = "parquet",
+                  row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> Dict[str, int]:
+    """Écrit un classement complet en flux ; renvoie le nombre de lignes et de groupes écrits."""
+    writer = RankingWriter(sink, output_format, row_group_size)
+    try:
+        writer.write(table)
+    finally:
+        writer.close(empty=table)
+    return {"rows": writer.rows, "row_groups": writer.row_groups}
+
+
+def ranking_bytes(table: pd.DataFrame, output_format: str = "parquet",
+                  row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> bytes:
+    """Contenu du fichier d'export d'un classement (téléchargement depuis l'application)."""
+    buffer = io.BytesIO()
+    write_ranking(table, buffer, output_format, row_group_size)
+    return buffer.getvalue()
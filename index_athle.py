@@ -0,0 +1,207 @@
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+import baseathle
+from baseathle import athle_query_params, recent_seasons, season_end
+from cache_athle import DEFAULT_TTL_SECONDS
+from mesures import METRICS
+from noms import normalize_name
+from parse_athle import Performance, parse_named_performances
+
+DEFAULT_INDEX_PATH = "athle_index.sqlite"
+DEFAULT_MAX_PAGES = 1000
+# Paramètre de bases.athle.fr correspondant à chaque type de périmètre
+SCOPE_PARAMS = {"club": "frmclub", "departement": "frmdepartement", "ligue": "frmligue"}
+
+Scope = Tuple[str, str]
+
+
+def scope_name(scope: Scope) -> str:
+    kind, value = scope
+    return f"{kind}:{value}"
+
+
+def bulk_query_params(scope: Scope, season: str, page: int) -> Dict[str, str]:
+    """Paramètres de la liste collective d'un périmètre (club, département, ligue), page `page`."""
+    kind, value = scope
+    params = athle_query_params("", "", season)
+    params[SCOPE_PARAMS[kind]] = value
+    params["frmposition"] = str(page)
+    return params
+
+
+class BulkIndex:
+    """
+    Index local (SQLite) des performances athle, construit à partir des listes collectives
+    d'un club, d'un département ou d'une ligue plutôt qu'athlète par athlète.
+    Clé : nom normalisé « nom prénom » (sans accents ni casse) et saison. Un périmètre indexé depuis
+    plus de `ttl_seconds` est ignoré, sauf s'il l'a été après la fin de sa saison (définitif).
+    Une absence de l'index ne signifie pas une absence de performances : l'appelant interroge
+    alors bases.athle.fr pour cet athlète.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS performances (
+                name_key TEXT NOT NULL,
+                season TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                data TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_name_season ON performances (name_key, season)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_scope_season ON performances (scope, season)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scopes (
+                scope TEXT NOT NULL,
+                season TEXT NOT NULL,
+                indexed_at REAL NOT NULL,
+                rows INTEGER NOT NULL,
+                PRIMARY KEY (scope, season)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def index_scope(self, scope: Scope, season: str, named_performances: Iterable[Tuple[str, Performance]]) -> int:
+        """
+        Remplace les performances d'un périmètre pour une saison par `named_performances`
+        (couples « NOM Prénom », performance). Renvoie le nombre de performances indexées.
+        """
+        name = scope_name(scope)
+        rows = [(normalize_name(athlete), str(season), name, json.dumps(dict(performance), ensure_ascii=False))
+                for athlete, performance in named_performances]
+        with self._lock:
+            self._conn.execute("DELETE FROM performances WHERE scope = ? AND season = ?", (name, str(season)))
+            self._conn.executemany(
+                "INSERT INTO performances (name_key, season, scope, data) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scopes (scope, season, indexed_at, rows) VALUES (?, ?, ?, ?)",
+                (name, str(season), time.time(), len(rows))
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def lookup(self, last_name: str, first_name: str, season: str) -> Optional[List[Performance]]:
+        """
+        Performances indexées d'un athlète pour une saison (dédoublonnées entre périmètres
+        qui se recouvrent, par exemple un club et son département), ou None s'il est absent
+        des périmètres à jour.
+        """
+        query = ("SELECT p.data FROM performances p JOIN scopes s ON s.scope = p.scope AND s.season = p.season "
+                 "WHERE p.name_key = ? AND p.season = ?")
+        params = [normalize_name(f"{last_name} {first_name}"), str(season)]
+        if self.ttl_seconds is not None:
+            query += " AND (s.indexed_at >= ? OR s.indexed_at >= ?)"
+            params.extend([time.time() - self.ttl_seconds, season_end(season)])
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY p.rowid", params).fetchall()
+            if not rows:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [Performance.from_dict(json.loads(data)) for data in dict.fromkeys(row[0] for row in rows)]
+
+    def scopes(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT scope, season, indexed_at, rows FROM scopes ORDER BY scope, season")
+            return [dict(zip(("scope", "season", "indexed_at", "rows"), row)) for row in rows.fetchall()]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM performances").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def fetch_scope(session: requests.Session, scope: Scope, season: str,
+                max_pages: int = DEFAULT_MAX_PAGES) -> List[Tuple[str, Performance]]:
+    """
+    Parcourt les pages de la liste collective d'un périmètre jusqu'à la première page vide.
+    Une réponse en erreur lève requests.HTTPError : un périmètre incomplet n'est jamais indexé.
+    """
+    named = []
+    for page in range(max_pages):
+        METRICS.increment("athle_requests")
+        with METRICS.timer("athle_network"):
+            response = session.get(baseathle.ATHLE_URL, params=bulk_query_params(scope, season, page))
+        response.raise_for_status()
+        rows = parse_named_performances(response.content)
+        if not rows:
+            break
+        named.extend(rows)
+    return named
+
+
+def build_index(index: BulkIndex, scopes: Iterable[Scope], seasons: Iterable[str],
+                session: Optional[requests.Session] = None, max_pages: int = DEFAULT_MAX_PAGES) -> Dict[str, int]:
+    """
+    Indexe chaque périmètre pour chaque saison, une page après l'autre (quelques requêtes
+    séquentielles par périmètre au lieu d'une par athlète). Renvoie le nombre de performances
+    indexées par « périmètre/saison ».
+    """
+    counts = {}
+    with (session or requests.Session()) as http:
+        for scope in scopes:
+            for season in seasons:
+                rows = fetch_scope(http, scope, season, max_pages)
+                counts[f"{scope_name(scope)}/{season}"] = index.index_scope(scope, season, rows)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Construit l'index local des performances athle par club, département ou ligue."
+    )
+    parser.add_argument("--club", action="append", default=[], help="Numéro de club (répétable).")
+    parser.add_argument("--departement", action="append", default=[], help="Numéro de département (répétable).")
+    parser.add_argument("--ligue", action="append", default=[], help="Code de ligue (répétable).")
+    parser.add_argument("--seasons", nargs="+", help="Saisons athle (par défaut les deux dernières).")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Fichier SQLite de l'index.")
+    parser.add_argument("--max-pages", type=int, default=DEFAULT_MAX_PAGES, help="Pages au plus par périmètre.")
+    args = parser.parse_args()
+
+    scopes = [(kind, value) for kind in SCOPE_PARAMS for value in getattr(args, kind)]
+    if not scopes:
+        parser.error("indiquez au moins un --club, --departement ou --ligue.")
+    index = BulkIndex(args.index)
+    try:
+        counts = build_index(index, scopes, args.seasons or recent_seasons(2), max_pages=args.max_pages)
+    except requests.RequestException as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        index.close()
+    for name, rows in counts.items():
+        print(f"{name} : {rows} performances")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterator, Optional
+
+# Bornes supérieures (secondes) des classes des histogrammes de durée
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+PROFILE_MODES = ("cprofile", "sampling")
+
+
+def bucket_label(bound: float) -> str:
+    if bound == float("inf"):
+        return f"> {BUCKETS[-2]:g} s"
+    return f"≤ {bound * 1000:g} ms"
+
+
+class StageStats:
+    """Durées cumulées d'une étape : nombre d'appels, total, extrêmes et histogramme."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.histogram = [0] * len(BUCKETS)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.histogram[index] += 1
+                break
+
+    def quantile(self, q: float) -> float:
+        """Quantile approché : borne supérieure de la classe qui l'atteint (au plus le maximum)."""
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.histogram):
+            seen += count
+            if count and seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "histogram": dict(zip(map(bucket_label, BUCKETS), self.histogram)),
+        }
+
+
+class Metrics:
+    """
+    Registre des mesures du processus, partagé entre threads : durées par étape
+    (agrégées en histogrammes, sans conserver chaque mesure) et compteurs.
+    Le coût d'une mesure est d'un appel à perf_counter et d'un verrou ;
+    `enabled = False` les désactive toutes.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._stages: Dict[str, StageStats] = {}
+        self._counters = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats()
+            stats.add(seconds)
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[counter] += amount
+
+    @contextlib.contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Mesure la durée du bloc sous le nom `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def timed(self, stage: str) -> Callable:
+        """Décorateur : mesure chaque appel de la fonction sous le nom `stage`."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Statistiques de chaque étape, dans l'ordre de première mesure."""
+        with self._lock:
+            return {stage: stats.to_dict() for stage, stats in self._stages.items()}
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def to_jsonl(self, label: Optional[str] = None) -> str:
+        """
+        Export JSON lines : une ligne par étape puis une ligne de compteurs,
+        horodatées et étiquetées par `label` pour comparer plusieurs exécutions.
+        """
+        header = {"timestamp": time.time(), "label": label}
+        lines = [json.dumps({**header, "stage": stage, **stats}, ensure_ascii=False)
+                 for stage, stats in self.snapshot().items()]
+        lines.append(json.dumps({**header, "counters": self.counters()}, ensure_ascii=False))
+        return "\n".join(lines) + "\n"
+
+    def export_jsonl(self, path: str, label: Optional[str] = None) -> None:
+        """Ajoute l'export JSON lines à la fin du fichier `path`."""
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(self.to_jsonl(label))
+
+
+# Registre partagé par tous les modules du processus
+METRICS = Metrics()
+
+
+class SamplingProfiler:
+    """
+    Profileur par échantillonnage : toutes les `interval` secondes, relève la pile de
+    chaque thread (workers HTTP et boucle asyncio compris, contrairement à cProfile
+    qui ne voit que le thread appelant). Le rapport donne, par fonction, la part des
+    échantillons où elle s'exécutait (propre) ou figurait dans la pile (cumulée).
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        self._own = Counter()
+        self._cumulative = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.samples += 1
+                seen = set()
+                top = True
+                while frame is not None:
+                    code = frame.f_code
+                    key = (code.co_filename, code.co_firstlineno, code.co_name)
+                    if top:
+                        self._own[key] += 1
+                        top = False
+                    if key not in seen:
+                        seen.add(key)
+                        self._cumulative[key] += 1
+                    frame = frame.f_back
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def report(self, limit: int = 30) -> str:
+        lines = [f"{self.samples} échantillons (tous threads), intervalle {self.interval * 1000:g} ms",
+                 f"{'propre':>7} {'cumulé':>7}  fonction"]
+        for key, own in self._own.most_common(limit):
+            filename, line, name = key
+            lines.append(f"{own / self.samples:7.1%} {self._cumulative[key] / self.samples:7.1%}  "
+                         f"{name} ({filename}:{line})")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def profile_run(mode: Optional[str] = None, limit: int = 30) -> Iterator[Dict[str, str]]:
+    """
+    Profile le bloc, en mode "cprofile" (thread appelant, appels exacts) ou "sampling"
+    (tous les threads, par échantillonnage) ; sans mode, ne fait rien.
+    Le rapport texte est disponible dans `résultat["report"]` à la sortie du bloc.
+    """
+    result: Dict[str, str] = {}
+    if mode is None:
+        yield result
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Mode de profilage inconnu : {mode}")
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(limit)
+            result["report"] = output.getvalue()
+    else:
+        sampler = SamplingProfiler()
+        sampler.start()
+        try:
+            yield result
+        finally:
+            sampler.stop()
+            result["report"] = sampler.report(limit)
@@ -0,0 +1,226 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import aiohttp
+
+import baseathle
+from baseathle import (NO_LOOKUP, AthleLookup, athle_query_params, current_season, filter_performances,
+                       lookup_index, merge_season_performances, season_end, shared_performance_key,
+                       shared_performance_ttl, tag_athlete)
+from concurrence import (DEFAULT_MAX_RETRIES, DEFAULT_TIMEOUT, TRANSIENT_STATUS, AIMDController, TokenBucket,
+                         backoff_delay)
+from mesures import METRICS
+from parse_athle import parse_performances
+
+DEFAULT_CONCURRENCY = 300
+DEFAULT_INITIAL_CONCURRENCY = 50
+
+_DONE = object()
+
+
+class AsyncFetchEngine:
+    """
+    Variante asyncio de FetchEngine : une boucle d'événements dans un thread dédié
+    garde jusqu'à `concurrency` requêtes athle en vol derrière un sémaphore,
+    le contrôleur AIMD décidant du nombre réellement en vol sous ce plafond.
+    L'analyse HTML et le cache SQLite sont déportés dans un petit pool de threads
+    pour ne pas bloquer la boucle. Même interface et mêmes enregistrements que FetchEngine,
+    `lookup` (AthleLookup) compris.
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, parse_workers: int = 4,
+                 controller: Optional[AIMDController] = None, rate_limiter: Optional[TokenBucket] = None,
+                 timeout: float = DEFAULT_TIMEOUT, max_retries: int = DEFAULT_MAX_RETRIES,
+                 seasons: Optional[List[str]] = None, lookup: AthleLookup = NO_LOOKUP):
+        self.concurrency = concurrency
+        self.lookup = lookup
+        self.seasons = list(seasons or [current_season()])
+        self.controller = controller or AIMDController(
+            initial=min(DEFAULT_INITIAL_CONCURRENCY, concurrency), maximum=concurrency
+        )
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._executor = ThreadPoolExecutor(max_workers=parse_workers)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._session = asyncio.run_coroutine_threadsafe(self._open_session(), self._loop).result()
+
+    async def _open_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def _get(self, params: Dict[str, str]) -> Tuple[int, bytes]:
+        """
+        GET athle soumis au limiteur de débit et au contrôleur AIMD,
+        avec nouvelles tentatives (gigue) sur les échecs transitoires.
+        Attente (athle_queue) et requête HTTP (athle_network) sont mesurées séparément.
+        """
+        queued = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await self.controller.acquire_async()
+            start = time.monotonic()
+            METRICS.record("athle_queue", start - queued)
+            try:
+                async with self._session.get(baseathle.ATHLE_URL, params=params) as response:
+                    status = response.status
+                    content = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                latency = time.monotonic() - start
+                METRICS.record("athle_network", latency)
+                self.controller.release(latency, ok=False)
+                if attempt == self.max_retries:
+                    raise
+            else:
+                latency = time.monotonic() - start
+                METRICS.record("athle_network", latency)
+                transient = status in TRANSIENT_STATUS
+                self.controller.release(latency, ok=not transient)
+                if not transient or attempt == self.max_retries:
+                    return status, content
+            queued = time.monotonic()
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def _fetch_season(self, athlete: Tuple[str, str], season: str) -> Optional[List[Dict]]:
+        if self.lookup.shared_cache is None:
+            return await self._load_season(athlete, season)
+        last_name, first_name = athlete
+        return await self.lookup.shared_cache.get_or_fetch_async(
+            shared_performance_key(last_name, first_name, season),
+            lambda: self._load_season(athlete, season),
+            ttl=shared_performance_ttl(season),
+        )
+
+    async def _load_season(self, athlete: Tuple[str, str], season: str) -> Optional[List[Dict]]:
+        loop = asyncio.get_running_loop()
+        last_name, first_name = athlete
+        cache, index, parse_pool = self.lookup.cache, self.lookup.index, self.lookup.parse_pool
+        performances = None
+        if cache is not None:
+            performances = await loop.run_in_executor(self._executor, cache.get, last_name, first_name, season,
+                                                      season_end(season))
+        if performances is None and index is not None:
+            performances = await loop.run_in_executor(self._executor, lookup_index, index, last_name,
+                                                      first_name, season)
+        if performances is None:
+            METRICS.increment("athle_requests")
+            try:
+                status, content = await self._get(athle_query_params(last_name, first_name, season))
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                METRICS.increment("athle_errors")
+                return None
+            if status != 200:
+                METRICS.increment("athle_errors")
+                return None
+            if parse_pool is None:
+                performances = await loop.run_in_executor(self._executor, parse_performances, content)
+            else:
+                performances = await parse_pool.parse_performances_async(content)
+            if cache is not None:
+                await loop.run_in_executor(self._executor, cache.set, last_name, first_name, season, performances)
+        return performances
+
+    async def _fetch_split(self, athlete: Tuple[str, str], min_distance_km: float,
+                           sex_filter) -> Optional[List[Dict]]:
+        results = await asyncio.gather(*(self._fetch_season(athlete, season) for season in self.seasons))
+        performances = merge_season_performances(results)
+        if performances is None:
+            return None
+        return tag_athlete(filter_performances(performances, min_distance_km, sex_filter), athlete)
+
+    async def _fetch_one(self, athlete: Tuple[str, str], min_distance_km: float, sex_filter) -> Optional[List[Dict]]:
+        resolver = self.lookup.resolver
+        if resolver is None:
+            return await self._fetch_split(athlete, min_distance_km, sex_filter)
+        loop = asyncio.get_running_loop()
+        candidates = resolver.candidates(athlete)
+        for attempt, candidate in enumerate(candidates):
+            if attempt:
+                METRICS.increment("name_retries")
+            performances = await self._fetch_split(candidate, min_distance_km, sex_filter)
+            # Une confirmation écrit dans la base SQLite : hors de la boucle
+            performances = await loop.run_in_executor(self._executor, resolver.check, athlete, candidate,
+                                                      performances)
+            if performances != []:
+                break
+        return performances
+
+    async def _run_batch(self, athletes: Iterator[Tuple[str, str]], min_distance_km: float, sex_filter,
+                         results: queue.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        async def worker(athlete):
+            try:
+                results.put((athlete, await self._fetch_one(athlete, min_distance_km, sex_filter)))
+            finally:
+                semaphore.release()
+
+        try:
+            while True:
+                await semaphore.acquire()
+                # L'itérable peut être bloquant (pipeline) : on le consomme hors de la boucle
+                athlete = await loop.run_in_executor(self._executor, next, athletes, None)
+                if athlete is None:
+                    semaphore.release()
+                    break
+                task = asyncio.create_task(worker(athlete))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except BaseException as exc:
+            for task in tasks:
+                task.cancel()
+            results.put((_DONE, exc))
+            raise
+        results.put((_DONE, None))
+
+    def fetch_many(self, athletes: Iterable[Tuple[str, str]], min_distance_km: float,
+                   sex_filter=None) -> Iterator[Tuple[Tuple[str, str], Optional[List[Dict]]]]:
+        """
+        Lance le lot sur la boucle asyncio et renvoie les couples (athlète, performances)
+        au fur et à mesure de leur achèvement.
+        """
+        results = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._run_batch(iter(athletes), min_distance_km, sex_filter, results), self._loop
+        )
+        try:
+            while True:
+                athlete, performances = results.get()
+                if athlete is _DONE:
+                    if performances is not None:
+                        raise performances
+                    return
+                yield athlete, performances
+        finally:
+            future.cancel()
+
+    def fetch(self, athlete: Tuple[str, str], min_distance_km: float, sex_filter=None) -> Optional[List[Dict]]:
+        return asyncio.run_coroutine_threadsafe(
+            self._fetch_one(athlete, min_distance_km, sex_filter), self._loop
+        ).result()
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,176 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from baseathle import (NO_LOOKUP, AthleLookup, current_season, get_athlete_performance_threaded,
+                       merge_season_performances)
+from concurrence import AIMDController, ThrottledSession, TokenBucket
+from mesures import METRICS
+
+DEFAULT_MAX_WORKERS = 100
+DEFAULT_INITIAL_CONCURRENCY = 15
+DEFAULT_RATE = 50.0
+BACKENDS = ("threads", "asyncio")
+
+_DONE = object()
+
+# Limiteur de débit partagé par tous les moteurs du processus
+ATHLE_RATE_LIMITER = TokenBucket(rate=DEFAULT_RATE)
+
+
+class FetchEngine:
+    """
+    Moteur de récupération des performances athle partagé pour tout un run :
+    un seul pool de workers et une session HTTP keep-alive dont le pool de
+    connexions est dimensionné sur le nombre de workers.
+    Le nombre de requêtes réellement en vol est piloté par `controller` (AIMD),
+    `max_workers` n'en est que le plafond.
+    Chaque athlète est recherché sur toutes les saisons de `seasons`, en parallèle,
+    en passant d'abord par les caches et l'index de `lookup` (AthleLookup).
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, controller: Optional[AIMDController] = None,
+                 rate_limiter: Optional[TokenBucket] = None, seasons: Optional[List[str]] = None,
+                 lookup: AthleLookup = NO_LOOKUP):
+        self.max_workers = max_workers
+        self.lookup = lookup
+        self.seasons = list(seasons or [current_season()])
+        self.controller = controller or AIMDController(
+            initial=min(DEFAULT_INITIAL_CONCURRENCY, max_workers), maximum=max_workers
+        )
+        http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        http.mount("https://", adapter)
+        http.mount("http://", adapter)
+        self.session = ThrottledSession(http, self.controller, rate_limiter, stage="athle")
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def fetch(self, athlete: Tuple[str, str], min_distance_km: float, sex_filter=None,
+              season: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Récupère les performances d'un seul athlète (nom, prénom) pour une saison, dans le thread courant.
+        Renvoie None si la requête échoue encore après les nouvelles tentatives.
+        """
+        try:
+            return get_athlete_performance_threaded(athlete, min_distance_km, sex_filter, self.session,
+                                                    season=season or self.seasons[0], lookup=self.lookup)
+        except requests.RequestException:
+            METRICS.increment("athle_errors")
+            return None
+
+    def fetch_many(self, athletes: Iterable[Tuple[str, str]], min_distance_km: float,
+                   sex_filter=None) -> Iterator[Tuple[Tuple[str, str], Optional[List[Dict]]]]:
+        """
+        Soumet un lot d'athlètes au pool et renvoie les couples (athlète, performances)
+        au fur et à mesure de leur achèvement. Les athlètes sont consommés à la demande
+        par un thread d'alimentation, avec au plus deux tâches en attente par worker :
+        un itérable lent (pipeline) ne retarde donc jamais la remontée des résultats.
+        Une tâche est lancée par (athlète, saison) ; les saisons d'un athlète sont
+        fusionnées et dédoublonnées dès que la dernière est terminée.
+        Avec un `resolver`, un athlète sans performances est relancé sous le découpage
+        suivant de son nom ; il garde ses places dans le pool jusqu'à sa résolution.
+        """
+        results = queue.Queue()
+        # Au moins un athlète entier en attente, même avec plus de saisons que de places
+        slots = threading.Semaphore(max(self.max_workers * 2, len(self.seasons)))
+        stop = threading.Event()
+        seasons = self.seasons
+
+        def submit(athlete, candidates, attempt):
+            futures = [
+                self.executor.submit(self.fetch, candidates[attempt], min_distance_km, sex_filter, season)
+                for season in seasons
+            ]
+            remaining = [len(futures)]
+            lock = threading.Lock()
+
+            def on_done(_):
+                with lock:
+                    remaining[0] -= 1
+                    if remaining[0]:
+                        return
+                results.put((athlete, (candidates, attempt, futures)))
+
+            for future in futures:
+                future.add_done_callback(on_done)
+
+        resolver = self.lookup.resolver
+
+        def feed():
+            submitted = 0
+            try:
+                for athlete in athletes:
+                    for _ in seasons:
+                        slots.acquire()
+                    if stop.is_set():
+                        break
+                    submit(athlete, [athlete] if resolver is None else resolver.candidates(athlete), 0)
+                    submitted += 1
+            except BaseException as exc:
+                results.put((_DONE, exc))
+                return
+            results.put((_DONE, submitted))
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        received = 0
+        total = None
+        try:
+            while total is None or received < total:
+                athlete, outcome = results.get()
+                if athlete is _DONE:
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+                    total = outcome
+                    continue
+                candidates, attempt, futures = outcome
+                performances = merge_season_performances([future.result() for future in futures])
+                if resolver is not None:
+                    performances = resolver.check(athlete, candidates[attempt], performances)
+                if performances == [] and attempt + 1 < len(candidates):
+                    METRICS.increment("name_retries")
+                    submit(athlete, candidates, attempt + 1)
+                    continue
+                received += 1
+                for _ in seasons:
+                    slots.release()
+                yield athlete, performances
+        finally:
+            stop.set()
+            for _ in seasons:
+                slots.release()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def create_engine(backend: str = "threads", concurrency: Optional[int] = None,
+                  controller: Optional[AIMDController] = None,
+                  rate_limiter: Optional[TokenBucket] = ATHLE_RATE_LIMITER,
+                  seasons: Optional[List[str]] = None, lookup: AthleLookup = NO_LOOKUP):
+    """
+    Construit le moteur de récupération demandé : "threads" (FetchEngine)
+    ou "asyncio" (AsyncFetchEngine, nécessite aiohttp).
+    `concurrency` est le plafond de requêtes en vol ; par défaut le moteur utilise
+    le limiteur de débit partagé du processus. `seasons` : saisons athle à couvrir
+    (par défaut la saison en cours). `lookup` : caches, index, pool d'analyse et résolution des noms.
+    """
+    if backend == "threads":
+        return FetchEngine(max_workers=concurrency or DEFAULT_MAX_WORKERS, controller=controller,
+                           rate_limiter=rate_limiter, seasons=seasons, lookup=lookup)
+    if backend == "asyncio":
+        from moteur_async import AsyncFetchEngine, DEFAULT_CONCURRENCY
+        return AsyncFetchEngine(concurrency=concurrency or DEFAULT_CONCURRENCY, controller=controller,
+                                rate_limiter=rate_limiter, seasons=seasons, lookup=lookup)
+    raise ValueError(f"Moteur inconnu : {backend}")
@@ -0,0 +1,105 @@
+import unicodedata
+from typing import Dict, List, Tuple
+
+Athlete = Tuple[str, str]
+
+# Découpages d'un même nom essayés au plus (chacun coûte une requête athle par saison)
+DEFAULT_MAX_CANDIDATES = 3
+
+
+def strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return unicodedata.normalize("NFC", "".join(char for char in decomposed if not unicodedata.combining(char)))
+
+
+def normalize_name(text: str) -> str:
+    """
+    Forme normalisée d'un nom pour les comparaisons : sans accents, en minuscules,
+    espaces multiples réduits à un seul (« Hélène  DUPONT » -> « helene dupont »).
+    """
+    return " ".join(strip_accents(text).casefold().split())
+
+
+def _is_capitalized(word: str) -> bool:
+    # Mot entièrement en majuscules, initiales isolées exclues (« DUPONT J » n'indique rien)
+    return word.isupper() and sum(char.isalpha() for char in word) > 1
+
+
+def candidate_splits(runner: str, max_candidates: int = DEFAULT_MAX_CANDIDATES) -> List[Athlete]:
+    """
+    Découpages (nom, prénom) plausibles d'un nom d'inscrit, du plus au moins probable :
+    - celui qu'indiquent les majuscules, nom en tête ou en fin (« LE GALL Jean Marc », « Jean DUPONT »),
+    - puis nom en tête d'un mot, de deux mots… (« Astier Saintamand Frédérique »),
+    - enfin, si le nom a des accents, le plus probable sans accents (« Hélène » -> « Helene »).
+    Au plus `max_candidates` découpages ; aucun si le nom n'a pas au moins deux mots.
+    """
+    words = runner.split()
+    if len(words) < 2:
+        return []
+    splits = []
+    capitalized = [_is_capitalized(word) for word in words]
+    if any(capitalized) and not all(capitalized):
+        leading = capitalized.index(False)
+        trailing = capitalized[::-1].index(False)
+        if leading:
+            splits.append((" ".join(words[:leading]), " ".join(words[leading:])))
+        elif trailing:
+            splits.append((" ".join(words[-trailing:]), " ".join(words[:-trailing])))
+    for position in range(1, len(words)):
+        split = (" ".join(words[:position]), " ".join(words[position:]))
+        if split not in splits:
+            splits.append(split)
+    folded = (strip_accents(splits[0][0]), strip_accents(splits[0][1]))
+    if folded == splits[0]:
+        return splits[:max_candidates]
+    return splits[:max_candidates - 1] + [folded]
+
+
+def athlete_key(athlete: Athlete) -> Athlete:
+    """Clé de dédoublonnage d'un athlète (nom, prénom)."""
+    last_name, first_name = athlete
+    return normalize_name(last_name), normalize_name(first_name)
+
+
+class AthleteIndex:
+    """
+    Index des athlètes d'un événement par nom normalisé : chaque athlète n'y figure
+    qu'une fois (orthographe de sa première apparition), avec la liste des épreuves
+    où il est inscrit, dans l'ordre d'apparition.
+    """
+
+    def __init__(self):
+        self._athletes: Dict[Athlete, Athlete] = {}
+        self._courses: Dict[Athlete, List[str]] = {}
+        self._course_athletes: Dict[str, List[Athlete]] = {}
+
+    def add(self, athlete: Athlete, course_id: str) -> bool:
+        """Enregistre l'inscription ; renvoie True si l'athlète n'était pas encore connu."""
+        key = athlete_key(athlete)
+        is_new = key not in self._athletes
+        if is_new:
+            self._athletes[key] = athlete
+            self._courses[key] = []
+        courses = self._courses[key]
+        if course_id not in courses:
+            courses.append(course_id)
+            self._course_athletes.setdefault(course_id, []).append(self._athletes[key])
+        return is_new
+
+    def __len__(self) -> int:
+        return len(self._athletes)
+
+    def __contains__(self, athlete: Athlete) -> bool:
+        return athlete_key(athlete) in self._athletes
+
+    def canonical(self, athlete: Athlete) -> Athlete:
+        return self._athletes[athlete_key(athlete)]
+
+    def athletes(self) -> List[Athlete]:
+        return list(self._athletes.values())
+
+    def courses(self, athlete: Athlete) -> List[str]:
+        return list(self._courses.get(athlete_key(athlete), []))
+
+    def course_athletes(self, course_id: str) -> List[Athlete]:
+        return list(self._course_athletes.get(course_id, []))
@@ -0,0 +1,274 @@
+import json
+import re
+import sys
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+from mesures import METRICS
+
+# Expressions XPath compilées une seule fois pour toutes les pages
+_ROWS = etree.XPath('//*[@id="ctnResultats"]/tr[td]')
+_COURSE_NAME = etree.XPath('td[5]/text()')
+_TIME_BOLD = etree.XPath('td[11]//b/text()')
+_TIME_UNDERLINED = etree.XPath('td[11]//u/text()')
+_BIRTH_YEAR = etree.XPath('td[15]/text()')
+# Nom « NOM Prénom » de l'athlète (utile pour les listes collectives par club, département ou ligue)
+_ATHLETE_NAME = etree.XPath('string(td[7])')
+
+_HTML_PARSER = etree.HTMLParser()
+
+_MINUTE_MARKS = "'’′"
+_SECOND_MARKS = "(?:''|’’|[\"″" + _MINUTE_MARKS + "])"
+
+# Un seul motif pour tous les formats de temps athle, factorisé sur le premier nombre :
+# 1h23'45'' / 1h02 / 2h05' / 45'12'' / 12'30 / 9''87 / 1:23:45 / 38:12 (centièmes ignorés)
+_TIME_PATTERN = re.compile(
+    r"\s*(?P<a>\d+)\s*(?:"
+    r"(?P<h>h)\s*(?:(?P<hm>\d+)\s*(?:[" + _MINUTE_MARKS + r"]\s*(?:(?P<hs>\d+)\s*" + _SECOND_MARKS + r"?)?)?)?"
+    r"|[" + _MINUTE_MARKS + r"]\s*(?P<s>\d+)\s*" + _SECOND_MARKS + r"?"
+    r"|(?P<so>''|’’|[\"″])"
+    r"|:(?P<b>\d+)(?::(?P<c>\d+))?"
+    r")(?:[.,]?\d+)?\s*"
+)
+
+# Un seul motif (lookaheads ordonnés par priorité) pour classer un nom de course :
+# trail exclu, semi/demi-marathon, marathon, sinon première distance « N km »
+_COURSE_PATTERN = re.compile(
+    r"(?:(?=.*?(?P<trail>trail (?:xxs|xs|xl|s|l|m))))?"
+    r"(?:(?=.*?(?P<half>(?:semi|demi)[ _-]?marathon|half marathon|1/2.*?marathon|marathon.*?1/2)))?"
+    r"(?:(?=.*?(?P<full>marathon)))?"
+    r"(?:(?=.*?(?<!semi )(?<!\d)(?P<km>\d+)\s?km))?",
+    re.DOTALL
+)
+
+# Valeur renvoyée par course_distance pour les trails, exclus du classement
+TRAIL = object()
+
+# Champs d'une performance, dans l'ordre des enregistrements compacts (tuples)
+PERFORMANCE_FIELDS = ("course_name", "distance_km", "time", "total_seconds", "speed_kph", "birth_year", "sex")
+_FIELD_NAMES = frozenset(PERFORMANCE_FIELDS)
+
+# Années de naissance partagées : une seule instance int par année
+_YEARS: Dict[int, int] = {}
+
+
+def _intern(text: Optional[str]) -> Optional[str]:
+    return None if text is None else sys.intern(text)
+
+
+class Performance(Mapping):
+    """
+    Performance athle compacte : attributs en `__slots__` (pas de dict par performance),
+    noms de course, temps, sexe et nom d'athlète internés (partagés par les milliers
+    d'athlètes des mêmes courses), secondes et années de naissance entières.
+    Se lit comme l'ancien dict (`p["speed_kph"]`, `p.get(...)`, `dict(p)`, égalité avec un dict) ;
+    la clé `athlete` n'existe qu'une fois l'athlète renseigné (with_athlete).
+    Les performances sont partagées entre caches et classements : on ne les modifie pas.
+    """
+
+    __slots__ = PERFORMANCE_FIELDS + ("athlete",)
+
+    def __init__(self, course_name: str, distance_km: Optional[float], time: str, total_seconds: int,
+                 speed_kph: float, birth_year: Optional[int], sex: Optional[str], athlete: Optional[str] = None):
+        self.course_name = _intern(course_name)
+        self.distance_km = distance_km
+        self.time = _intern(time)
+        self.total_seconds = total_seconds
+        self.speed_kph = speed_kph
+        self.birth_year = None if birth_year is None else _YEARS.setdefault(birth_year, birth_year)
+        self.sex = _intern(sex)
+        self.athlete = _intern(athlete)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Performance":
+        return cls(**data)
+
+    def with_athlete(self, athlete: str) -> "Performance":
+        """Copie de la performance attribuée à `athlete`."""
+        return Performance(self.course_name, self.distance_km, self.time, self.total_seconds, self.speed_kph,
+                           self.birth_year, self.sex, athlete)
+
+    def record(self) -> Tuple:
+        """Enregistrement compact (tuple dans l'ordre de PERFORMANCE_FIELDS, sans l'athlète)."""
+        return (self.course_name, self.distance_km, self.time, self.total_seconds, self.speed_kph,
+                self.birth_year, self.sex)
+
+    def __getitem__(self, key: str):
+        if key in _FIELD_NAMES:
+            return getattr(self, key)
+        if key == "athlete" and self.athlete is not None:
+            return self.athlete
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from PERFORMANCE_FIELDS
+        if self.athlete is not None:
+            yield "athlete"
+
+    def __len__(self) -> int:
+        return len(PERFORMANCE_FIELDS) + (self.athlete is not None)
+
+    def __reduce__(self):
+        return Performance, self.record() + (self.athlete,)
+
+    def __repr__(self) -> str:
+        return f"Performance({dict(self)!r})"
+
+
+def performances_to_json(performances: Iterable[Mapping]) -> str:
+    return json.dumps([dict(performance) for performance in performances], ensure_ascii=False)
+
+
+def performances_from_json(text: str) -> List[Performance]:
+    return [Performance.from_dict(data) for data in json.loads(text)]
+
+_TIME_MEMO: Dict[str, Optional[int]] = {}
+_TIME_MEMO_SIZE = 200000
+
+
+def parse_time(text: str) -> Optional[int]:
+    """
+    Convertit un temps athle (« 1h23'45'' », « 45'12'' », « 1:23:45 », « 12'30 »…)
+    en secondes, en une seule correspondance d'expression régulière.
+    Renvoie None si le format n'est pas reconnu (DNF, DQ…).
+    Mémorisé dans un simple dict borné (un échec de lru_cache coûte plus cher que l'analyse).
+    """
+    try:
+        return _TIME_MEMO[text]
+    except KeyError:
+        pass
+    match = _TIME_PATTERN.fullmatch(text)
+    if match is None:
+        total_seconds = None
+    else:
+        first, hours, hour_minutes, hour_seconds, seconds, seconds_only, second, third = match.groups()
+        if hours:
+            total_seconds = int(first) * 3600 + int(hour_minutes or 0) * 60 + int(hour_seconds or 0)
+        elif seconds is not None:
+            total_seconds = int(first) * 60 + int(seconds)
+        elif seconds_only:
+            total_seconds = int(first)
+        elif third is not None:
+            total_seconds = int(first) * 3600 + int(second) * 60 + int(third)
+        else:
+            total_seconds = int(first) * 60 + int(second)
+    if len(_TIME_MEMO) < _TIME_MEMO_SIZE:
+        _TIME_MEMO[text] = total_seconds
+    return total_seconds
+
+
+@lru_cache(maxsize=8192)
+def course_distance(course_name: str):
+    """
+    Distance en km déduite du nom de course (en minuscules), None si inconnue,
+    ou TRAIL pour les trails exclus. Mémorisé : les mêmes courses reviennent
+    pour des milliers d'athlètes.
+    """
+    match = _COURSE_PATTERN.match(course_name)
+    if match.group("trail"):
+        return TRAIL
+    if match.group("half"):
+        return 21.0
+    if match.group("full"):
+        return 42.0
+    if match.group("km"):
+        return float(match.group("km"))
+    return None
+
+
+def clear_memos() -> None:
+    """Vide les mémos de parse_time et course_distance."""
+    _TIME_MEMO.clear()
+    course_distance.cache_clear()
+
+
+@METRICS.timed("athle_parse")
+def parse_performances(content: bytes) -> List[Performance]:
+    """
+    Analyse une page de résultats bases.athle.fr en une seule passe lxml,
+    directement sur les octets de la réponse.
+    Renvoie la liste des performances, sans filtre de distance ni de sexe.
+    Les textes sont convertis en `str` pour ne pas garder l'arbre en mémoire.
+    """
+    dom = etree.fromstring(content, _HTML_PARSER)
+    if dom is None:
+        return []
+    return parse_performance_rows(dom)
+
+
+def parse_performance_rows(dom) -> List[Performance]:
+    """
+    Extrait les performances des lignes de #ctnResultats d'un arbre lxml déjà construit.
+    """
+    performances = []
+    for row in _ROWS(dom):
+        performance = _parse_row(row)
+        if performance is not None:
+            performances.append(performance)
+    return performances
+
+
+@METRICS.timed("athle_parse")
+def parse_named_performances(content: bytes) -> List[Tuple[str, Performance]]:
+    """
+    Analyse une page de résultats collective (club, département, ligue) :
+    renvoie les couples (nom de l'athlète « NOM Prénom », performance).
+    """
+    dom = etree.fromstring(content, _HTML_PARSER)
+    if dom is None:
+        return []
+    named = []
+    for row in _ROWS(dom):
+        performance = _parse_row(row)
+        if performance is None:
+            continue
+        name = " ".join(str(_ATHLETE_NAME(row)).split())
+        if name:
+            named.append((name, performance))
+    return named
+
+
+def _parse_row(row) -> Optional[Performance]:
+    course_name = _COURSE_NAME(row)
+    if not course_name:
+        return None
+    course_name = str(course_name[0]).strip().lower()
+
+    distance_km = course_distance(course_name)
+    if distance_km is TRAIL:
+        return None
+
+    time = _TIME_BOLD(row) or _TIME_UNDERLINED(row)
+    if not time:
+        return None
+    time = str(time[0]).strip()
+    total_seconds = parse_time(time)
+    if total_seconds is None:
+        return None
+
+    birth_year_data = _BIRTH_YEAR(row)
+    if birth_year_data:
+        birth_year_str = birth_year_data[0].split("/")[-1].strip()
+        sex = birth_year_data[0].split("/")[-2][-1].lower()  # Extraire le sexe
+        try:
+            birth_year = int(birth_year_str)
+            if 0 <= birth_year <= 19:
+                birth_year += 2000
+            elif 20 <= birth_year <= 99:
+                birth_year += 1900
+        except ValueError:
+            birth_year = None
+    else:
+        birth_year = None
+        sex = None
+
+    total_hours = total_seconds / 3600
+    if total_hours > 0 and distance_km is not None:
+        speed_kph = distance_km / total_hours
+    else:
+        speed_kph = 0
+
+    return Performance(course_name, distance_km, time, total_seconds, speed_kph, birth_year, sex)
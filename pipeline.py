@@ -0,0 +1,175 @@
+import queue
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from baseathle import season_end
+from mesures import METRICS
+from noms import AthleteIndex, athlete_key
+from recup_klikego import DEFAULT_PAGE_WINDOW, iter_runner_pages
+from suivi_inscrits import lookup_variant
+
+DEFAULT_QUEUE_SIZE = 500
+
+_END = object()
+
+
+def background_iter(iterable: Iterable, maxsize: int = DEFAULT_QUEUE_SIZE) -> Iterator:
+    """
+    Consomme `iterable` dans un thread dédié et en renvoie les éléments via une file
+    bornée : le producteur avance en parallèle du consommateur mais se bloque
+    (contre-pression) dès que `maxsize` éléments attendent.
+    Les exceptions du producteur sont relancées côté consommateur.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                while not stop.is_set():
+                    try:
+                        items.put((item, None), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            items.put((_END, None))
+        except BaseException as exc:
+            items.put((_END, exc))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, exc = items.get()
+            if item is _END:
+                if exc is not None:
+                    raise exc
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def split_runner_name(runner: str) -> Optional[Tuple[str, str]]:
+    """
+    Découpe un nom Klikego « NOM Prénom(s) » en (nom, prénom).
+    Renvoie None si le nom ne contient pas au moins deux mots.
+    """
+    split_name = runner.split()
+    if len(split_name) < 2:
+        return None
+    return split_name[0].strip(), " ".join(split_name[1:]).strip()
+
+
+class EventPipeline:
+    """
+    Pipeline en flux : pages d'inscrits -> découpage des noms -> requêtes athle -> analyse.
+    Les pages Klikego sont téléchargées dans un thread pendant que le moteur interroge
+    déjà athle pour les premiers coureurs ; les files bornées limitent la mémoire.
+    Les inscrits de chaque épreuve de l'événement sont dédoublonnés par nom normalisé
+    (AthleteIndex), chaque athlète n'est recherché sur athle qu'une seule fois, puis ses
+    performances sont redistribuées à chacune de ses épreuves (course_performances).
+    Itérer sur le pipeline renvoie les couples (athlète, performances) des athlètes uniques
+    au fil de l'eau, l'étape de classement restant à la charge du consommateur.
+    `cache` : cache partagé (SharedCache) facultatif des pages d'inscrits, analysées dans
+    le pool de processus du moteur s'il en a un.
+    Avec `store` (RegistrantStore), le rafraîchissement est incrémental : les pages d'inscrits
+    inchangées ne sont pas analysées et seuls les nouveaux inscrits, ou ceux dont les performances
+    mémorisées ont expiré, sont recherchés sur athle ; les autres sont repris du passage précédent.
+    """
+
+    def __init__(self, session: requests.Session, reference_id: str, course_ids: Iterable[str], engine,
+                 min_distance_km: float, sex_filter=None, page_window: int = DEFAULT_PAGE_WINDOW,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, cache=None, store=None):
+        self.session = session
+        self.reference_id = reference_id
+        self.course_ids = list(course_ids)
+        self.engine = engine
+        self.min_distance_km = min_distance_km
+        self.sex_filter = sex_filter
+        self.page_window = page_window
+        self.queue_size = queue_size
+        self.cache = cache
+        self.store = store
+        self.variant = lookup_variant(min_distance_km, sex_filter, engine.seasons)
+        self.index = AthleteIndex()
+        self.pages = 0
+        self.runners: Dict[str, int] = {course_id: 0 for course_id in self.course_ids}
+        self.invalid_names: Dict[str, List[str]] = {course_id: [] for course_id in self.course_ids}
+        self.results: Dict[Tuple[str, str], Optional[List[Dict]]] = {}
+        self.completed = 0
+        self.reused = 0
+        self.listing_done = False
+        self._known: Dict[Tuple[str, str], List[Dict]] = {}
+        self._reused: "queue.Queue[Tuple[Tuple[str, str], List[Dict]]]" = queue.Queue()
+
+    @property
+    def athletes(self) -> List[Tuple[str, str]]:
+        return self.index.athletes()
+
+    def _athletes(self) -> Iterator[Tuple[str, str]]:
+        for course_id in self.course_ids:
+            for runners in iter_runner_pages(self.session, course_id, self.reference_id, self.page_window,
+                                             self.cache, self.store, self.engine.lookup.parse_pool):
+                self.pages += 1
+                self.runners[course_id] += len(runners)
+                for runner in runners:
+                    athlete = split_runner_name(runner)
+                    if athlete is None:
+                        self.invalid_names[course_id].append(runner)
+                    elif self.index.add(athlete, course_id):
+                        known = self._known.get(athlete_key(athlete))
+                        if known is None:
+                            yield athlete
+                        else:
+                            self._reused.put((athlete, known))
+        self.listing_done = True
+
+    def _complete(self, athlete: Tuple[str, str], performances: Optional[List[Dict]]):
+        self.completed += 1
+        self.results[athlete_key(athlete)] = performances
+        return athlete, performances
+
+    def _drain_reused(self) -> Iterator[Tuple[Tuple[str, str], List[Dict]]]:
+        # Athlètes déjà connus, repris sans requête athle
+        while True:
+            try:
+                athlete, performances = self._reused.get_nowait()
+            except queue.Empty:
+                return
+            self.reused += 1
+            METRICS.increment("reused_athletes")
+            yield self._complete(athlete, performances)
+
+    def __iter__(self) -> Iterator[Tuple[Tuple[str, str], Optional[List[Dict]]]]:
+        if self.store is not None:
+            final_after = max(season_end(season) for season in self.engine.seasons)
+            self._known = self.store.known_results(self.reference_id, self.variant, final_after)
+        fetched = []
+        athletes = background_iter(self._athletes(), self.queue_size)
+        try:
+            for athlete, performances in self.engine.fetch_many(athletes, self.min_distance_km, self.sex_filter):
+                yield from self._drain_reused()
+                if performances is not None:
+                    fetched.append((athlete, performances))
+                yield self._complete(athlete, performances)
+            yield from self._drain_reused()
+        finally:
+            # Même interrompu, le passage profite au suivant
+            if self.store is not None and fetched:
+                self.store.save_results(self.reference_id, self.variant, fetched)
+
+    def course_athletes(self, course_id: str) -> List[Tuple[str, str]]:
+        """Athlètes inscrits à l'épreuve, dans l'orthographe retenue par l'index."""
+        return self.index.course_athletes(course_id)
+
+    def course_performances(self, course_id: str) -> List[Dict]:
+        """Performances de tous les athlètes de l'épreuve (à appeler une fois le pipeline parcouru)."""
+        performances = []
+        for athlete in self.course_athletes(course_id):
+            performances.extend(self.results.get(athlete_key(athlete)) or [])
+        return performances
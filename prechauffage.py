@@ -0,0 +1,160 @@
+import argparse
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+from baseathle import AthleLookup, recent_seasons
+from batch_klikego import ENTRY_ERRORS, parse_entry, read_entries
+from cache_athle import PerformanceCache
+from concurrence import AIMDController, TokenBucket
+from mesures import METRICS
+from moteur_athle import create_engine
+from pipeline import EventPipeline
+from recup_klikego import fetch_course_options
+from resolution_noms import NameResolver
+from suivi_inscrits import RegistrantStore
+
+DEFAULT_INTERVAL_SECONDS = 6 * 3600
+# Allure douce : quelques requêtes athle par seconde, peu de requêtes en vol
+DEFAULT_RATE = 2.0
+DEFAULT_CONCURRENCY = 4
+DEFAULT_PAGE_WINDOW = 2
+# Échecs d'une entrée (ceux du traitement par lots, plus les caches SQLite verrouillés ou
+# corrompus) : l'entrée est comptée en échec et le passage continue avec la suivante
+WARM_ERRORS = ENTRY_ERRORS + (sqlite3.Error,)
+
+
+class Prewarmer:
+    """
+    Préchauffage en arrière-plan des courses à venir : pour chaque entrée de la liste
+    de suivi (« LIEN[#EPREUVE] », comme batch_klikego), récupère périodiquement les inscrits
+    puis les performances athle des nouveaux inscrits, à allure douce (`rate` requêtes/s,
+    au plus `concurrency` en vol), dans le cache persistant de `lookup` et la mémoire des inscrits.
+    Les recherches utilisent les réglages par défaut de l'application (toutes distances,
+    les deux sexes, `seasons`) : à l'ouverture de la course, le classement est servi
+    presque entièrement depuis ces données chaudes.
+    """
+
+    def __init__(self, entries: List[str], lookup: AthleLookup, store: RegistrantStore,
+                 seasons: Optional[List[str]] = None, rate: float = DEFAULT_RATE,
+                 concurrency: int = DEFAULT_CONCURRENCY, page_window: int = DEFAULT_PAGE_WINDOW):
+        self.entries = list(entries)
+        self.lookup = lookup
+        self.store = store
+        self.seasons = sorted(seasons or recent_seasons(2), reverse=True)
+        self.rate = rate
+        self.concurrency = concurrency
+        self.page_window = page_window
+        self.cycles = 0
+        self._stop = threading.Event()
+
+    def warm_entry(self, session: requests.Session, engine, entry: str) -> Dict[str, int]:
+        """Préchauffe une entrée ; renvoie le nombre d'athlètes recherchés et repris."""
+        reference_id, wanted_course = parse_entry(entry)
+        course_options = fetch_course_options(session, reference_id)
+        course_ids = [course_id for name, course_id in course_options.items()
+                      if wanted_course is None or wanted_course in (course_id, name)]
+        if not course_ids:
+            raise ValueError(f"épreuve {wanted_course} introuvable")
+        pipeline = EventPipeline(session, reference_id, course_ids, engine, 0, page_window=self.page_window,
+                                 store=self.store)
+        for _ in pipeline:
+            if self._stop.is_set():
+                break
+        return {"athletes": len(pipeline.index), "fetched": pipeline.completed - pipeline.reused,
+                "reused": pipeline.reused}
+
+    def run_once(self) -> int:
+        """Un passage sur toute la liste de suivi. Renvoie le nombre d'entrées en échec."""
+        failures = 0
+        controller = AIMDController(initial=min(2, self.concurrency), minimum=1, maximum=self.concurrency)
+        with requests.Session() as session, \
+                create_engine("threads", concurrency=self.concurrency, controller=controller,
+                              rate_limiter=TokenBucket(rate=self.rate), seasons=self.seasons,
+                              lookup=self.lookup) as engine:
+            for entry in self.entries:
+                if self._stop.is_set():
+                    break
+                start = time.perf_counter()
+                try:
+                    counts = self.warm_entry(session, engine, entry)
+                except WARM_ERRORS as e:
+                    print(f"{entry} : erreur : {e}", file=sys.stderr)
+                    failures += 1
+                    continue
+                print(f"{entry} : {counts['athletes']} athlètes, {counts['fetched']} recherchés, "
+                      f"{counts['reused']} déjà chauds ({time.perf_counter() - start:.0f} s)")
+        self.cycles += 1
+        return failures
+
+    def run_forever(self, interval: float = DEFAULT_INTERVAL_SECONDS) -> None:
+        """Passages successifs toutes les `interval` secondes, jusqu'à stop()."""
+        while not self._stop.is_set():
+            self.run_once()
+            self.wait(interval)
+
+    def wait(self, seconds: float) -> bool:
+        """Attend `seconds` secondes ; renvoie True si stop() a été appelé entre-temps."""
+        return self._stop.wait(seconds)
+
+    def stop(self) -> None:
+        """Interrompt le passage en cours au prochain athlète et arrête la boucle."""
+        self._stop.set()
+
+    def start(self, interval: float = DEFAULT_INTERVAL_SECONDS) -> threading.Thread:
+        """Lance run_forever dans un thread d'arrière-plan (mode worker intégré)."""
+        thread = threading.Thread(target=self.run_forever, args=(interval,), daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Préchauffe en arrière-plan les caches athle des courses Klikego d'une liste de suivi."
+    )
+    parser.add_argument("entries", nargs="*", metavar="LIEN[#EPREUVE]", help="Lien Klikego ou référence.")
+    parser.add_argument("-f", "--file", action="append", default=[],
+                        help="Liste de suivi, une entrée par ligne (relue à chaque passage).")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_SECONDS,
+                        help="Secondes entre deux passages (mode démon).")
+    parser.add_argument("--once", action="store_true", help="Un seul passage puis sortie (cron).")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Requêtes athle par seconde au plus.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Requêtes athle en vol au plus.")
+    parser.add_argument("--seasons", nargs="+", help="Saisons athle (par défaut les deux dernières).")
+    parser.add_argument("--metrics", help="Ajoute les mesures de chaque passage à ce fichier JSON lines.")
+    args = parser.parse_args()
+
+    entries = read_entries(args.entries, args.file)
+    if not entries:
+        parser.error("liste de suivi vide.")
+    cache = PerformanceCache()
+    store = RegistrantStore()
+    resolver = NameResolver()
+    prewarmer = Prewarmer(entries, AthleLookup(cache=cache, resolver=resolver), store, args.seasons, args.rate,
+                          args.concurrency)
+    signal.signal(signal.SIGTERM, lambda *_: prewarmer.stop())
+    try:
+        while True:
+            METRICS.reset()
+            failures = prewarmer.run_once()
+            if args.metrics:
+                METRICS.export_jsonl(args.metrics, label="prechauffage")
+            if args.once or prewarmer.wait(args.interval):
+                break
+            prewarmer.entries = read_entries(args.entries, args.file) or prewarmer.entries
+    except KeyboardInterrupt:
+        failures = 0
+    finally:
+        cache.close()
+        store.close()
+        resolver.close()
+    sys.exit(1 if args.once and failures else 0)
+
+
+if __name__ == "__main__":
+    main()
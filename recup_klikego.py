@@ -1,6 +1,46 @@
+import time
+
 import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterator
+
+from lxml import etree
+
+from cache_partage import LISTING_TTL_SECONDS
+from concurrence import DEFAULT_MAX_RETRIES, TRANSIENT_STATUS, backoff_delay
+from mesures import METRICS
+from suivi_inscrits import page_digest
+
+KLIKEGO_URL = "https://www.klikego.com"
+DEFAULT_PAGE_WINDOW = 8
+
+# Expressions XPath compilées une seule fois : seuls le tableau des inscrits, ses lignes
+# et la liste des épreuves sont parcourus, sans objet Python pour le reste de la page.
+# Mêmes règles que les anciennes recherches BeautifulSoup : attribut class exact pour
+# le tableau, classe mt-1 parmi d'autres pour les lignes, descendants pour td, b, div et option.
+_RUNNERS_TABLE = etree.XPath("(//table[@class='table table-sm table-bordered table-striped'])[1]")
+_RUNNER_ROWS = etree.XPath(".//tr[contains(concat(' ', normalize-space(@class), ' '), ' mt-1 ')]")
+_CELLS = etree.XPath(".//td")
+_BOLD = etree.XPath("(.//b)[1]")
+_DIVS = etree.XPath(".//div")
+_COURSE_SELECT = etree.XPath("(//select[@id='course'])[1]")
+_OPTIONS = etree.XPath(".//option")
+
+# Le texte déjà décodé par requests est réencodé en UTF-8 : l'en-tête <meta charset> est ignoré
+_HTML_PARSER = etree.HTMLParser(encoding="utf-8")
+
+
+def _parse_html(html_content: str):
+    """Arbre lxml d'une page HTML, None si la page est vide."""
+    if not html_content.strip():
+        return None
+    return etree.fromstring(html_content.encode("utf-8"), _HTML_PARSER)
+
+
+def _stripped_text(element) -> str:
+    # Équivalent de get_text(strip=True) : chaque morceau de texte est épuré puis concaténé
+    return "".join(text.strip() for text in element.itertext())
 
 
 def parse_link(link: str) -> str:
@@ -22,24 +62,29 @@ def fetch_course_options(session: requests.Session, reference_id: str) -> Dict[s
     Récupère UNIQUEMENT les options de la liste <select id="course"> 
     sur la page de référence.
     """
-    url = f'https://www.klikego.com/inscrits/{reference_id}'
+    url = f'{KLIKEGO_URL}/inscrits/{reference_id}'
     response = session.get(url)
     if response.status_code != 200:
         raise ValueError(f"Erreur HTTP {response.status_code} lors de l'accès à {url}")
+    return parse_course_options(response.text)
 
-    soup = BeautifulSoup(response.text, 'html.parser')
+
+def parse_course_options(html_content: str) -> Dict[str, str]:
+    """
+    Extrait les épreuves {nom: identifiant} de la liste <select id="course"> d'une page `inscrits`.
+    """
+    dom = _parse_html(html_content)
 
     # On cible le <select id="course">
-    course_select = soup.find('select', {'id': 'course'})
+    course_select = _COURSE_SELECT(dom) if dom is not None else []
     if not course_select:
         raise ValueError("Impossible de trouver la liste d'épreuves (select id='course').")
 
     # On ne récupère que les <option> dans ce select
-    options = course_select.find_all('option')
     course_options = {}
-    for option in options:
-        text = option.text.strip()
-        value = option.get('value', '').strip()
+    for option in _OPTIONS(course_select[0]):
+        text = "".join(option.itertext()).strip()
+        value = (option.get('value') or '').strip()
         if text and value:
             course_options[text] = value
 
@@ -49,12 +94,16 @@ def fetch_course_options(session: requests.Session, reference_id: str) -> Dict[s
     return course_options
 
 
-def fetch_data(session: requests.Session, page_number: int, course_id: str, reference_id: str) -> str:
+@METRICS.timed("fetch_data")
+def fetch_data(session: requests.Session, page_number: int, course_id: str, reference_id: str,
+               max_retries: int = DEFAULT_MAX_RETRIES) -> str:
     """
     Envoie une requête POST pour récupérer la page de résultats 
     d'une épreuve donnée (course_id) et d'une page donnée (page_number).
+    Les échecs transitoires sont retentés avec gigue ; une page toujours en erreur
+    lève requests.HTTPError (ou l'erreur réseau) : elle n'est jamais prise pour une page vide.
     """
-    url = 'https://www.klikego.com/types/generic/custo/x.running/findInInscrits.jsp'
+    url = f'{KLIKEGO_URL}/types/generic/custo/x.running/findInInscrits.jsp'
     headers = {'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'}
     data = {
         'search': '',
@@ -64,38 +113,47 @@ def fetch_data(session: requests.Session, page_number: int, course_id: str, refe
         'version': 'v6',
         'page': str(page_number)
     }
-    response = session.post(url, headers=headers, data=data)
-    if response.status_code != 200:
-        print(f"Erreur HTTP {response.status_code} lors de la récupération de la page {page_number+1}")
-        return ""
-    return response.text
-
-
+    for attempt in range(max_retries + 1):
+        try:
+            response = session.post(url, headers=headers, data=data)
+        except (requests.Timeout, requests.ConnectionError):
+            if attempt == max_retries:
+                raise
+        else:
+            if response.status_code == 200:
+                return response.text
+            if response.status_code not in TRANSIENT_STATUS or attempt == max_retries:
+                raise requests.HTTPError(
+                    f"Erreur HTTP {response.status_code} lors de la récupération de la page {page_number+1}",
+                    response=response
+                )
+        METRICS.increment("klikego_retries")
+        time.sleep(backoff_delay(attempt))
+
+
+@METRICS.timed("extract_runners")
 def extract_runners(html_content: str) -> List[str]:
     """
     Analyse le contenu HTML pour extraire la liste des noms des coureurs.
     Renvoie une liste de chaînes (noms).
     """
-    from bs4 import BeautifulSoup
-
-    soup = BeautifulSoup(html_content, 'html.parser')
+    dom = _parse_html(html_content)
     runners = []
-    table = soup.find('table', class_='table table-sm table-bordered table-striped')
+    table = _RUNNERS_TABLE(dom) if dom is not None else []
     if not table:
         print("Aucun tableau trouvé dans le contenu HTML.")
         return runners
 
-    rows = table.find_all('tr', class_='mt-1')
-    for row in rows:
-        cells = row.find_all('td')
+    for row in _RUNNER_ROWS(table[0]):
+        cells = _CELLS(row)
         if not cells:
             continue
 
         # Vérifier la présence d’un dossard (balise <b> avec un nombre)
         dossard_cell = cells[0]
-        dossard_tag = dossard_cell.find('b')
+        dossard_tag = _BOLD(dossard_cell)
 
-        if dossard_tag and dossard_tag.get_text(strip=True).isdigit():
+        if dossard_tag and _stripped_text(dossard_tag[0]).isdigit():
             # Nom dans la deuxième cellule
             if len(cells) > 1:
                 name_cell = cells[1]
@@ -105,14 +163,101 @@ def extract_runners(html_content: str) -> List[str]:
             # Nom dans la première cellule
             name_cell = cells[0]
 
-        name_divs = name_cell.find_all('div')
+        name_divs = _DIVS(name_cell)
         if len(name_divs) > 1:
-            full_name = name_divs[1].get_text(strip=True)
+            full_name = _stripped_text(name_divs[1])
             runners.append(full_name)
 
     return runners
 
 
+def _extract(html_content: str, parse_pool=None) -> List[str]:
+    if parse_pool is None:
+        return extract_runners(html_content)
+    return parse_pool.extract_runners(html_content)
+
+
+def download_runners_page(session: requests.Session, page_number: int, course_id: str,
+                          reference_id: str, store=None, parse_pool=None) -> List[str]:
+    """
+    Récupère et analyse une page d'inscrits (liste vide au-delà de la dernière page).
+    Avec `store` (RegistrantStore), une page dont le contenu n'a pas changé depuis
+    le dernier passage n'est pas analysée : ses inscrits mémorisés sont renvoyés.
+    Avec `parse_pool` (ParsePool), l'analyse se fait dans un processus d'analyse.
+    """
+    html_content = fetch_data(session, page_number, course_id, reference_id)
+    if store is None:
+        return _extract(html_content, parse_pool)
+    digest = page_digest(html_content)
+    runners = store.page_runners(reference_id, course_id, page_number, digest)
+    if runners is not None:
+        METRICS.increment("unchanged_pages")
+        return runners
+    runners = _extract(html_content, parse_pool)
+    store.save_page(reference_id, course_id, page_number, digest, runners)
+    return runners
+
+
+def fetch_runners_page(session: requests.Session, page_number: int, course_id: str, reference_id: str,
+                       cache=None, store=None, parse_pool=None) -> List[str]:
+    """
+    Renvoie les inscrits d'une page, liste vide si la page est vide ; une page en erreur lève une exception.
+    Avec un cache partagé (SharedCache), les pages réussies sont conservées quelques minutes
+    et plusieurs sessions demandant la même page n'en déclenchent qu'un téléchargement.
+    """
+    if cache is None:
+        runners = download_runners_page(session, page_number, course_id, reference_id, store, parse_pool)
+    else:
+        runners = cache.get_or_fetch(
+            ("inscrits", reference_id, course_id, page_number),
+            lambda: download_runners_page(session, page_number, course_id, reference_id, store, parse_pool),
+            ttl=LISTING_TTL_SECONDS,
+        )
+    return runners or []
+
+
+def iter_runner_pages(session: requests.Session, course_id: str, reference_id: str,
+                      window: int = DEFAULT_PAGE_WINDOW, cache=None, store=None,
+                      parse_pool=None) -> Iterator[List[str]]:
+    """
+    Parcourt les pages d'inscrits en gardant `window` pages en cours de
+    téléchargement à l'avance (pagination spéculative).
+    Les pages sont renvoyées dans l'ordre ; le parcours s'arrête à la première
+    page vide et les requêtes spéculatives au-delà sont annulées ou ignorées.
+    Une page en erreur interrompt le parcours (l'exception est relancée) plutôt que de tronquer la liste.
+    """
+    with ThreadPoolExecutor(max_workers=window) as executor:
+        pending = deque(
+            executor.submit(fetch_runners_page, session, page_number, course_id, reference_id, cache, store,
+                            parse_pool)
+            for page_number in range(window)
+        )
+        next_page = window
+        try:
+            while pending:
+                runners = pending.popleft().result()
+                if not runners:
+                    return
+                yield runners
+                pending.append(executor.submit(fetch_runners_page, session, next_page, course_id, reference_id,
+                                               cache, store, parse_pool))
+                next_page += 1
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def fetch_all_runners(session: requests.Session, course_id: str, reference_id: str,
+                      window: int = DEFAULT_PAGE_WINDOW, cache=None, store=None, parse_pool=None) -> List[str]:
+    """
+    Renvoie la liste complète des coureurs d'une épreuve, dans l'ordre des pages.
+    """
+    all_runners = []
+    for runners in iter_runner_pages(session, course_id, reference_id, window, cache, store, parse_pool):
+        all_runners.extend(runners)
+    return all_runners
+
+
 def main():
     # Demande du lien Klikego
     link = input("Entrez le lien Klikego de la course : ").strip()
@@ -145,21 +290,11 @@ def main():
 
         print(f"\nVous avez choisi : {selected_course_name}\n")
 
-        # Boucle sur les pages
-        page_number = 0
+        # Pages téléchargées en parallèle, traitées dans l'ordre
         all_runners = []
-        while True:
-            html_content = fetch_data(session, page_number, course_id, reference_id)
-            if not html_content:
-                break
-
-            runners = extract_runners(html_content)
-            if not runners:
-                break
-
+        for page_number, runners in enumerate(iter_runner_pages(session, course_id, reference_id)):
             all_runners.extend(runners)
             print(f"Page {page_number+1} : {len(runners)} coureurs récupérés.")
-            page_number += 1
 
         # Affichage final
         print("\nListe complète des coureurs :")
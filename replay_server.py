@@ -0,0 +1,362 @@
+import argparse
+import contextlib
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import baseathle
+import recup_klikego
+
+KLIKEGO_RUNNERS_PATH = "/types/generic/custo/x.running/findInInscrits.jsp"
+ATHLE_PATH = "/asp.net/liste.aspx"
+DEFAULT_PER_PAGE = 50
+DEFAULT_ATHLE_ROWS = 20
+# Athlètes par page des listes collectives (club, département, ligue)
+DEFAULT_BULK_ATHLETES = 10
+BULK_SCOPE_PARAMS = ("frmclub", "frmdepartement", "frmligue")
+
+SAMPLE_COURSES = [
+    "10 km de Limoges", "Semi Marathon de Brive", "Marathon de Paris", "Trail S des Monts",
+    "1/2 Marathon d'Aixe", "5 km route", "Corrida 8km", "Half Marathon", "Cross court", "Foulées 15 km",
+]
+SAMPLE_TIMES = ["1h23'45''", "45'12''", "1:23:45", "12'30", "2h05'", "38:12", "3h01'02''", "1h02", "41’07’’", "DNF"]
+
+_INSCRITS_PATH = re.compile(r"^/inscrits/(?:.*/)?([^/]+)/?$")
+
+
+def athle_fixture_rows(n_rows: int, seed: int = 0, name: Optional[str] = None,
+                       profile: Optional[Tuple[int, str]] = None) -> List[str]:
+    """
+    Lignes <tr> de performances synthétiques, avec le nom de l'athlète en 7e colonne s'il est donné
+    et, avec `profile` (année de naissance sur deux chiffres, sexe « M »/« F »), celui d'un seul athlète.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n_rows):
+        cells = ["<td>-</td>"] * 15
+        cells[4] = f"<td>{rng.choice(SAMPLE_COURSES)}</td>"
+        if name is not None:
+            cells[6] = f"<td><a href='#'>{name}</a></td>"
+        tag = "b" if rng.random() < 0.8 else "u"
+        cells[10] = f"<td><a href='#'><{tag}>{rng.choice(SAMPLE_TIMES)}</{tag}></a></td>"
+        if profile is None:
+            sex, year = rng.choice('MF'), rng.randint(0, 99)
+        else:
+            year, sex = profile
+        cells[14] = f"<td>SE{sex}/{year:02d}</td>"
+        rows.append("<tr>" + "".join(cells) + "</tr>")
+    return rows
+
+
+def athle_results_page(rows: List[str]) -> bytes:
+    html = (
+        "<html><head><meta charset='utf-8'></head><body>"
+        "<table id='ctnResultats'><tr><th>Résultats</th></tr>" + "".join(rows) + "</table>"
+        "</body></html>"
+    )
+    return html.encode("utf-8")
+
+
+def athle_fixture_page(n_rows: int, seed: int = 0) -> bytes:
+    """
+    Génère une page de résultats bases.athle.fr synthétique (table #ctnResultats)
+    avec `n_rows` lignes de performances.
+    """
+    return athle_results_page(athle_fixture_rows(n_rows, seed))
+
+
+def athle_athlete_seed(last_name: str, first_name: str, season: str, seed: int = 0) -> int:
+    """Graine des performances d'un athlète : identique en recherche nominative et en liste collective."""
+    key = "_".join(value.lower() for value in (last_name, first_name, season))
+    return zlib.crc32(key.encode("utf-8")) ^ seed
+
+
+def athle_bulk_page(members: List[Tuple[str, str]], season: str, page: int, n_rows: int, seed: int = 0,
+                    per_page: int = DEFAULT_BULK_ATHLETES) -> bytes:
+    """
+    Page `page` d'une liste collective : les performances de `per_page` athlètes (nom, prénom),
+    avec leur nom sur chaque ligne. Au-delà du dernier athlète, le tableau est vide.
+    """
+    rows = []
+    for last_name, first_name in members[page * per_page:(page + 1) * per_page]:
+        rows.extend(athle_fixture_rows(n_rows, athle_athlete_seed(last_name, first_name, season, seed),
+                                       name=f"{last_name} {first_name}"))
+    return athle_results_page(rows)
+
+
+def klikego_course_page(courses: Dict[str, int]) -> bytes:
+    """
+    Génère une page `inscrits/<référence>` Klikego avec la liste <select id="course">
+    (une option par épreuve, précédée de l'option vide du site).
+    """
+    options = "".join(f"<option value='{course_id}'>Course {course_id}</option>" for course_id in courses)
+    html = (
+        "<html><head><meta charset='utf-8'></head><body>"
+        "<select id='course'><option value=''>Choisir une épreuve</option>" + options + "</select>"
+        "</body></html>"
+    )
+    return html.encode("utf-8")
+
+
+def klikego_runner_name(course_id: str, number: int, shared_runners: int = 0) -> str:
+    """
+    Nom « NOM Prénom » du coureur `number` d'une épreuve. Les `shared_runners` premiers
+    sont les mêmes personnes dans toutes les épreuves, orthographiées selon l'épreuve
+    avec ou sans accent et majuscules, comme sur les vraies listes.
+    """
+    if number < shared_runners:
+        if zlib.crc32(course_id.encode("utf-8")) % 2:
+            return f"COMMUN{number}  Hélène{number}"
+        return f"Commun{number} HELENE{number}"
+    return f"NOM{course_id}X{number} Prenom{number}"
+
+
+def klikego_runners_page(course_id: str, page_number: int, race_size: int, per_page: int = DEFAULT_PER_PAGE,
+                         shared_runners: int = 0) -> bytes:
+    """
+    Génère la page `page_number` de la liste des inscrits d'une épreuve de `race_size` coureurs,
+    au format renvoyé par findInInscrits.jsp (avec ou sans dossard). Au-delà du dernier
+    inscrit, le tableau est vide.
+    """
+    first = page_number * per_page
+    rows = []
+    for number in range(first, min(first + per_page, race_size)):
+        name = klikego_runner_name(course_id, number, shared_runners)
+        if number % 3 == 0:
+            rows.append(f"<tr class='mt-1'><td><b>{number + 1}</b></td>"
+                        f"<td><div>-</div><div>{name}</div></td></tr>")
+        else:
+            rows.append(f"<tr class='mt-1'><td><div>-</div><div>{name}</div></td><td>Ville</td></tr>")
+    html = (
+        "<html><head><meta charset='utf-8'></head><body>"
+        "<table class='table table-sm table-bordered table-striped'>" + "".join(rows) + "</table>"
+        "</body></html>"
+    )
+    return html.encode("utf-8")
+
+
+class ReplayServer:
+    """
+    Serveur HTTP local qui se substitue à Klikego et à bases.athle.fr :
+    - GET  /inscrits/<référence>            : liste des épreuves,
+    - POST findInInscrits.jsp               : pages d'inscrits (paramètres `course` et `page`),
+    - GET  /asp.net/liste.aspx              : performances d'un athlète (frmnom, frmprenom, frmsaison)
+                                              ou d'un club, département, ligue (frmposition : page).
+    Les réponses viennent des fixtures enregistrées de `fixtures_dir` lorsqu'elles existent
+    (inscrits/<référence>.html, findInInscrits/<course>/<page>.html,
+    athle/<nom>_<prénom>_<saison>.html, athle_bulk/<club>_<département>_<ligue>/<saison>/<page>.html),
+    sinon de pages synthétiques déterministes.
+    `courses` associe chaque identifiant d'épreuve à son nombre d'inscrits, dont les
+    `shared_runners` premiers sont communs à toutes les épreuves ; chaque réponse est
+    retardée de `latency` secondes (± `jitter`) et une fraction `error_rate` des requêtes athle
+    (`klikego_error_rate` pour Klikego) répond 503.
+    Sans nom mais avec un club, un département ou une ligue, liste.aspx renvoie la liste
+    collective paginée (`frmposition`) d'une fraction `bulk_share` des inscrits non communs,
+    avec les mêmes performances que leur recherche nominative.
+    Avec `licensees` ((nom, prénom) en minuscules -> (année sur deux chiffres, sexe)), seuls ces
+    athlètes ont des performances, toutes à leur profil : toute autre recherche nominative est vide.
+    """
+
+    def __init__(self, courses: Optional[Dict[str, int]] = None, per_page: int = DEFAULT_PER_PAGE,
+                 shared_runners: int = 0,
+                 athle_rows: int = DEFAULT_ATHLE_ROWS, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, klikego_error_rate: float = 0.0,
+                 bulk_share: float = 0.5, licensees: Optional[Dict[Tuple[str, str], Tuple[int, str]]] = None,
+                 fixtures_dir: Optional[str] = None, seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.courses = dict(courses or {"1": 500})
+        self.per_page = per_page
+        self.shared_runners = shared_runners
+        self.athle_rows = athle_rows
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.klikego_error_rate = klikego_error_rate
+        self.bulk_share = bulk_share
+        self.licensees = licensees
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+        self.seed = seed
+        self.counts = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def athle_url(self) -> str:
+        return self.url + ATHLE_PATH
+
+    def _recorded(self, *parts: str) -> Optional[bytes]:
+        if self.fixtures_dir is None:
+            return None
+        path = self.fixtures_dir.joinpath(*parts)
+        return path.read_bytes() if path.is_file() else None
+
+    def _fails(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def _delay(self) -> None:
+        if self.latency or self.jitter:
+            with self._lock:
+                delay = self.latency + self._rng.uniform(-self.jitter, self.jitter)
+            time.sleep(max(0.0, delay))
+
+    def bulk_members(self, scope: str) -> List[Tuple[str, str]]:
+        """Inscrits (nom, prénom) présents dans la liste collective du périmètre `scope`."""
+        members = []
+        for course_id, race_size in self.courses.items():
+            for number in range(self.shared_runners, race_size):
+                last_name, first_name = klikego_runner_name(course_id, number).split()
+                if zlib.crc32(f"{scope}:{last_name}".encode("utf-8")) % 1000 < self.bulk_share * 1000:
+                    members.append((last_name, first_name))
+        return members
+
+    def respond(self, method: str, path: str, params: Dict[str, str]):
+        """Calcule la réponse (statut, corps) d'une requête et la comptabilise par route."""
+        inscrits = _INSCRITS_PATH.match(path)
+        if method == "GET" and inscrits:
+            route, error_rate = "inscrits", self.klikego_error_rate
+            reference_id = inscrits.group(1)
+            body = self._recorded("inscrits", f"{reference_id}.html") or klikego_course_page(self.courses)
+        elif method == "POST" and path == KLIKEGO_RUNNERS_PATH:
+            route, error_rate = "findInInscrits", self.klikego_error_rate
+            course_id, page = params.get("course", ""), params.get("page", "0")
+            body = self._recorded("findInInscrits", course_id, f"{page}.html")
+            if body is None:
+                body = klikego_runners_page(course_id, int(page), self.courses.get(course_id, 0), self.per_page,
+                                            self.shared_runners)
+        elif method == "GET" and path == ATHLE_PATH:
+            route, error_rate = "athle", self.error_rate
+            scope = ":".join(params.get(name, "") for name in BULK_SCOPE_PARAMS)
+            if not params.get("frmnom") and scope.strip(":"):
+                route = "athle_bulk"
+                season, page = params.get("frmsaison", ""), params.get("frmposition", "0")
+                body = self._recorded("athle_bulk", scope.replace(":", "_"), season, f"{page}.html")
+                if body is None:
+                    body = athle_bulk_page(self.bulk_members(scope), season, int(page), self.athle_rows, self.seed)
+            else:
+                key = "_".join(params.get(name, "").lower() for name in ("frmnom", "frmprenom", "frmsaison"))
+                body = self._recorded("athle", f"{key}.html")
+                if body is None and self.licensees is not None:
+                    last_name, first_name = (" ".join(params.get(name, "").lower().split())
+                                             for name in ("frmnom", "frmprenom"))
+                    profile = self.licensees.get((last_name, first_name))
+                    rows = [] if profile is None else athle_fixture_rows(
+                        self.athle_rows, athle_athlete_seed(last_name, first_name, params.get("frmsaison", ""),
+                                                            self.seed), profile=profile)
+                    body = athle_results_page(rows)
+                if body is None:
+                    body = athle_fixture_page(self.athle_rows,
+                                              seed=athle_athlete_seed(params.get("frmnom", ""),
+                                                                      params.get("frmprenom", ""),
+                                                                      params.get("frmsaison", ""), self.seed))
+        else:
+            with self._lock:
+                self.counts["unknown"] += 1
+            return 404, b""
+        failed = self._fails(error_rate)
+        with self._lock:
+            self.counts[route] += 1
+            if failed:
+                self.counts["errors"] += 1
+        return (503, b"") if failed else (200, body)
+
+    def _handler_class(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, method: str, query: str):
+                replay._delay()
+                params = {name: values[0] for name, values in parse_qs(query, keep_blank_values=True).items()}
+                status, body = replay.respond(method, urlsplit(self.path).path, params)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._reply("GET", urlsplit(self.path).query)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self._reply("POST", self.rfile.read(length).decode("utf-8"))
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    @contextlib.contextmanager
+    def patched(self) -> Iterator["ReplayServer"]:
+        """Redirige recup_klikego et baseathle vers ce serveur le temps du bloc."""
+        klikego_url, athle_url = recup_klikego.KLIKEGO_URL, baseathle.ATHLE_URL
+        recup_klikego.KLIKEGO_URL, baseathle.ATHLE_URL = self.url, self.athle_url
+        try:
+            yield self
+        finally:
+            recup_klikego.KLIKEGO_URL, baseathle.ATHLE_URL = klikego_url, athle_url
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur local rejouant Klikego et bases.athle.fr.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--race-size", type=int, default=500, help="Nombre d'inscrits de l'épreuve « 1 ».")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence simulée (secondes).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction de réponses athle en 503.")
+    parser.add_argument("--fixtures", help="Répertoire de fixtures enregistrées.")
+    args = parser.parse_args()
+
+    server = ReplayServer(courses={"1": args.race_size}, latency=args.latency, error_rate=args.error_rate,
+                          fixtures_dir=args.fixtures, port=args.port)
+    print(f"Klikego : {server.url}/inscrits/<référence>  athle : {server.athle_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(server.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from mesures import METRICS
+from noms import DEFAULT_MAX_CANDIDATES, Athlete, candidate_splits, normalize_name
+from parse_athle import Performance
+
+DEFAULT_RESOLUTIONS_PATH = "resolutions.sqlite"
+
+
+class Resolution(NamedTuple):
+    """Découpage confirmé d'un nom d'inscrit et profil (année de naissance, sexe) de l'athlète trouvé."""
+    last_name: str
+    first_name: str
+    birth_year: Optional[int]
+    sex: Optional[str]
+
+
+def runner_key(athlete: Athlete) -> str:
+    """Clé d'un inscrit : son nom complet normalisé, quel que soit le découpage reçu."""
+    return normalize_name(" ".join(athlete))
+
+
+def single_profile(performances: List[Performance]):
+    """
+    (année de naissance, sexe) commun à toutes les performances qui les renseignent,
+    ou None si elles mêlent plusieurs athlètes (homonymes) ou n'en renseignent aucun.
+    """
+    years = {p["birth_year"] for p in performances if p["birth_year"] is not None}
+    sexes = {p["sex"] for p in performances if p["sex"] is not None}
+    if len(years) > 1 or len(sexes) > 1 or not (years or sexes):
+        return None
+    return next(iter(years), None), next(iter(sexes), None)
+
+
+class NameResolver:
+    """
+    Résolution des noms d'inscrits en athlètes athle. Un nom Klikego ne dit pas où finit
+    le nom de famille (« Astier Saintamand Frédérique ») ni s'il garde ses accents :
+    les moteurs essaient les découpages de noms.candidate_splits, du plus probable au moins
+    probable, et s'arrêtent au premier qui trouve des performances.
+    Un découpage dont toutes les performances ont la même année de naissance et le même sexe
+    (colonne 15 d'athle) est confirmé et mémorisé (SQLite) : ensuite, il est essayé en premier.
+    Le nom seul ne distingue pas deux homonymes inscrits à des courses différentes : le découpage
+    mémorisé ne fait que changer l'ordre des recherches, aucune performance n'est écartée.
+    Les découpages ambigus (plusieurs profils) sont acceptés comme avant, sans être mémorisés ;
+    un découpage mémorisé dont les performances ne donnent plus le profil enregistré (homonyme
+    apparu, autre athlète) est oublié, puis remplacé si le nouveau profil est unique.
+    """
+
+    def __init__(self, path: str = DEFAULT_RESOLUTIONS_PATH, max_candidates: int = DEFAULT_MAX_CANDIDATES):
+        self.path = path
+        self.max_candidates = max_candidates
+        self.remembered = 0
+        self.confirmed = 0
+        self.forgotten = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS resolutions (
+                runner TEXT PRIMARY KEY,
+                last_name TEXT NOT NULL,
+                first_name TEXT NOT NULL,
+                birth_year INTEGER,
+                sex TEXT,
+                confirmed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        # Quelques milliers de lignes au plus : gardées en mémoire, la base ne sert qu'aux écritures
+        rows = self._conn.execute("SELECT runner, last_name, first_name, birth_year, sex FROM resolutions")
+        self._resolutions: Dict[str, Resolution] = {row[0]: Resolution(*row[1:]) for row in rows.fetchall()}
+
+    def resolution(self, athlete: Athlete) -> Optional[Resolution]:
+        with self._lock:
+            return self._resolutions.get(runner_key(athlete))
+
+    def candidates(self, athlete: Athlete) -> List[Athlete]:
+        """Découpages à essayer dans l'ordre : le découpage confirmé s'il existe, puis les candidats."""
+        splits = candidate_splits(" ".join(athlete), self.max_candidates) or [athlete]
+        resolution = self.resolution(athlete)
+        if resolution is None:
+            return splits
+        with self._lock:
+            self.remembered += 1
+        METRICS.increment("names_remembered")
+        preferred = (resolution.last_name, resolution.first_name)
+        return [preferred] + [split for split in splits if split != preferred]
+
+    def check(self, athlete: Athlete, candidate: Athlete,
+              performances: Optional[List[Performance]]) -> Optional[List[Performance]]:
+        """
+        Performances de l'inscrit `athlete` recherché sous `candidate`, renvoyées telles quelles ;
+        mémorise `candidate` s'il est confirmé et n'est pas déjà le découpage mémorisé avec ce profil,
+        oublie le découpage mémorisé si ses performances ne donnent plus le profil enregistré.
+        Une liste vide fait passer au découpage suivant ; None (échec) est renvoyé tel quel.
+        """
+        if not performances:
+            return performances
+        key = runner_key(athlete)
+        with self._lock:
+            resolution = self._resolutions.get(key)
+        profile = single_profile(performances)
+        if resolution is not None and (resolution.last_name, resolution.first_name) == candidate:
+            if profile == (resolution.birth_year, resolution.sex):
+                return performances
+            self.forget(athlete)
+        if profile is not None:
+            self._remember(key, Resolution(*candidate, *profile))
+        return performances
+
+    def _remember(self, key: str, resolution: Resolution) -> None:
+        with self._lock:
+            self._resolutions[key] = resolution
+            self.confirmed += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resolutions (runner, last_name, first_name, birth_year, sex, confirmed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, *resolution, time.time())
+            )
+            self._conn.commit()
+        METRICS.increment("names_confirmed")
+
+    def forget(self, athlete: Athlete) -> None:
+        """Oublie le découpage confirmé d'un inscrit (profil enregistré démenti)."""
+        key = runner_key(athlete)
+        with self._lock:
+            if self._resolutions.pop(key, None) is not None:
+                self.forgotten += 1
+            self._conn.execute("DELETE FROM resolutions WHERE runner = ?", (key,))
+            self._conn.commit()
+        METRICS.increment("names_forgotten")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._resolutions),
+                "remembered": self.remembered,
+                "confirmed": self.confirmed,
+                "forgotten": self.forgotten,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
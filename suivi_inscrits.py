@@ -0,0 +1,147 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from cache_athle import DEFAULT_TTL_SECONDS
+from noms import athlete_key
+from parse_athle import Performance, performances_from_json, performances_to_json
+
+DEFAULT_STORE_PATH = "inscrits.sqlite"
+
+Athlete = Tuple[str, str]
+
+
+def page_digest(html_content: str) -> str:
+    """Empreinte du contenu d'une page d'inscrits, pour savoir si elle a changé depuis la dernière visite."""
+    return hashlib.blake2b(html_content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def lookup_variant(min_distance_km: float, sex_filter, seasons: List[str]) -> str:
+    """Paramètres de recherche athle dont dépendent les performances mémorisées d'un athlète."""
+    return f"{min_distance_km:g}|{sex_filter or ''}|{','.join(seasons)}"
+
+
+class RegistrantStore:
+    """
+    Mémoire persistante (SQLite) des listes d'inscrits déjà parcourues, pour les rafraîchir
+    de façon incrémentale :
+    - pour chaque page (référence, épreuve, numéro), l'empreinte de son contenu et ses inscrits :
+      une page inchangée n'est pas analysée de nouveau,
+    - pour chaque événement, les performances des athlètes déjà recherchés : seuls les
+      nouveaux inscrits sont recherchés sur athle.
+    Les recherches en échec ne sont pas mémorisées et sont donc relancées au rafraîchissement suivant.
+    Comme dans PerformanceCache, les performances mémorisées expirent après `ttl_seconds`,
+    sauf si elles ont été récupérées après la fin de toutes leurs saisons.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.unchanged_pages = 0
+        self.changed_pages = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                reference_id TEXT NOT NULL,
+                course_id TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                runners TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (reference_id, course_id, page)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                reference_id TEXT NOT NULL,
+                variant TEXT NOT NULL,
+                last_name TEXT NOT NULL,
+                first_name TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (reference_id, variant, last_name, first_name)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def page_runners(self, reference_id: str, course_id: str, page: int, digest: str) -> Optional[List[str]]:
+        """Inscrits mémorisés de la page si son empreinte n'a pas changé, sinon None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, runners FROM pages WHERE reference_id = ? AND course_id = ? AND page = ?",
+                (reference_id, course_id, page)
+            ).fetchone()
+            if row is None or row[0] != digest:
+                self.changed_pages += 1
+                return None
+            self.unchanged_pages += 1
+        return json.loads(row[1])
+
+    def save_page(self, reference_id: str, course_id: str, page: int, digest: str, runners: List[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (reference_id, course_id, page, digest, runners, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (reference_id, course_id, page, digest, json.dumps(runners, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+
+    def known_results(self, reference_id: str, variant: str,
+                      final_after: Optional[float] = None) -> Dict[Athlete, List[Performance]]:
+        """
+        Performances mémorisées et encore valables des athlètes de l'événement, par clé normalisée
+        (noms.athlete_key). Celles enregistrées après `final_after` (fin de la dernière saison
+        recherchée) n'expirent pas.
+        """
+        query = "SELECT last_name, first_name, data FROM results WHERE reference_id = ? AND variant = ?"
+        params = [reference_id, variant]
+        if self.ttl_seconds is not None:
+            query += " AND (updated_at >= ? OR updated_at >= ?)"
+            params.extend([time.time() - self.ttl_seconds, final_after if final_after is not None else float("inf")])
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return {(last_name, first_name): performances_from_json(data) for last_name, first_name, data in rows}
+
+    def save_results(self, reference_id: str, variant: str,
+                     results: List[Tuple[Athlete, List[Performance]]]) -> None:
+        now = time.time()
+        rows = [(reference_id, variant, *athlete_key(athlete), performances_to_json(performances), now)
+                for athlete, performances in results]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (reference_id, variant, last_name, first_name, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def forget(self, reference_id: str) -> None:
+        """Oublie un événement : le prochain chargement repart de zéro."""
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE reference_id = ?", (reference_id,))
+            self._conn.execute("DELETE FROM results WHERE reference_id = ?", (reference_id,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            results = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {
+            "pages": pages,
+            "results": results,
+            "unchanged_pages": self.unchanged_pages,
+            "changed_pages": self.changed_pages,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
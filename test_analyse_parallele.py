@@ -0,0 +1,43 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from analyse_parallele import ParsePool, parse_performance_records, records_to_performances
+from parse_athle import parse_performances
+from recup_klikego import extract_runners
+from replay_server import athle_fixture_page, athle_results_page, klikego_runners_page
+
+# Pages athle synthétiques (lignes valides, non classables, trails…), dont une page sans résultat
+ATHLE_PAGES = [athle_fixture_page(40, seed=seed) for seed in range(8)] + [athle_results_page([])]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ParsePool(2) as pool:
+        yield pool
+
+
+def test_records_round_trip():
+    for content in ATHLE_PAGES:
+        assert records_to_performances(parse_performance_records(content)) == parse_performances(content)
+
+
+def test_pool_parses_like_the_calling_thread(pool):
+    expected = [parse_performances(content) for content in ATHLE_PAGES]
+    # Pages confiées au pool depuis plusieurs threads d'entrée/sortie à la fois
+    with ThreadPoolExecutor(max_workers=4) as io_workers:
+        assert list(io_workers.map(pool.parse_performances, ATHLE_PAGES)) == expected
+
+
+def test_pool_parses_from_asyncio(pool):
+    async def parse_all():
+        return await asyncio.gather(*(pool.parse_performances_async(content) for content in ATHLE_PAGES))
+
+    assert asyncio.run(parse_all()) == [parse_performances(content) for content in ATHLE_PAGES]
+
+
+@pytest.mark.parametrize("page_number", [0, 1, 2])
+def test_pool_extracts_runners_like_the_calling_thread(pool, page_number):
+    page = klikego_runners_page("1", page_number, 90, per_page=40, shared_runners=3).decode("utf-8")
+    assert pool.extract_runners(page) == extract_runners(page)
@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+
+import cache_athle
+from cache_athle import ACCESS_FLUSH_SIZE, PerformanceCache
+from parse_athle import Performance
+
+DAY = 24 * 3600
+PERFORMANCES = [Performance("10 km de limoges", 10.0, "41'07''", 2467, 14.6, 2005, "f")]
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_athle.time, "time", clock)
+    return clock
+
+
+def _last_access(path):
+    with sqlite3.connect(path) as conn:
+        return dict(((row[0], row[1]), row[2]) for row in
+                    conn.execute("SELECT last_name, first_name, last_access FROM performances"))
+
+
+def test_round_trip_and_key_normalization(tmp_path):
+    cache = PerformanceCache(str(tmp_path / "cache.sqlite"))
+    assert cache.get("DUPONT", "Hélène", "2025") is None
+    cache.set("DUPONT", "Hélène", "2025", PERFORMANCES)
+    assert cache.get(" dupont ", "HÉLÈNE", 2025) == PERFORMANCES
+    assert cache.get("DUPONT", "Hélène", "2024") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3, "entries": 1}
+    cache.close()
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = PerformanceCache(str(tmp_path / "cache.sqlite"), ttl_seconds=7 * DAY)
+    cache.set("DUPONT", "Jean", "2025", PERFORMANCES)
+    clock.now += 7 * DAY
+    assert cache.get("DUPONT", "Jean", "2025") == PERFORMANCES
+    clock.now += 1
+    assert cache.get("DUPONT", "Jean", "2025") is None
+    # Réécrite, l'entrée repart pour un TTL complet
+    cache.set("DUPONT", "Jean", "2025", PERFORMANCES)
+    assert cache.get("DUPONT", "Jean", "2025") == PERFORMANCES
+    cache.close()
+
+
+def test_entries_saved_after_season_end_never_expire(tmp_path, clock):
+    cache = PerformanceCache(str(tmp_path / "cache.sqlite"), ttl_seconds=DAY)
+    season_end = clock.now
+    cache.set("DUPONT", "Jean", "2024", PERFORMANCES)
+    clock.now -= 10
+    cache.set("MARTIN", "Paul", "2024", PERFORMANCES)
+    clock.now += 365 * DAY
+    assert cache.get("DUPONT", "Jean", "2024", final_after=season_end) == PERFORMANCES
+    assert cache.get("MARTIN", "Paul", "2024", final_after=season_end) is None
+    assert cache.get("DUPONT", "Jean", "2024") is None
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = PerformanceCache(str(tmp_path / "cache.sqlite"), max_entries=3)
+    for name in ("A", "B", "C"):
+        cache.set(name, "x", "2025", PERFORMANCES)
+        clock.now += 1
+    assert cache.get("A", "x", "2025") == PERFORMANCES
+    clock.now += 1
+    # Remplacer une entrée n'en ajoute pas
+    cache.set("C", "x", "2025", PERFORMANCES)
+    assert cache.stats()["entries"] == 3
+    clock.now += 1
+    cache.set("D", "x", "2025", PERFORMANCES)
+    assert cache.stats()["entries"] == 3
+    assert cache.get("B", "x", "2025") is None
+    assert all(cache.get(name, "x", "2025") == PERFORMANCES for name in ("A", "C", "D"))
+    cache.close()
+
+
+def test_eviction_counts_entries_written_by_another_process(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PerformanceCache(path, max_entries=4)
+    other = PerformanceCache(path, max_entries=4)
+    for name in ("A", "B", "C"):
+        other.set(name, "x", "2025", PERFORMANCES)
+        clock.now += 1
+    # Les entrées de l'autre processus sont recomptées dès que le compte local dépasse la limite
+    for name in ("D", "E", "F", "G", "H"):
+        cache.set(name, "x", "2025", PERFORMANCES)
+        clock.now += 1
+    assert cache.stats()["entries"] == 4
+    assert [name for name in "ABCDEFGH" if cache.get(name, "x", "2025")] == ["E", "F", "G", "H"]
+    other.close()
+    cache.close()
+
+
+def test_accesses_are_written_in_batches(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PerformanceCache(path)
+    cache.set("A", "x", "2025", PERFORMANCES)
+    created = clock.now
+    clock.now += 60
+    for _ in range(ACCESS_FLUSH_SIZE - 1):
+        assert cache.get("A", "x", "2025") == PERFORMANCES
+    assert _last_access(path) == {("a", "x"): created}
+    for number in range(1, ACCESS_FLUSH_SIZE):
+        cache.set(f"N{number}", "x", "2025", PERFORMANCES)
+        cache.get(f"N{number}", "x", "2025")
+    assert _last_access(path)[("a", "x")] == created + 60
+    # La fermeture écrit les accès en attente
+    clock.now += 60
+    cache.get("A", "x", "2025")
+    cache.close()
+    assert _last_access(path)[("a", "x")] == created + 120
@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cache_partage import SharedCache
+
+CALLERS = 8
+
+
+class FakeClock:
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _until(condition, timeout: float = 5.0) -> None:
+    # Attend qu'une condition posée par d'autres threads devienne vraie
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition jamais atteinte")
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_fetch():
+    cache = SharedCache()
+    calls = []
+
+    def fetch():
+        calls.append(threading.current_thread().name)
+        # Le meneur ne termine qu'une fois tous les autres demandeurs en attente
+        _until(lambda: cache.stats()["coalesced"] == CALLERS - 1)
+        return ["DUPONT Jean"]
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as callers:
+        results = list(callers.map(lambda _: cache.get_or_fetch("listing", fetch), range(CALLERS)))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.get_or_fetch("listing", fetch) is results[0]
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"], stats["in_flight"]) == (1, CALLERS - 1, 1, 0)
+
+
+def test_concurrent_coroutines_share_one_fetch():
+    cache = SharedCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        while cache.stats()["coalesced"] < CALLERS - 1:
+            await asyncio.sleep(0.001)
+        return ["DUPONT Jean"]
+
+    async def fetch_all():
+        return await asyncio.gather(*(cache.get_or_fetch_async("listing", fetch) for _ in range(CALLERS)))
+
+    results = asyncio.run(fetch_all())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_coroutine_waits_for_a_fetch_led_by_a_thread():
+    cache = SharedCache()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "page"
+
+    async def fetch_again():
+        return await cache.get_or_fetch_async("listing", fetch_from_loop)
+
+    async def fetch_from_loop():
+        calls.append(1)
+        return "autre"
+
+    leader = threading.Thread(target=cache.get_or_fetch, args=("listing", fetch))
+    leader.start()
+    _until(lambda: cache.stats()["in_flight"] == 1)
+    threading.Timer(0.05, release.set).start()
+    assert asyncio.run(fetch_again()) == "page"
+    leader.join()
+    assert len(calls) == 1
+
+
+def test_failures_reach_every_waiter_but_are_not_cached():
+    cache = SharedCache()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            _until(lambda: cache.stats()["coalesced"] == CALLERS - 1)
+            raise ConnectionError("klikego injoignable")
+        return None
+
+    def call(_):
+        try:
+            return cache.get_or_fetch("listing", fetch)
+        except ConnectionError as exc:
+            return exc
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as callers:
+        results = list(callers.map(call, range(CALLERS)))
+    assert len(calls) == 1
+    assert all(isinstance(result, ConnectionError) for result in results)
+    # Ni l'exception ni None (échec par défaut) ne sont mis en cache
+    assert cache.get_or_fetch("listing", fetch) is None
+    assert cache.get_or_fetch("listing", lambda: "page") == "page"
+    assert len(calls) == 2
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = SharedCache(clock=clock)
+    assert cache.get_or_fetch("listing", lambda: "v1", ttl=600) == "v1"
+    cache.set("forever", "v")
+    clock.now += 600
+    assert cache.get_or_fetch("listing", lambda: "v2", ttl=600) == "v1"
+    clock.now += 0.1
+    assert cache.get("listing") is None
+    assert cache.get_or_fetch("listing", lambda: "v2", ttl=600) == "v2"
+    clock.now += 10 ** 6
+    assert cache.get("forever") == "v"
+
+
+def test_invalidate_removes_matching_keys_only():
+    cache = SharedCache()
+    for key in [("inscrits", "ref1", "1", 0), ("inscrits", "ref1", "1", 1), ("inscrits", "ref2", "1", 0),
+                ("athle", "dupont", "jean", "2025")]:
+        cache.set(key, [key])
+    before = cache.stats()["bytes"]
+    assert cache.invalidate(lambda key: key[0] == "inscrits" and key[1] == "ref1") == 2
+    assert cache.get(("inscrits", "ref1", "1", 0)) is None
+    assert cache.get(("inscrits", "ref2", "1", 0)) is not None
+    assert cache.get(("athle", "dupont", "jean", "2025")) is not None
+    assert 0 < cache.stats()["bytes"] < before
+    assert cache.invalidate(lambda key: False) == 0
+
+
+def test_invalidate_does_not_interrupt_a_fetch_in_flight():
+    cache = SharedCache()
+    release = threading.Event()
+    leader = ThreadPoolExecutor(max_workers=1)
+    result = leader.submit(cache.get_or_fetch, "listing", lambda: release.wait(5) and "page")
+    _until(lambda: cache.stats()["in_flight"] == 1)
+    assert cache.invalidate(lambda key: True) == 0
+    release.set()
+    assert result.result() == "page"
+    leader.shutdown()
+    assert cache.get("listing") == "page"
+
+
+@pytest.mark.parametrize("max_bytes", [2000, 5000])
+def test_least_recently_used_entries_are_evicted(max_bytes):
+    cache = SharedCache(max_bytes=max_bytes)
+    for number in range(50):
+        cache.set(number, [f"coureur {number}"] * 5)
+        cache.get(0)
+    stats = cache.stats()
+    assert stats["bytes"] <= max_bytes
+    assert stats["evictions"] == 50 - stats["entries"]
+    assert cache.get(0) is not None
+    assert cache.get(49) is not None
+    assert cache.get(1) is None
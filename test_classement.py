@@ -0,0 +1,90 @@
+import random
+
+import pandas as pd
+import pytest
+
+import baseathle
+from classement import IncrementalRanking, format_hms, performances_to_frame, rank_performances, ranking_table
+
+CURRENT_YEAR = pd.Timestamp.now().year
+# Réglages de l'application à comparer à l'ancienne chaîne de dicts
+SETTINGS = [
+    dict(min_age=18, max_age=60, speed_threshold=25, min_distance_km=5, sex_filter="f"),
+    dict(min_age=0, max_age=200, speed_threshold=float("inf"), min_distance_km=0, sex_filter=None),
+    dict(min_age=40, max_age=49, speed_threshold=14, min_distance_km=21, sex_filter="m"),
+]
+
+
+def _performances(count: int = 600, athletes: int = 40, seed: int = 0, times=None) -> list:
+    # Performances au format de parse_athle : distances et années parfois inconnues, vitesses à égalité
+    # (sauf avec `times`, intervalle des temps tirés à la seconde près)
+    rng = random.Random(seed)
+    profiles = [(f"Prenom{i} NOM{i}", CURRENT_YEAR - rng.randint(10, 80), rng.choice(["m", "f", None]))
+                for i in range(athletes)]
+    performances = []
+    for _ in range(count):
+        athlete, birth_year, sex = profiles[rng.randrange(athletes)]
+        distance_km = rng.choice([5.0, 10.0, 21.0, 42.0, None])
+        total_seconds = rng.randint(*times) if times else rng.choice([1800, 2400, 3600, 5400, 9000, 14400])
+        performances.append({
+            "athlete": athlete, "course_name": f"{distance_km} km", "distance_km": distance_km, "time": "-",
+            "total_seconds": total_seconds, "speed_kph": distance_km / (total_seconds / 3600) if distance_km else 0,
+            "birth_year": birth_year if rng.random() < 0.9 else None, "sex": sex,
+        })
+    return performances
+
+
+def _rank_with_dicts(performances: list, min_age, max_age, speed_threshold, min_distance_km, sex_filter) -> list:
+    # Ancienne chaîne de baseathle : boucles sur des dicts, tri stable par vitesse décroissante
+    filtered = baseathle.filter_performances(performances, min_distance_km, sex_filter)
+    filtered = baseathle.filter_performances_by_age(filtered, min_age, max_age)
+    best = baseathle.calculate_best_performance(filtered, speed_threshold).values()
+    return sorted(best, key=lambda p: p["speed_kph"], reverse=True)
+
+
+@pytest.mark.parametrize("settings", SETTINGS)
+def test_rank_performances_matches_dict_chain(settings):
+    performances = _performances()
+    expected = _rank_with_dicts(performances, **settings)
+    ranked = rank_performances(performances_to_frame(performances), **settings)
+    assert ranked["athlete"].tolist() == [p["athlete"] for p in expected]
+    assert ranked["total_seconds"].tolist() == [p["total_seconds"] for p in expected]
+    # Frame numérique : le temps n'est formaté qu'à la mise en forme (ranking_table)
+    assert "Temps" not in ranked.columns
+    assert ranked["total_seconds"].dtype == "int64"
+
+
+def test_rank_performances_of_no_performance():
+    assert rank_performances(performances_to_frame([]), **SETTINGS[0]).empty
+
+
+@pytest.mark.parametrize("seconds, expected", [
+    (0, "0h 0min 0s"), (59, "0h 0min 59s"), (3600, "1h 0min 0s"), (5025, "1h 23min 45s"), (90061, "25h 1min 1s"),
+])
+def test_format_hms(seconds, expected):
+    assert format_hms(pd.Series([seconds])).tolist() == [expected]
+
+
+def test_ranking_table_columns_and_order():
+    performances = _performances()
+    ranked = rank_performances(performances_to_frame(performances), **SETTINGS[1])
+    table = ranking_table(ranked.sample(frac=1, random_state=0))
+    assert list(table.columns) == ["Nom complet", "date_of_birth", "sex", "distance_km", "Temps", "Speed (km/h)"]
+    # Mêmes lignes, retriées par vitesse décroissante (ordre des égalités non garanti après mélange)
+    assert table["Speed (km/h)"].tolist() == ranked["speed_kph"].tolist()
+    assert sorted(zip(table["Nom complet"], table["Temps"])) == sorted(
+        zip(ranked["athlete"], [f"{s // 3600}h {(s % 3600) // 60}min {s % 60}s" for s in ranked["total_seconds"]]))
+
+
+@pytest.mark.parametrize("settings", SETTINGS)
+@pytest.mark.parametrize("k", [1, 10, 1000])
+def test_incremental_top_matches_rank_performances(settings, k):
+    performances = _performances(2000, 300, seed=1, times=(900, 18000))
+    ranking = IncrementalRanking(k=k, current_year=CURRENT_YEAR, **settings)
+    # Performances reçues athlète par athlète, dans le désordre, comme depuis le pipeline
+    for start in range(0, len(performances), 7):
+        ranking.add(performances[start:start + 7])
+    ranked = rank_performances(performances_to_frame(performances), current_year=CURRENT_YEAR, **settings).head(k)
+    top = ranking.top()
+    assert [p["athlete"] for p in top] == ranked["athlete"].tolist()
+    assert [p["speed_kph"] for p in top] == ranked["speed_kph"].tolist()
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+
+import pytest
+
+import concurrence
+from concurrence import AIMDController, TokenBucket, backoff_delay
+
+
+class FakeClock:
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _complete(controller: AIMDController, latency: float = 0.1, ok: bool = True) -> None:
+    # Une requête complète : une place prise puis rendue avec sa latence et son résultat
+    assert controller.try_acquire()
+    controller.release(latency, ok)
+
+
+def test_slow_start_adds_one_per_success_up_to_maximum():
+    controller = AIMDController(initial=2, minimum=1, maximum=10, clock=FakeClock())
+    for expected in (3, 4, 5):
+        _complete(controller)
+        assert controller.limit == expected
+    for _ in range(20):
+        _complete(controller)
+    assert controller.limit == 10
+
+
+def test_error_halves_the_limit_once_per_latency_interval():
+    clock = FakeClock()
+    controller = AIMDController(initial=8, minimum=2, maximum=100, clock=clock)
+    _complete(controller)
+    assert controller.limit == 9
+    _complete(controller, ok=False)
+    assert controller.limit == 4
+    # Rafale d'erreurs dans le même intervalle de latence : une seule diminution
+    _complete(controller, ok=False)
+    assert controller.limit == 4
+    clock.now += 1
+    _complete(controller, ok=False)
+    assert controller.limit == 2
+    clock.now += 1
+    _complete(controller, ok=False)
+    assert controller.limit == 2
+    assert controller.error_rate == pytest.approx(4 / 5)
+
+
+def test_additive_increase_after_first_decrease():
+    controller = AIMDController(initial=9, minimum=1, maximum=100, clock=FakeClock())
+    _complete(controller, ok=False)
+    assert controller.limit == 4
+    # Plus de démarrage lent : +1 par fenêtre d'environ `limit` succès
+    _complete(controller)
+    assert controller.limit == 4
+    for _ in range(3):
+        _complete(controller)
+    assert controller.limit == 5
+
+
+def test_latency_growth_decreases_gently():
+    controller = AIMDController(initial=10, minimum=1, maximum=100, clock=FakeClock())
+    _complete(controller, latency=0.1)
+    assert controller.limit == 11
+    # Moyenne glissante 0.48 s : plus de 3 fois la latence minimale et 0.38 s au-dessus
+    _complete(controller, latency=2.0)
+    assert controller.limit == 9
+    assert controller.stats()["avg_latency"] == pytest.approx(0.48)
+
+
+def test_latency_jitter_of_fast_server_is_ignored():
+    controller = AIMDController(initial=10, minimum=1, maximum=100, clock=FakeClock())
+    _complete(controller, latency=0.001)
+    # Dix fois la latence minimale, mais à moins de `latency_slack` : pas une surcharge
+    for _ in range(5):
+        _complete(controller, latency=0.1)
+    assert controller.limit == 16
+
+
+def test_acquire_respects_limit_and_wakes_waiters():
+    controller = AIMDController(initial=2, minimum=2, maximum=2)
+    assert controller.try_acquire() and controller.try_acquire()
+    assert not controller.try_acquire()
+    assert controller.in_flight == 2
+
+    async def wait_for_place():
+        waiter = asyncio.ensure_future(controller.acquire_async())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        threading.Thread(target=controller.release).start()
+        await asyncio.wait_for(waiter, timeout=5)
+
+    asyncio.run(wait_for_place())
+    assert controller.in_flight == 2
+    released = threading.Timer(0.05, controller.release)
+    released.start()
+    controller.acquire()
+    released.join()
+    assert controller.in_flight == 2
+
+
+def test_token_bucket_refills_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+    assert [bucket.reserve() for _ in range(5)] == [0.0, 0.0, 0.0, 0.5, 1.0]
+    clock.now += 1
+    # Deux jetons regagnés en une seconde, tous deux déjà réservés
+    assert bucket.reserve() == 0.5
+    clock.now += 100
+    # Jamais plus de `burst` jetons d'avance
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.0, 0.5]
+
+
+def test_token_bucket_acquire_sleeps_the_reserved_delay(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(concurrence.time, "sleep", sleeps.append)
+    bucket = TokenBucket(rate=4, clock=FakeClock())
+    for _ in range(6):
+        bucket.acquire()
+    assert sleeps == [0.25, 0.5]
+
+
+@pytest.mark.parametrize("attempt, bound", [(0, 0.5), (1, 1.0), (2, 2.0), (4, 8.0), (10, 8.0)])
+def test_backoff_delay_bounds(monkeypatch, attempt, bound):
+    monkeypatch.setattr(concurrence.random, "uniform", lambda low, high: (low, high))
+    assert backoff_delay(attempt) == (0, bound)
+    assert backoff_delay(attempt, base=0.1, cap=1.0) == (0, min(1.0, 0.1 * 2 ** attempt))
+
+
+def test_backoff_delay_stays_within_bounds():
+    delays = [backoff_delay(attempt) for attempt in range(8) for _ in range(50)]
+    assert all(0 <= delay <= 8.0 for delay in delays)
+    assert all(0 <= backoff_delay(1) <= 1.0 for _ in range(50))
@@ -0,0 +1,73 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from classement import performances_to_frame, ranking_table
+from export_classement import EXPORT_FORMATS, RankingWriter, ranking_bytes, write_ranking
+
+
+def _ranking(sex: str, count: int, offset: int = 0) -> pd.DataFrame:
+    # Classement d'athlètes d'un seul sexe : la colonne category n'a qu'une catégorie
+    return ranking_table(performances_to_frame([
+        {"athlete": f"Prenom{i} NOM{i}", "course_name": "10 km", "distance_km": 10.0, "time": "-",
+         "total_seconds": 2400 + 37 * i, "speed_kph": round(36000 / (2400 + 37 * i), 3),
+         "birth_year": 1960 + i % 40, "sex": sex}
+        for i in range(offset, offset + count)
+    ]))
+
+
+def _read(data: bytes, output_format: str) -> pd.DataFrame:
+    if output_format == "parquet":
+        return pd.read_parquet(io.BytesIO(data))
+    if output_format == "arrow":
+        return pa.ipc.open_file(io.BytesIO(data)).read_pandas()
+    return pd.read_csv(io.BytesIO(data))
+
+
+def _records(frame: pd.DataFrame) -> list:
+    return [tuple(str(value) for value in row) for row in frame.itertuples(index=False)]
+
+
+@pytest.mark.parametrize("output_format", EXPORT_FORMATS)
+def test_writer_appends_frames_with_different_categories(output_format):
+    # Plusieurs write() successifs, catégories de `sex` différentes d'un appel à l'autre
+    frames = [_ranking("m", 5), _ranking("f", 7, offset=5), _ranking("m", 3, offset=12)]
+    buffer = io.BytesIO()
+    with RankingWriter(buffer, output_format, row_group_size=4) as writer:
+        for frame in frames:
+            writer.write(frame)
+    assert writer.rows == 15
+    assert writer.row_groups == 2 + 2 + 1
+    read = _read(buffer.getvalue(), output_format)
+    assert list(read.columns) == list(frames[0].columns)
+    assert _records(read) == [record for frame in frames for record in _records(frame)]
+
+
+@pytest.mark.parametrize("output_format", EXPORT_FORMATS)
+def test_empty_ranking_keeps_columns(output_format):
+    data = ranking_bytes(_ranking("m", 0), output_format)
+    read = _read(data, output_format)
+    assert read.empty
+    assert list(read.columns) == list(_ranking("m", 1).columns)
+
+
+def test_streamed_parquet_matches_to_parquet(tmp_path):
+    table = pd.concat([_ranking("m", 40), _ranking("f", 40, offset=40)], ignore_index=True)
+    table["sex"] = table["sex"].astype("category")
+    table.to_parquet(tmp_path / "old.parquet", index=False)
+    assert write_ranking(table, str(tmp_path / "new.parquet"), "parquet", row_group_size=7) == {
+        "rows": 80, "row_groups": 12,
+    }
+    assert pd.read_parquet(tmp_path / "new.parquet").equals(pd.read_parquet(tmp_path / "old.parquet"))
+
+
+def test_streamed_csv_matches_to_csv():
+    table = _ranking("f", 50)
+    assert ranking_bytes(table, "csv", row_group_size=7) == table.to_csv(index=False).encode("utf-8")
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        RankingWriter(io.BytesIO(), "xlsx")
@@ -0,0 +1,136 @@
+import json
+import pickle
+
+import pytest
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from parse_athle import (TRAIL, Performance, course_distance, parse_performance_rows, parse_performances, parse_time,
+                         performances_from_json, performances_to_json)
+from replay_server import athle_fixture_page, athle_results_page
+
+# Formats de temps rencontrés sur bases.athle.fr et valeur attendue en secondes (None : non classable)
+TIME_CORPUS = [
+    ("1h23'45''", 5025), ("3h01'02''", 10862), ("0h59'59''", 3599), ("1h 23' 45''", 5025),
+    ("1h23’45’’", 5025), ("1h23′45″", 5025), ("1h02", 3720), ("2h05'", 7500), ("2h", 7200),
+    ("45'12''", 2712), ("41’07’’", 2467), ("12'34''56", 754), ("10'05\"", 605), ("12'30", 750),
+    ("9''87", 9), ("1:23:45", 5025), ("38:12", 2292), ("1:02:03.4", 3723), ("  45'12''  ", 2712),
+    ("DNF", None), ("DQ", None), ("Ab.", None), ("", None), ("12'", None),
+]
+
+# Noms de courses (en minuscules) et distance attendue (TRAIL : exclu du classement)
+COURSE_CORPUS = [
+    ("10 km de limoges", 10.0), ("corrida 8km", 8.0), ("foulées 15 km", 15.0), ("5 km route", 5.0),
+    ("semi marathon de brive", 21.0), ("semi-marathon de tulle", 21.0), ("demi-marathon d'uzerche", 21.0),
+    ("semi_marathon", 21.0), ("1/2 marathon d'aixe", 21.0), ("half marathon", 21.0),
+    ("marathon de paris", 42.0), ("trail s des monts", TRAIL), ("trail xl 80 km", TRAIL),
+    ("trail marathon", TRAIL), ("trail 25km", 25.0), ("cross court", None), ("semi 21km", None),
+]
+
+
+def _row(course_name: str, time_cell: str, profile: str = "-") -> str:
+    cells = ["<td>-</td>"] * 15
+    cells[4] = f"<td>{course_name}</td>"
+    cells[10] = f"<td>{time_cell}</td>"
+    cells[14] = f"<td>{profile}</td>"
+    return "<tr>" + "".join(cells) + "</tr>"
+
+
+def test_single_pass_matches_beautifulsoup_roundtrip():
+    # Ancienne chaîne BeautifulSoup -> str -> etree, référence du parseur en une passe
+    page = athle_fixture_page(200)
+    legacy = parse_performance_rows(etree.HTML(str(BeautifulSoup(page, "html.parser"))))
+    assert legacy
+    assert parse_performances(page) == legacy
+
+
+def test_parse_performances_fields():
+    page = athle_results_page([
+        _row("10 km de Limoges", "<a href='#'><b>41'07''</b></a>", "SEF/05"),
+        _row("Semi-Marathon de Tulle", "<a href='#'><u>1h32'10''</u></a>", "V1M/71"),
+        _row("Trail XL 80 km", "<b>9h10'00''</b>", "SEM/90"),
+        _row("Cross court", "<b>DNF</b>", "SEM/90"),
+        _row("5 km route", "-"),
+    ])
+    performances = parse_performances(page)
+    assert [dict(p) for p in performances] == [
+        {"course_name": "10 km de limoges", "distance_km": 10.0, "time": "41'07''", "total_seconds": 2467,
+         "speed_kph": pytest.approx(10.0 / (2467 / 3600)), "birth_year": 2005, "sex": "f"},
+        {"course_name": "semi-marathon de tulle", "distance_km": 21.0, "time": "1h32'10''", "total_seconds": 5530,
+         "speed_kph": pytest.approx(21.0 / (5530 / 3600)), "birth_year": 1971, "sex": "m"},
+    ]
+
+
+def test_parse_performances_without_results_table():
+    assert parse_performances(b"<html><body><p>Aucun resultat</p></body></html>") == []
+    assert parse_performances(athle_results_page([])) == []
+
+
+@pytest.mark.parametrize("text, expected", TIME_CORPUS)
+def test_parse_time(text, expected):
+    assert parse_time(text) == expected
+
+
+@pytest.mark.parametrize("course_name, expected", COURSE_CORPUS)
+def test_course_distance(course_name, expected):
+    assert course_distance(course_name) == expected
+
+
+# Performances avec et sans athlète, champs facultatifs vides
+PERFORMANCES = [
+    Performance("10 km de limoges", 10.0, "41'07''", 2467, 14.6, 2005, "f"),
+    Performance("10 km de limoges", 10.0, "41'07''", 2467, 14.6, 2005, "f", athlete="DUPONT Hélène"),
+    Performance("cross court", None, "12'30", 750, 0, None, None, athlete="MARTIN Paul"),
+]
+
+
+@pytest.mark.parametrize("performance", PERFORMANCES)
+def test_performance_mapping_contract(performance):
+    # Se lit comme l'ancien dict produit par le parseur puis complété de l'athlète
+    legacy = {"course_name": performance.course_name, "distance_km": performance.distance_km,
+              "time": performance.time, "total_seconds": performance.total_seconds,
+              "speed_kph": performance.speed_kph, "birth_year": performance.birth_year, "sex": performance.sex}
+    if performance.athlete is not None:
+        legacy["athlete"] = performance.athlete
+    assert dict(performance) == legacy
+    assert performance == legacy
+    assert list(performance) == list(legacy)
+    assert len(performance) == len(legacy)
+    assert all(performance[key] == value for key, value in legacy.items())
+    assert ("athlete" in performance) == (performance.athlete is not None)
+    assert performance.get("athlete") == legacy.get("athlete")
+    with pytest.raises(KeyError):
+        performance["club"]
+    if performance.athlete is None:
+        with pytest.raises(KeyError):
+            performance["athlete"]
+
+
+def test_with_athlete_copies_the_performance():
+    performance = PERFORMANCES[0]
+    named = performance.with_athlete("DUPONT Hélène")
+    assert named == PERFORMANCES[1]
+    assert "athlete" not in performance
+    assert named.record() == performance.record()
+
+
+@pytest.mark.parametrize("performance", PERFORMANCES)
+def test_performance_pickle_round_trip(performance):
+    restored = pickle.loads(pickle.dumps(performance))
+    assert type(restored) is Performance
+    assert restored == performance
+    assert restored.athlete == performance.athlete
+    # Chaînes de nouveau internées dans le processus qui relit
+    assert restored.course_name is performance.course_name
+
+
+def test_performances_json_round_trip():
+    page_performances = parse_performances(athle_fixture_page(50))
+    performances = PERFORMANCES + [p.with_athlete("NOM Prénom") for p in page_performances]
+    text = performances_to_json(performances)
+    assert json.loads(text) == [dict(p) for p in performances]
+    restored = performances_from_json(text)
+    assert all(type(p) is Performance for p in restored)
+    assert restored == performances
+    # Dicts relus du cache JSON et enregistrements Performance sont interchangeables
+    assert json.loads(text) == restored
@@ -0,0 +1,60 @@
+import pytest
+import requests
+
+from moteur_athle import create_engine
+from noms import AthleteIndex
+from pipeline import EventPipeline, split_runner_name
+from replay_server import ReplayServer, klikego_runner_name
+
+
+@pytest.mark.parametrize("runner, expected", [
+    ("DUPONT Jean", ("DUPONT", "Jean")),
+    ("  LE GALL  Jean Marc ", ("LE", "GALL Jean Marc")),
+    ("Madonna", None),
+    ("", None),
+])
+def test_split_runner_name(runner, expected):
+    assert split_runner_name(runner) == expected
+
+
+def test_athlete_index_deduplicates_normalized_names():
+    index = AthleteIndex()
+    assert index.add(("COMMUN0", "Hélène0"), "1")
+    assert index.add(("DUPONT", "Jean"), "1")
+    # Même athlète, autre orthographe, dans une autre épreuve puis à nouveau dans la même
+    assert not index.add(("Commun0", "HELENE0"), "2")
+    assert not index.add(("commun0", "  helene0"), "2")
+    assert index.add(("MARTIN", "Paul"), "2")
+    assert len(index) == 3
+    assert ("Commun0", "HELENE0") in index
+    assert index.canonical(("Commun0", "HELENE0")) == ("COMMUN0", "Hélène0")
+    assert index.athletes() == [("COMMUN0", "Hélène0"), ("DUPONT", "Jean"), ("MARTIN", "Paul")]
+    assert index.courses(("commun0", "helene0")) == ["1", "2"]
+    assert index.course_athletes("1") == [("COMMUN0", "Hélène0"), ("DUPONT", "Jean")]
+    assert index.course_athletes("2") == [("COMMUN0", "Hélène0"), ("MARTIN", "Paul")]
+    assert index.course_athletes("3") == []
+
+
+@pytest.mark.parametrize("backend", ["threads", "asyncio"])
+def test_event_pipeline_fetches_shared_runners_once(backend):
+    courses, shared = {"1": 30, "2": 20}, 5
+    with ReplayServer(courses=courses, shared_runners=shared, athle_rows=2, per_page=7) as server, \
+            server.patched(), requests.Session() as session, \
+            create_engine(backend, rate_limiter=None, seasons=["2025"]) as engine:
+        pipeline = EventPipeline(session, "replay", list(courses), engine, 0)
+        results = dict(pipeline)
+        athle_requests = server.stats()["athle"]
+    unique = sum(courses.values()) - shared
+    assert len(results) == len(pipeline.index) == pipeline.completed == unique
+    assert athle_requests == unique
+    assert pipeline.runners == courses
+    # Les coureurs communs figurent dans chaque épreuve, sous l'orthographe de leur première apparition
+    first_spelling = split_runner_name(klikego_runner_name("1", 0, shared))
+    assert results[first_spelling]
+    for course_id, size in courses.items():
+        athletes = pipeline.course_athletes(course_id)
+        assert len(athletes) == size
+        assert first_spelling in athletes
+        performances = pipeline.course_performances(course_id)
+        assert performances == [p for athlete in athletes for p in results[athlete]]
+        assert all(p in performances for p in results[first_spelling])
@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+import requests
+
+import prechauffage
+from baseathle import NO_LOOKUP
+from prechauffage import Prewarmer
+
+# Échecs possibles d'une entrée : aucun ne doit interrompre le passage ni la boucle
+ENTRY_FAILURES = [
+    ValueError("épreuve 12 introuvable"),
+    requests.ConnectionError("connexion refusée"),
+    requests.HTTPError("503 Server Error"),
+    OSError("disque plein"),
+    sqlite3.OperationalError("database is locked"),
+    sqlite3.DatabaseError("file is not a database"),
+]
+
+
+@pytest.mark.parametrize("error", ENTRY_FAILURES, ids=lambda error: type(error).__name__)
+def test_failing_entry_does_not_stop_the_pass(monkeypatch, error):
+    attempts = []
+
+    def failing_fetcher(session, reference_id):
+        attempts.append(reference_id)
+        raise error
+
+    monkeypatch.setattr(prechauffage, "fetch_course_options", failing_fetcher)
+    prewarmer = Prewarmer(["ref1", "https://www.klikego.com/inscrits/course/ref2#12"], NO_LOOKUP, store=None,
+                          seasons=["2025"])
+    assert prewarmer.run_once() == 2
+    assert attempts == ["ref1", "ref2"]
+    assert prewarmer.cycles == 1
+
+
+def test_failing_fetcher_does_not_stop_the_loop(monkeypatch):
+    attempts = []
+
+    def failing_fetcher(session, reference_id):
+        attempts.append(reference_id)
+        if len(attempts) == 3:
+            prewarmer.stop()
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(prechauffage, "fetch_course_options", failing_fetcher)
+    prewarmer = Prewarmer(["ref1"], NO_LOOKUP, store=None, seasons=["2025"])
+    prewarmer.run_forever(interval=0)
+    assert attempts == ["ref1"] * 3
+    assert prewarmer.cycles == 3
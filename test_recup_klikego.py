@@ -0,0 +1,186 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import recup_klikego
+from recup_klikego import extract_runners, fetch_all_runners, fetch_data, iter_runner_pages, parse_course_options
+from replay_server import klikego_course_page, klikego_runner_name, klikego_runners_page
+
+_TABLE = "<table class='table table-sm table-bordered table-striped'>{}</table>"
+
+# Pages d'inscrits couvrant les cas particuliers de l'extracteur, et inscrits attendus
+# (résultats de l'ancien extracteur BeautifulSoup)
+KLIKEGO_CORPUS = [
+    (_TABLE.format("<tr class='mt-1'><td><b>12</b></td><td><div>-</div><div>DUPONT Jean</div></td></tr>"
+                   "<tr class='mt-1'><td><div>-</div><div>MARTIN  Hélène</div></td><td>Ville</td></tr>"),
+     ["DUPONT Jean", "MARTIN  Hélène"]),
+    (_TABLE.format("<tr class='mt-1 odd'><td><b> 7 </b></td><td><div>x</div><div>\n  LEROY <span>Paul</span>\n</div>"
+                   "</td></tr><tr class='header'><td><div>-</div><div>Ignoré</div></td></tr>"),
+     ["LEROYPaul"]),
+    (_TABLE.format("<tr class='mt-1'><td><b>A12</b><div>-</div><div>BIB &eacute;trange</div></td><td>x</td></tr>"
+                   "<tr class='mt-1'><td><b>3</b></td></tr><tr class='mt-1'><td><div>seul</div></td></tr>"
+                   "<tr class='mt-1'></tr><tr class='mt-1'><td><div>-</div><div>NOM <!-- note -->Prénom</div>"
+                   "</td></tr>"),
+     ["BIB étrange", "NOMPrénom"]),
+    ("<table class='table'><tr class='mt-1'><td><div>-</div><div>Autre tableau</div></td></tr></table>"
+     + _TABLE.format("<tr class='mt-1'><td><div>-</div><div>BON Tableau</div></td></tr>")
+     + _TABLE.format("<tr class='mt-1'><td><div>-</div><div>Second Tableau</div></td></tr>"),
+     ["BON Tableau"]),
+    ("<table class='table table-sm table-bordered table-striped extra'><tr class='mt-1'><td><div>-</div>"
+     "<div>Classe En Trop</div></td></tr></table>",
+     []),
+    (_TABLE.format(""), []),
+    ("<p>Aucun inscrit</p>", []),
+    ("", []),
+]
+
+# Listes d'épreuves et épreuves attendues (None : ValueError)
+COURSE_PAGE_CORPUS = [
+    ("<select id='course'><option value=''>Choisir</option><option value='1'> 10 km </option>"
+     "<optgroup label='Trails'><option value='2'>Trail &amp; <b>nature</b></option></optgroup>"
+     "<option value=' 3 '>Semi</option><option>Sans valeur</option></select>",
+     {"10 km": "1", "Trail & nature": "2", "Semi": "3"}),
+    ("<select id='autre'><option value='9'>Autre</option></select><select id='course'>"
+     "<option value='1'>Épreuve</option></select><select id='course'><option value='2'>Doublon</option></select>",
+     {"Épreuve": "1"}),
+    ("<select id='course'><option value=''>Choisir</option></select>", None),
+    ("<p>Pas de liste</p>", None),
+]
+
+
+@pytest.mark.parametrize("html, expected", KLIKEGO_CORPUS)
+def test_extract_runners(html, expected):
+    assert extract_runners(html) == expected
+
+
+def test_extract_runners_generated_page():
+    page = klikego_runners_page("1", 0, 500, per_page=500).decode("utf-8")
+    assert extract_runners(page) == [klikego_runner_name("1", number) for number in range(500)]
+
+
+@pytest.mark.parametrize("html, expected", COURSE_PAGE_CORPUS)
+def test_parse_course_options(html, expected):
+    if expected is None:
+        with pytest.raises(ValueError):
+            parse_course_options(html)
+    else:
+        assert parse_course_options(html) == expected
+
+
+def test_parse_course_options_generated_page():
+    page = klikego_course_page({str(i): 100 for i in range(50)}).decode("utf-8")
+    assert parse_course_options(page) == {f"Course {i}": str(i) for i in range(50)}
+
+
+class _Response:
+    def __init__(self, status_code: int, text: str = ""):
+        self.status_code = status_code
+        self.text = text
+
+
+class _ScriptedSession:
+    """Session dont chaque POST renvoie la réponse suivante du script (ou lève l'exception)."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.posts = 0
+
+    def post(self, url, headers=None, data=None):
+        self.posts += 1
+        outcome = self.script.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(recup_klikego.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_fetch_data_retries_transient_failures(sleeps):
+    session = _ScriptedSession([_Response(503), requests.ConnectionError("reset"), _Response(429),
+                                _Response(200, "<table></table>")])
+    assert fetch_data(session, 0, "1", "ref", max_retries=3) == "<table></table>"
+    assert session.posts == 4
+    # Pauses à gigue complète, bornées par backoff_delay (0.5 s, 1 s, 2 s)
+    assert len(sleeps) == 3
+    assert all(0 <= delay <= bound for delay, bound in zip(sleeps, [0.5, 1.0, 2.0]))
+
+
+@pytest.mark.parametrize("outcome, error", [
+    (_Response(503), requests.HTTPError),
+    (requests.Timeout("timeout"), requests.Timeout),
+])
+def test_fetch_data_raises_after_max_retries(sleeps, outcome, error):
+    session = _ScriptedSession([outcome] * 3)
+    with pytest.raises(error):
+        fetch_data(session, 4, "1", "ref", max_retries=2)
+    assert session.posts == 3
+    assert len(sleeps) == 2
+
+
+def test_fetch_data_does_not_retry_permanent_errors(sleeps):
+    session = _ScriptedSession([_Response(404)])
+    with pytest.raises(requests.HTTPError) as raised:
+        fetch_data(session, 4, "1", "ref")
+    assert raised.value.response.status_code == 404
+    assert session.posts == 1
+    assert sleeps == []
+
+
+def _listing(course_id: str, race_size: int, per_page: int, failing_page=None, delays=None, requested=None):
+    """Remplaçant de fetch_data servant les pages générées d'une épreuve de `race_size` inscrits."""
+    lock = threading.Lock()
+
+    def fetch(session, page_number, course_id_, reference_id):
+        with lock:
+            if requested is not None:
+                requested.append(page_number)
+        if delays:
+            time.sleep(delays.get(page_number, 0))
+        if page_number == failing_page:
+            raise requests.HTTPError(f"Erreur HTTP 503 lors de la récupération de la page {page_number + 1}")
+        return klikego_runners_page(course_id, page_number, race_size, per_page=per_page).decode("utf-8")
+
+    return fetch
+
+
+@pytest.mark.parametrize("window", [1, 3, 8])
+def test_iter_runner_pages_yields_pages_in_order(monkeypatch, window):
+    # Pages suivantes plus rapides que les premières : l'ordre de rendu ne dépend pas de l'arrivée
+    delays = {0: 0.03, 1: 0.02, 2: 0.01}
+    monkeypatch.setattr(recup_klikego, "fetch_data", _listing("1", 95, 10, delays=delays))
+    pages = list(iter_runner_pages(None, "1", "ref", window=window))
+    assert [len(page) for page in pages] == [10] * 9 + [5]
+    assert [runner for page in pages for runner in page] == [klikego_runner_name("1", n) for n in range(95)]
+
+
+@pytest.mark.parametrize("window", [1, 4])
+def test_iter_runner_pages_stops_at_first_empty_page(monkeypatch, window):
+    requested = []
+    monkeypatch.setattr(recup_klikego, "fetch_data", _listing("1", 30, 10, requested=requested))
+    assert len(fetch_all_runners(None, "1", "ref", window=window)) == 30
+    # Pages 0 à 2 pleines, page 3 vide ; au plus `window` - 1 requêtes spéculatives au-delà
+    assert set(range(4)) <= set(requested)
+    assert max(requested) <= 3 + window - 1
+
+
+def test_iter_runner_pages_of_empty_course(monkeypatch):
+    monkeypatch.setattr(recup_klikego, "fetch_data", _listing("1", 0, 10))
+    assert list(iter_runner_pages(None, "1", "ref", window=3)) == []
+
+
+@pytest.mark.parametrize("window", [1, 3])
+def test_iter_runner_pages_propagates_page_errors(monkeypatch, window):
+    monkeypatch.setattr(recup_klikego, "fetch_data", _listing("1", 95, 10, failing_page=3))
+    pages = []
+    with pytest.raises(requests.HTTPError):
+        for page in iter_runner_pages(None, "1", "ref", window=window):
+            pages.append(page)
+    # Les pages précédant l'erreur ont été rendues, la liste n'est jamais tronquée en silence
+    assert len(pages) == 3
@@ -0,0 +1,128 @@
+import pytest
+
+from baseathle import AthleLookup
+from moteur_athle import create_engine
+from noms import candidate_splits
+from parse_athle import Performance
+from pipeline import split_runner_name
+from replay_server import ReplayServer
+from resolution_noms import NameResolver
+
+# Noms d'inscrits et découpages attendus, du plus au moins probable
+SPLIT_CORPUS = [
+    ("DUPONT Jean", [("DUPONT", "Jean")]),
+    ("LE GALL Jean Marc", [("LE GALL", "Jean Marc"), ("LE", "GALL Jean Marc"), ("LE GALL Jean", "Marc")]),
+    ("Jean DUPONT", [("DUPONT", "Jean"), ("Jean", "DUPONT")]),
+    ("Astier Saintamand Frédérique", [("Astier", "Saintamand Frédérique"), ("Astier Saintamand", "Frédérique"),
+                                      ("Astier", "Saintamand Frederique")]),
+    ("MARTIN Hélène", [("MARTIN", "Hélène"), ("MARTIN", "Helene")]),
+    ("Madonna", []),
+    ("", []),
+]
+
+
+@pytest.mark.parametrize("runner, expected", SPLIT_CORPUS)
+def test_candidate_splits(runner, expected):
+    assert candidate_splits(runner) == expected
+
+
+def test_candidate_splits_are_capped():
+    assert len(candidate_splits("Un Deux Trois Quatre Cinq Six", max_candidates=3)) == 3
+
+
+def _performances(*profiles):
+    return [Performance("10 km", 10.0, "40'00''", 2400 + i, 15.0, birth_year, sex)
+            for i, (birth_year, sex) in enumerate(profiles)]
+
+
+# Inscrit tel que découpé à la lecture de Klikego, et découpage sous lequel athle le connaît
+RUNNER = ("ASTIER", "SAINTAMAND Frédérique")
+CONFIRMED = ("ASTIER SAINTAMAND", "Frederique")
+
+
+def test_single_profile_split_is_remembered_and_tried_first(tmp_path):
+    path = str(tmp_path / "resolutions.sqlite")
+    resolver = NameResolver(path)
+    assert resolver.candidates(RUNNER)[0] == ("ASTIER SAINTAMAND", "Frédérique")
+    performances = _performances((1980, "F"), (1980, "F"), (None, "F"))
+    assert resolver.check(RUNNER, CONFIRMED, performances) is performances
+    assert resolver.candidates(RUNNER)[0] == CONFIRMED
+    resolver.close()
+    # Découpage relu depuis SQLite, même nom reçu avec un autre découpage et d'autres accents
+    reopened = NameResolver(path)
+    candidates = reopened.candidates(("Astier Saintamand", "Frederique"))
+    assert candidates[0] == CONFIRMED
+    assert len(candidates) == len(set(candidates))
+    assert reopened.stats() == {"entries": 1, "remembered": 1, "confirmed": 0, "forgotten": 0}
+    reopened.close()
+
+
+@pytest.mark.parametrize("performances", [[], None], ids=["vide", "echec"])
+def test_empty_or_failed_search_is_returned_unchanged(performances):
+    resolver = NameResolver(":memory:")
+    assert resolver.check(RUNNER, CONFIRMED, performances) is performances
+    assert resolver.stats()["entries"] == 0
+
+
+def test_homonyms_are_kept_but_not_remembered():
+    resolver = NameResolver(":memory:")
+    performances = _performances((1980, "F"), (1995, "F"))
+    assert resolver.check(RUNNER, CONFIRMED, performances) == performances
+    assert resolver.resolution(RUNNER) is None
+
+
+@pytest.mark.parametrize("fresh_profiles, kept", [
+    ([(1980, "F")], (1980, "F")),
+    ([(1980, "F"), (1995, "F")], None),
+    ([(1995, "M")], (1995, "M")),
+], ids=["meme-profil", "homonyme", "autre-athlete"])
+def test_remembered_split_is_forgotten_when_the_profile_changes(fresh_profiles, kept):
+    resolver = NameResolver(":memory:")
+    resolver.check(RUNNER, CONFIRMED, _performances((1980, "F")))
+    performances = _performances(*fresh_profiles)
+    assert resolver.check(RUNNER, CONFIRMED, performances) is performances
+    resolution = resolver.resolution(RUNNER)
+    assert (resolution and (resolution.birth_year, resolution.sex)) == kept
+    assert resolver.stats()["forgotten"] == (0 if kept == (1980, "F") else 1)
+
+
+def _population(count):
+    # Inscrits Klikego et licenciés athle (nom, prénom en minuscules) -> profil
+    names, licensees = [], {}
+    for i in range(count):
+        profile = (i % 100, "MF"[i % 2])
+        kind = i % 5
+        if kind == 0:
+            names.append(f"Nom{i} Bis{i} Prenom{i}")
+            licensees[(f"nom{i} bis{i}", f"prenom{i}")] = profile
+        elif kind == 1:
+            names.append(f"Nom{i} Hélène{i}")
+            licensees[(f"nom{i}", f"helene{i}")] = profile
+        elif kind == 2:
+            names.append(f"Prenom{i} NOM{i}")
+            licensees[(f"nom{i}", f"prenom{i}")] = profile
+        elif kind == 3:
+            names.append(f"Nom{i} Prenom{i}")
+            licensees[(f"nom{i}", f"prenom{i}")] = profile
+        else:
+            names.append(f"Absent{i} Prenom{i}")
+    return names, licensees
+
+
+@pytest.mark.parametrize("backend", ["threads", "asyncio"])
+def test_engines_resolve_every_licensee_and_reuse_splits(tmp_path, backend):
+    names, licensees = _population(40)
+    athletes = [split_runner_name(name) for name in names]
+    resolver = NameResolver(str(tmp_path / "resolutions.sqlite"))
+    runs, sent = [], []
+    with ReplayServer(licensees=licensees, athle_rows=3) as server, server.patched():
+        for _ in range(2):
+            before = server.stats().get("athle", 0)
+            with create_engine(backend, rate_limiter=None, lookup=AthleLookup(resolver=resolver)) as engine:
+                runs.append(dict(engine.fetch_many(athletes, 0)))
+            sent.append(server.stats().get("athle", 0) - before)
+    resolver.close()
+    assert sum(1 for performances in runs[0].values() if performances) == len(licensees)
+    # Second passage : mêmes performances, découpages confirmés essayés en premier
+    assert runs[1] == runs[0]
+    assert sent[1] < sent[0]
@@ -0,0 +1,89 @@
+import pytest
+
+import recup_klikego
+import suivi_inscrits
+from parse_athle import Performance
+from recup_klikego import download_runners_page
+from replay_server import klikego_runner_name, klikego_runners_page
+from suivi_inscrits import RegistrantStore, lookup_variant, page_digest
+
+DAY = 24 * 3600
+PERFORMANCES = [Performance("10 km de limoges", 10.0, "41'07''", 2467, 14.6, 2005, "f")]
+VARIANT = lookup_variant(0, None, ["2026", "2025"])
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(suivi_inscrits.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RegistrantStore(str(tmp_path / "inscrits.sqlite"), ttl_seconds=7 * DAY)
+    yield store
+    store.close()
+
+
+def test_unchanged_page_is_reused_by_digest(store):
+    digest = page_digest("<table>page 0</table>")
+    assert store.page_runners("ref", "1", 0, digest) is None
+    store.save_page("ref", "1", 0, digest, ["DUPONT Jean", "MARTIN Hélène"])
+    assert store.page_runners("ref", "1", 0, digest) == ["DUPONT Jean", "MARTIN Hélène"]
+    assert store.page_runners("ref", "1", 0, page_digest("<table>page 0 modifiée</table>")) is None
+    assert store.page_runners("ref", "2", 0, digest) is None
+    assert (store.unchanged_pages, store.changed_pages) == (1, 3)
+
+
+def test_download_skips_analysis_of_unchanged_pages(monkeypatch, store):
+    pages = {0: klikego_runners_page("1", 0, 25, per_page=20).decode("utf-8")}
+    extracted = []
+    extract_runners = recup_klikego.extract_runners
+    monkeypatch.setattr(recup_klikego, "fetch_data", lambda session, page, course_id, reference_id: pages[page])
+    monkeypatch.setattr(recup_klikego, "extract_runners", lambda html: extracted.append(html) or extract_runners(html))
+    expected = [klikego_runner_name("1", number) for number in range(20)]
+    assert download_runners_page(None, 0, "1", "ref", store) == expected
+    assert download_runners_page(None, 0, "1", "ref", store) == expected
+    assert len(extracted) == 1
+    # Nouvel inscrit : la page change d'empreinte et est analysée de nouveau
+    pages[0] = klikego_runners_page("1", 0, 25, per_page=21).decode("utf-8")
+    assert len(download_runners_page(None, 0, "1", "ref", store)) == 21
+    assert len(extracted) == 2
+
+
+def test_known_results_expire_after_ttl(store, clock):
+    store.save_results("ref", VARIANT, [(("DUPONT", "Hélène"), PERFORMANCES), (("MARTIN", "Paul"), [])])
+    clock.now += 7 * DAY
+    assert store.known_results("ref", VARIANT) == {("dupont", "helene"): PERFORMANCES, ("martin", "paul"): []}
+    clock.now += 1
+    assert store.known_results("ref", VARIANT) == {}
+
+
+def test_known_results_saved_after_final_after_never_expire(store, clock):
+    final_after = clock.now
+    store.save_results("ref", VARIANT, [(("DUPONT", "Hélène"), PERFORMANCES)])
+    clock.now -= 10
+    store.save_results("ref", VARIANT, [(("MARTIN", "Paul"), PERFORMANCES)])
+    clock.now += 365 * DAY
+    assert store.known_results("ref", VARIANT, final_after) == {("dupont", "helene"): PERFORMANCES}
+    assert store.known_results("ref", VARIANT) == {}
+
+
+def test_known_results_are_kept_per_event_and_variant(store):
+    store.save_results("ref", VARIANT, [(("DUPONT", "Hélène"), PERFORMANCES)])
+    assert store.known_results("autre", VARIANT) == {}
+    assert store.known_results("ref", lookup_variant(5, "f", ["2026", "2025"])) == {}
+    store.save_page("ref", "1", 0, "digest", ["DUPONT Hélène"])
+    store.forget("ref")
+    assert store.known_results("ref", VARIANT) == {}
+    assert store.page_runners("ref", "1", 0, "digest") is None
+    assert store.stats()["pages"] == store.stats()["results"] == 0